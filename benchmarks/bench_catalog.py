@@ -0,0 +1,70 @@
+# bench_catalog.py
+# Scan latency against catalog size: full products.json parse per scan
+# (the old load_inventory path) vs. the shared ProductCatalog lookup.
+#
+#   python benchmarks/bench_catalog.py [--sizes 1000,10000,50000] [--scans 200]
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from catalog import ProductCatalog
+
+
+def make_catalog(path: Path, size: int) -> list:
+    """Write a synthetic products.json with `size` SKUs and return the SKUs."""
+    products = {}
+    for i in range(size):
+        sku = str(1000 + i)
+        products[sku] = {
+            "category": "Electrical",
+            "name": f"Item {sku}",
+            "price": round(random.uniform(1, 100), 2),
+            "stock": random.randint(10, 300),
+            "next_ship": "no shipment",
+            "next_ship_qty": 0,
+        }
+    with open(path, "w") as f:
+        json.dump(products, f, indent=2)
+    return list(products)
+
+
+def time_scans(lookup, skus: list, scans: int) -> float:
+    """Average seconds per scan."""
+    picks = [random.choice(skus) for _ in range(scans)]
+    start = time.perf_counter()
+    for sku in picks:
+        lookup(sku)
+    return (time.perf_counter() - start) / scans
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Catalog scan latency benchmark")
+    parser.add_argument("--sizes", default="1000,10000,50000")
+    parser.add_argument("--scans", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'SKUs':>8} {'json.load/scan':>16} {'catalog/scan':>14} {'speedup':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in (int(s) for s in args.sizes.split(",")):
+            path = Path(tmp) / f"products_{size}.json"
+            skus = make_catalog(path, size)
+
+            def reload_lookup(sku):
+                with open(path) as f:
+                    return json.load(f).get(sku)
+
+            cat = ProductCatalog(path)
+            cat.refresh()
+            legacy = time_scans(reload_lookup, skus, max(args.scans // 10, 5))
+            cached = time_scans(cat.get, skus, args.scans)
+            print(f"{size:>8} {legacy * 1e3:>13.3f} ms {cached * 1e6:>11.2f} us {legacy / cached:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
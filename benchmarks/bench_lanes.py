@@ -0,0 +1,213 @@
+# bench_lanes.py
+# Multi-process checkout stress test: N lanes (separate processes, like
+# separate terminals) sell from one shared data directory at the same time.
+# A small catalog with little stock makes the lanes fight over the same
+# SKUs and sell many of them out. Some sales are returned right away, and
+# with JSON storage every other lane writes products.json on each sale
+# while the rest write behind; the write-behind lanes make their last flush
+# after every lane has finished, over restocks the others have written. Afterwards it checks that
+# no stock update was lost:
+#   - for every SKU, starting stock - final stock == units sold - units
+#     returned, by the sales and returns logs and by what the lanes were told
+#   - nothing was oversold (sold beyond starting stock plus returns)
+#   - every sale ID is unique
+#   - no reservations are left behind
+#
+#   python benchmarks/bench_lanes.py [--lanes 12] [--sales 60] [--skus 40]
+#       [--stock 30] [--returns 0.15] [--storage json,sqlite] [--seed 1]
+
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from checkout import CheckoutEngine, CheckoutError
+from storage import JsonStorage, get_storage
+
+
+def seed(data: Path, skus: int, stock: int) -> dict:
+    products = {
+        str(1000 + i): {"category": "Bench", "name": f"Item {i}", "price": 1.5 + i,
+                        "stock": stock, "next_ship": None, "next_ship_qty": 0}
+        for i in range(skus)
+    }
+    with open(data / "products.json", "w") as f:
+        json.dump(products, f)
+    return {sku: p["stock"] for sku, p in products.items()}
+
+
+def run_lane(kind: str, data: str, lane: int, sales: int, returns: float, seed: int, start, done) -> dict:
+    """One checkout lane in its own process; write-behind lanes flush after every lane is done."""
+    if kind == "json" and lane % 2:
+        store = JsonStorage(Path(data), flush_interval=0)  # products.json written on every sale
+    else:
+        store = get_storage(kind, Path(data))
+    engine = CheckoutEngine(store, lane=f"lane-{lane}")
+    result = sell(engine, random.Random(seed * 1000 + lane), sales, returns, start)
+    done.wait()
+    if getattr(store, "write_behind", None) is not None:
+        store.flush()
+    if hasattr(store, "close"):
+        store.close()
+    return result
+
+
+def give_back(store, sale: dict, rng: random.Random) -> list:
+    """Return some of a sale's items, like the returns screen does; returns the items."""
+    lines = [item for item in sale["items"] if rng.random() < 0.7] or sale["items"][:1]
+    items = [{"sku": item["sku"], "name": item["name"], "quantity": rng.randint(1, item["quantity"]),
+              "charge": item["price"], "id": str(item["sku"])} for item in lines]
+    store.commit_return(sale, items, sum(item["charge"] * item["quantity"] for item in items))
+    return items
+
+
+def sell(engine: CheckoutEngine, rng: random.Random, sales: int, returns: float, start) -> dict:
+    """Scan random SKUs, sometimes void, otherwise commit; return some of the sales."""
+    skus = list(engine.storage.products())
+    sold, returned, rejected, voided, committed = Counter(), Counter(), 0, 0, 0
+    start.wait()
+    begin = time.perf_counter()
+    for _ in range(sales):
+        for _ in range(rng.randint(1, 4)):
+            try:
+                engine.add(rng.choice(skus), rng.randint(1, 3))
+            except CheckoutError:
+                rejected += 1  # held by another lane or sold out
+        if not engine.cart:
+            continue
+        if rng.random() < 0.1:
+            engine.open_sale()
+            voided += 1
+            continue
+        sale = engine.commit()
+        committed += 1
+        for item in sale["items"]:
+            sold[str(item["sku"])] += item["quantity"]
+        if rng.random() < returns:
+            for item in give_back(engine.storage, sale, rng):
+                returned[str(item["sku"])] += item["quantity"]
+    return {"sold": dict(sold), "returned": dict(returned), "rejected": rejected, "voided": voided,
+            "committed": committed, "seconds": time.perf_counter() - begin}
+
+
+def sale_ids(kind: str, data: Path) -> list:
+    """Every stored sale ID, duplicates included."""
+    if kind == "json":
+        with open(data / "sales.jsonl") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        # a return appends a second, locked version of its sale
+        return [record["id"] for record in records if not record.get("locked")]
+    store = get_storage(kind, data)
+    ids = [row[0] for row in store.db.execute("SELECT id FROM sales")]
+    store.close()
+    return ids
+
+
+def leftover_holds(kind: str, data: Path) -> int:
+    if kind == "json":
+        try:
+            with open(data / "reservations.json") as f:
+                return len(json.load(f))
+        except FileNotFoundError:
+            return 0
+    store = get_storage(kind, data)
+    count = store.db.execute("SELECT COUNT(*) FROM reservations").fetchone()[0]
+    store.close()
+    return count
+
+
+def run(kind: str, args) -> bool:
+    with tempfile.TemporaryDirectory() as tmp:
+        data = Path(tmp)
+        initial = seed(data, args.skus, args.stock)
+        if kind == "sqlite":
+            get_storage("sqlite", data).import_json(get_storage("json", data))
+
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Manager() as manager:
+            start = manager.Event()
+            done = manager.Barrier(args.lanes)
+            with ctx.Pool(args.lanes) as pool:
+                pending = [pool.apply_async(run_lane, (kind, str(data), lane, args.sales, args.returns,
+                                                       args.seed, start, done))
+                           for lane in range(args.lanes)]
+                time.sleep(1.0)  # let every lane import and open storage
+                begin = time.perf_counter()
+                start.set()
+                lanes = [p.get() for p in pending]
+                elapsed = time.perf_counter() - begin
+
+        store = get_storage(kind, data)
+        final = {sku: p["stock"] for sku, p in store.products().items()}
+        logged, logged_returns = Counter(), Counter()
+        for sale in store.iter_sales():
+            for item in sale["items"]:
+                logged[str(item["sku"])] += item["quantity"]
+        for record in store.iter_returns():
+            for item in record["items"]:
+                logged_returns[str(item["sku"])] += item["quantity"]
+        if hasattr(store, "close"):
+            store.close()
+        ids = sale_ids(kind, data)
+        holds = leftover_holds(kind, data)
+
+    return report(kind, initial, final, logged, logged_returns, lanes, ids, holds, elapsed)
+
+
+def report(kind: str, initial: dict, final: dict, logged: Counter, logged_returns: Counter,
+           lanes: list, ids: list, holds: int, elapsed: float) -> bool:
+    """Print the run summary and every lost update found. Returns True if none."""
+    reported, reported_returns = Counter(), Counter()
+    for lane in lanes:
+        reported.update(lane["sold"])
+        reported_returns.update(lane["returned"])
+    problems = []
+    for sku, stock in initial.items():
+        taken = stock - final[sku]
+        net_logged = logged[sku] - logged_returns[sku]
+        net_reported = reported[sku] - reported_returns[sku]
+        if not taken == net_logged == net_reported:
+            problems.append(f"SKU {sku}: stock dropped {taken}, logs say {net_logged} "
+                            f"({logged[sku]} sold - {logged_returns[sku]} returned), lanes say {net_reported}")
+        if logged[sku] > stock + logged_returns[sku]:
+            problems.append(f"SKU {sku}: oversold ({logged[sku]} of {stock} + {logged_returns[sku]} returned)")
+    if len(ids) != len(set(ids)):
+        problems.append(f"{len(ids) - len(set(ids))} duplicate sale IDs")
+    if holds:
+        problems.append(f"{holds} lanes still hold reservations")
+
+    committed = sum(l["committed"] for l in lanes)
+    sold_out = sum(1 for sku in initial if final[sku] == 0)
+    print(f"{kind:>7}: {len(lanes)} lanes, {committed} sales ({committed / elapsed:.1f}/s), "
+          f"{sum(l['voided'] for l in lanes)} voided, {sum(l['rejected'] for l in lanes)} scans rejected, "
+          f"{sum(logged.values())} units sold, {sum(logged_returns.values())} returned, "
+          f"{sold_out}/{len(initial)} SKUs sold out")
+    for problem in problems:
+        print(f"    LOST UPDATE: {problem}")
+    print(f"    {'FAIL' if problems else 'ok'}")
+    return not problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent checkout lanes stress test")
+    parser.add_argument("--lanes", type=int, default=12)
+    parser.add_argument("--sales", type=int, default=60, help="sales attempted per lane")
+    parser.add_argument("--skus", type=int, default=40)
+    parser.add_argument("--stock", type=int, default=30, help="starting stock per SKU")
+    parser.add_argument("--returns", type=float, default=0.15, help="share of sales partly returned")
+    parser.add_argument("--storage", default="json,sqlite")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    ok = all([run(kind, args) for kind in args.storage.split(",")])
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
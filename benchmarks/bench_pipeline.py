@@ -0,0 +1,201 @@
+# bench_pipeline.py
+# Load generation for the sale/return pipeline at several data scales.
+# Each scale seeds a fresh data directory: the catalog comes from
+# data/generate_products.py and the sales history from bench_storage.py.
+# It then drives add-item, checkout, receipt lookup, return and inventory
+# search through the code the screens use (CheckoutEngine, the storage
+# backend, receipt_text, SearchIndex) at a fixed request rate.
+# Latency is measured from each request's scheduled start, so a slow
+# request also counts as queueing delay for the ones behind it. --rate 0
+# runs each operation back to back.
+# Results are written to benchmarks/results/ as JSON and compared with the
+# previous run that used the same settings, so regressions show up between
+# versions.
+#
+#   python benchmarks/bench_pipeline.py [--scales 1000x1000,10000x20000]
+#       [--storage json,sqlite] [--ops 200] [--rate 0] [--seed 1]
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "data"))
+from bench_storage import make_history
+from checkout import CheckoutEngine
+from receipt_text import ReceiptTemplate
+from search_index import SearchIndex
+from storage import get_storage
+import generate_products
+
+RESULTS_DIR = Path(__file__).parent / "results"
+REGRESSION = 1.2  # flag p99 more than 20% above the previous run
+
+
+def seed(data: Path, products: int, history: int) -> list:
+    """Write products.json and sales.json into `data`; returns the SKUs."""
+    with contextlib.redirect_stdout(io.StringIO()):  # generator prints its distribution
+        items = generate_products.merge_items({}, generate_products.generate_items(products))
+    with open(data / "products.json", "w") as f:
+        json.dump(items, f)
+    skus = list(items)
+    make_history(data / "sales.json", skus, history)
+    return skus
+
+
+def open_storage(kind: str, data: Path):
+    store = get_storage(kind, data)
+    if kind == "sqlite":
+        store.import_json(get_storage("json", data))
+    return store
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    return sorted_values[min(int(p * len(sorted_values)), len(sorted_values) - 1)]
+
+
+def drive(prepare, request, count: int, rate: float) -> dict:
+    """Run `request(prepare())` `count` times at `rate`/s (0 = back to back)."""
+    latencies = []
+    start = time.perf_counter()
+    for i in range(count):
+        args = prepare()
+        scheduled = start + i / rate if rate else time.perf_counter()
+        now = time.perf_counter()
+        if now < scheduled:
+            time.sleep(scheduled - now)
+        request(args)
+        latencies.append(time.perf_counter() - scheduled)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "count": count,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "throughput": round(count / elapsed, 1),
+    }
+
+
+def run_scale(kind: str, products: int, history: int, ops: int, rate: float, rng: random.Random) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        data = Path(tmp)
+        skus = seed(data, products, history)
+        store = open_storage(kind, data)
+        engine = CheckoutEngine(store)
+        template = ReceiptTemplate()
+        index = SearchIndex()
+        words = sorted({w for sku in skus[:2000] for w in store.product(sku)["name"].lower().split()})
+
+        def fill_cart():
+            if len(engine.cart) >= 20:
+                engine.open_sale()
+            return rng.choice(skus)
+        results["add_item"] = drive(fill_cart, engine.add, ops, rate)
+
+        def new_cart():
+            engine.open_sale()
+            for sku in rng.sample(skus, 3):
+                engine.add(sku, 1)
+        results["checkout"] = drive(new_cart, lambda _: engine.commit(), ops, rate)
+
+        last_id = store.last_sale()["id"]
+        results["receipt_lookup"] = drive(
+            lambda: rng.randint(1, last_id),
+            lambda sale_id: template.render(store.find_sale(sale_id)),
+            ops, rate)
+
+        returnable = rng.sample(range(1, last_id + 1), min(ops, last_id))
+        def next_return():
+            sale = store.find_sale(returnable.pop())
+            return sale, sale["items"][:1]
+        results["return"] = drive(
+            next_return,
+            lambda args: store.commit_return(args[0], args[1], args[1][0]["total"]),
+            len(returnable), rate)
+
+        index.build(store.products())  # one-off build, like the inventory screen's background build
+        results["search"] = drive(
+            lambda: rng.choice(words)[:rng.randint(2, 5)],
+            lambda term: index.search(store.products(), term),
+            ops, rate)
+        if hasattr(store, "close"):
+            store.close()
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def previous_run(settings: dict):
+    """The newest stored run with the same settings, or None."""
+    for path in sorted(RESULTS_DIR.glob("pipeline-*.json"), reverse=True):
+        with open(path) as f:
+            run = json.load(f)
+        if run.get("settings") == settings:
+            return run
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sale/return pipeline load benchmark")
+    parser.add_argument("--scales", default="1000x1000,10000x20000", help="PRODUCTSxSALES,...")
+    parser.add_argument("--storage", default="json,sqlite")
+    parser.add_argument("--ops", type=int, default=200, help="requests per operation")
+    parser.add_argument("--rate", type=float, default=0, help="requests/s per operation (0 = max)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    settings = {"scales": args.scales, "storage": args.storage, "ops": args.ops,
+                "rate": args.rate, "seed": args.seed}
+    previous = previous_run(settings)
+    random.seed(args.seed)  # generate_products and make_history use the global generator
+    rng = random.Random(args.seed)
+
+    rows = []
+    print(f"{'scale':>13} {'storage':>7} {'operation':>15} {'p50 ms':>9} {'p99 ms':>9} {'ops/s':>9}")
+    for scale in args.scales.split(","):
+        products, history = (int(n) for n in scale.split("x"))
+        for kind in args.storage.split(","):
+            for op, stats in run_scale(kind, products, history, args.ops, args.rate, rng).items():
+                row = {"scale": scale, "storage": kind, "op": op, **stats}
+                rows.append(row)
+                note = ""
+                old = previous and next((r for r in previous["results"]
+                                         if (r["scale"], r["storage"], r["op"]) == (scale, kind, op)), None)
+                if old and old["p99_ms"] and stats["p99_ms"] > old["p99_ms"] * REGRESSION:
+                    note = f"  REGRESSION (p99 was {old['p99_ms']})"
+                print(f"{scale:>13} {kind:>7} {op:>15} {stats['p50_ms']:>9.3f} "
+                      f"{stats['p99_ms']:>9.3f} {stats['throughput']:>9.1f}{note}")
+
+    if previous:
+        print(f"\ncompared with {previous['revision']} ({previous['timestamp']})")
+    if not args.no_save:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        run = {"timestamp": stamp, "revision": git_revision(), "python": platform.python_version(),
+               "platform": platform.platform(), "settings": settings, "results": rows}
+        path = RESULTS_DIR / f"pipeline-{stamp}.json"
+        with open(path, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"results saved to {path.relative_to(ROOT)}")
+
+
+if __name__ == "__main__":
+    main()
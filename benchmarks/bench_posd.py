@@ -0,0 +1,114 @@
+# bench_posd.py
+# Stand-in for a store full of registers talking to the inventory daemon.
+# Starts src/posd.py on a scratch data directory, then runs dozens of lanes
+# (threads, each with its own connection and CheckoutEngine, like separate
+# terminals) that scan, void, commit and return at the same time. Reports sales/s,
+# how many checkouts each group commit absorbed, and checks the files the
+# daemon wrote for lost updates the same way bench_lanes.py does.
+#
+#   python benchmarks/bench_posd.py [--lanes 48] [--sales 40] [--skus 60]
+#       [--stock 40] [--returns 0.15] [--storage json,sqlite] [--seed 1]
+
+import argparse
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+from bench_lanes import report, sale_ids, seed, sell
+from checkout import CheckoutEngine
+from posclient import PosClient, RemoteStorage
+from storage import get_storage
+
+
+def start_daemon(kind: str, data: Path, address: str) -> subprocess.Popen:
+    proc = subprocess.Popen([sys.executable, str(ROOT / "src" / "posd.py"), "--storage", kind,
+                             "--data", str(data), "--listen", address], stdout=subprocess.DEVNULL)
+    client = PosClient(address)
+    for _ in range(200):
+        try:
+            client.call("stats")
+            client.close()
+            return proc
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("posd did not start")
+
+
+def run(kind: str, args) -> bool:
+    with tempfile.TemporaryDirectory() as tmp:
+        data = Path(tmp)
+        initial = seed(data, args.skus, args.stock)
+        if kind == "sqlite":
+            get_storage("sqlite", data).import_json(get_storage("json", data))
+        address = str(data / "posd.sock")
+        daemon = start_daemon(kind, data, address)
+        try:
+            start = threading.Event()
+            lanes = [None] * args.lanes
+
+            def lane(n):
+                engine = CheckoutEngine(RemoteStorage(address), lane=f"lane-{n}")
+                lanes[n] = sell(engine, random.Random(args.seed * 1000 + n), args.sales, args.returns, start)
+                engine.storage.close()
+
+            threads = [threading.Thread(target=lane, args=(n,)) for n in range(args.lanes)]
+            for t in threads:
+                t.start()
+            time.sleep(0.5)
+            begin = time.perf_counter()
+            start.set()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - begin
+            client = PosClient(address)
+            stats = client.call("stats")
+            client.close()
+        finally:
+            daemon.terminate()
+            daemon.wait()
+
+        store = get_storage(kind, data)
+        final = {sku: p["stock"] for sku, p in store.products().items()}
+        logged, logged_returns = Counter(), Counter()
+        for sale in store.iter_sales():
+            for item in sale["items"]:
+                logged[str(item["sku"])] += item["quantity"]
+        for record in store.iter_returns():
+            for item in record["items"]:
+                logged_returns[str(item["sku"])] += item["quantity"]
+        if hasattr(store, "close"):
+            store.close()
+        ids = sale_ids(kind, data)
+
+    ok = report(f"posd/{kind}", initial, final, logged, logged_returns, lanes, ids,
+                stats["lanes_holding"], elapsed)
+    print(f"    {stats['commits']} writes in {stats['batches']} group commits "
+          f"({stats['commits'] / max(stats['batches'], 1):.1f} per disk write)")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inventory daemon lane simulation")
+    parser.add_argument("--lanes", type=int, default=48)
+    parser.add_argument("--sales", type=int, default=40, help="sales attempted per lane")
+    parser.add_argument("--skus", type=int, default=60)
+    parser.add_argument("--stock", type=int, default=40, help="starting stock per SKU")
+    parser.add_argument("--returns", type=float, default=0.15, help="share of sales partly returned")
+    parser.add_argument("--storage", default="json,sqlite", help="backend the daemon serves")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    ok = all([run(kind, args) for kind in args.storage.split(",")])
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# bench_product_store.py
+# Memory and lookup cost of the catalog as a dict of per-SKU dicts
+# (json.load) vs. the column-wise ProductTable (product_store.py).
+# Memory is what tracemalloc sees allocated by the load and still held
+# afterwards; the load time is taken from a second, untraced load.
+# Lookups are the reads the screens make:
+#   scan     catalog[sku]["price"] / ["stock"] for random SKUs (SalesScreen.add_item)
+#   get      catalog.get(sku) for random SKUs, half of them unknown
+#   page     one 50-row page of items() with every field read (InventoryScreen)
+#   scan all every product's stock, via items()
+#
+#   python benchmarks/bench_product_store.py [--sizes 10000,100000,1000000] [--lookups 200000]
+
+import argparse
+import gc
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from product_store import FIELDS, ProductTable
+
+CATEGORIES = ["Electrical", "Plumbing", "Hardware", "Paint", "Garden", "Tools", "Lumber", "Lighting"]
+NOUNS = ["Surge Protector", "Pipe Wrench", "Wood Screws", "Paint Roller", "Hose Nozzle", "LED Bulb",
+         "Drill Bit Set", "PVC Elbow", "Extension Cord", "Wall Anchor", "Sandpaper", "Work Gloves"]
+
+
+def make_catalog(path: Path, size: int) -> list:
+    """Write a synthetic products.json with `size` SKUs and return the SKUs."""
+    products = {}
+    for i in range(size):
+        sku = str(1000 + i)
+        scheduled = random.random() < 0.3
+        products[sku] = {
+            "category": random.choice(CATEGORIES),
+            # a few thousand distinct names, like sizes/colours of the same items
+            "name": f"{random.choice(NOUNS)} {random.randint(1, 250)}",
+            "price": round(random.uniform(1, 100), 2),
+            "stock": random.randint(0, 300),
+            "next_ship": f"2026-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}" if scheduled else "no shipment",
+            "next_ship_qty": random.randint(10, 200) if scheduled else 0,
+        }
+    with open(path, "w") as f:
+        json.dump(products, f, indent=2)
+    return list(products)
+
+
+def load_json(path: Path) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def measure_load(load, path: Path):
+    """(catalog, bytes held, peak bytes, seconds) for one load.
+
+    The time comes from a second, untraced load: tracemalloc slows every
+    allocation down, so it would penalise the loaders unevenly.
+    """
+    gc.collect()
+    tracemalloc.start()
+    catalog = load(path)
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del catalog
+    gc.collect()
+    start = time.perf_counter()
+    catalog = load(path)
+    elapsed = time.perf_counter() - start
+    return catalog, held, peak, elapsed
+
+
+def per_op(func, count: int) -> float:
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) / count
+
+
+def time_lookups(catalog, skus: list, lookups: int) -> dict:
+    picks = [random.choice(skus) for _ in range(lookups)]
+    misses = [sku if i % 2 else "x" + sku for i, sku in enumerate(picks)]
+    pages = [random.randrange(max(len(skus) // 50, 1)) for _ in range(200)]
+
+    def scan():
+        for sku in picks:
+            item = catalog[sku]
+            item["price"], item["stock"]
+
+    def get():
+        for sku in misses:
+            catalog.get(sku)
+
+    def page():
+        items = list(catalog.items())
+        for n in pages:
+            for _, item in items[n * 50:n * 50 + 50]:
+                for field in FIELDS:
+                    item[field]
+
+    def scan_all():
+        sum(item["stock"] for _, item in catalog.items())
+
+    return {
+        "scan": per_op(scan, lookups),
+        "get": per_op(get, lookups),
+        "page": per_op(page, len(pages)),
+        "scan all": per_op(scan_all, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dict-of-dicts vs. columnar product catalog")
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--lookups", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in (int(s) for s in args.sizes.split(",")):
+            path = Path(tmp) / f"products_{size}.json"
+            skus = make_catalog(path, size)
+            print(f"\n{size} SKUs ({path.stat().st_size / 1e6:.1f} MB products.json)")
+            print(f"{'':>12} {'held':>10} {'per SKU':>9} {'peak':>10} {'load':>8} "
+                  f"{'scan':>9} {'get':>9} {'page':>9} {'scan all':>9}")
+            results = {}
+            for label, load in (("dict", load_json), ("ProductTable", ProductTable.load)):
+                catalog, held, peak, elapsed = measure_load(load, path)
+                times = time_lookups(catalog, skus, args.lookups)
+                results[label] = held
+                print(f"{label:>12} {held / 1e6:>7.1f} MB {held / size:>7.0f} B {peak / 1e6:>7.1f} MB "
+                      f"{elapsed:>7.2f}s {times['scan'] * 1e9:>6.0f} ns {times['get'] * 1e9:>6.0f} ns "
+                      f"{times['page'] * 1e6:>6.0f} us {times['scan all'] * 1e3:>6.0f} ms")
+                del catalog
+            print(f"{'':>12} ProductTable holds {results['dict'] / results['ProductTable']:.1f}x less")
+
+
+if __name__ == "__main__":
+    main()
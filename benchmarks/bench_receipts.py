@@ -0,0 +1,123 @@
+# bench_receipts.py
+# End-of-day burst printing: render N PDF receipts one after another on the
+# calling thread (what print_receipt used to do on the UI loop) vs. through
+# the pdf_pool in receipt_pdf.py, with both thread and process workers.
+# Also reports how long the caller is blocked per receipt in each mode, and
+# the cost of repeat lookups through receipt_cache.py (stat vs. render) and
+# of text receipts from receipt_text.py (template render vs. memoized hit).
+#
+#   python benchmarks/bench_receipts.py [--receipts 200] [--items 12] [--workers 4]
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from receipt_pdf import PdfRenderPool, render_pdf
+from receipt_cache import ReceiptCache
+from receipt_text import ReceiptRenderer, ReceiptTemplate
+
+
+def make_sales(count: int, items: int) -> list:
+    rng = random.Random(42)
+    sales = []
+    for sale_id in range(1, count + 1):
+        lines = []
+        for _ in range(rng.randint(1, items)):
+            qty, price = rng.randint(1, 5), round(rng.uniform(1, 200), 2)
+            lines.append({"sku": str(rng.randint(1000, 9999)), "name": f"Item {sale_id}",
+                          "quantity": qty, "price": price, "total": round(qty * price, 2)})
+        sales.append({"id": sale_id, "date": "2025-04-30 17:45:00", "items": lines,
+                      "total": round(sum(i["total"] for i in lines), 2)})
+    return sales
+
+
+def run_serial(sales: list, out: str):
+    blocked = 0.0
+    start = time.perf_counter()
+    for sale in sales:
+        t = time.perf_counter()
+        render_pdf(sale, out)
+        blocked += time.perf_counter() - t
+    return time.perf_counter() - start, blocked
+
+
+def run_pool(sales: list, out: str, kind: str, workers: int):
+    pool = PdfRenderPool(workers, kind)
+    pool.map(sales[:workers], out)  # start workers before timing
+    blocked = 0.0
+    start = time.perf_counter()
+    futures = []
+    for sale in sales:
+        t = time.perf_counter()
+        futures.append(pool.submit(sale, out))
+        blocked += time.perf_counter() - t
+    for f in futures:
+        f.result()
+    elapsed = time.perf_counter() - start
+    pool.shutdown()
+    return elapsed, blocked
+
+
+def run_lookups(sales: list, out: str) -> tuple:
+    """Seconds to look every receipt up twice: first pass renders, second is cached."""
+    cache = ReceiptCache(out, pool=PdfRenderPool(1, "thread"))
+    passes = []
+    for _ in range(2):
+        start = time.perf_counter()
+        for sale in sales:
+            cache.submit(sale).result()
+        passes.append(time.perf_counter() - start)
+    cache.pool.shutdown()
+    return tuple(passes)
+
+
+def run_text(sales: list, width: int) -> tuple:
+    """Microseconds per text receipt: template render, then memoized repeat."""
+    template, renderer = ReceiptTemplate(width), ReceiptRenderer(maxsize=len(sales))
+    start = time.perf_counter()
+    for sale in sales:
+        template.render(sale)
+    rendered = time.perf_counter() - start
+    for sale in sales:
+        renderer.render(sale, width)
+    start = time.perf_counter()
+    for sale in sales:
+        renderer.render(sale, width)
+    memoized = time.perf_counter() - start
+    return rendered / len(sales) * 1e6, memoized / len(sales) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--receipts", type=int, default=200)
+    parser.add_argument("--items", type=int, default=12, help="max lines per receipt")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    sales = make_sales(args.receipts, args.items)
+    print(f"{args.receipts} receipts, up to {args.items} lines each, {args.workers} workers")
+    print(f"{'mode':<10} {'total s':>9} {'receipts/s':>11} {'caller ms/receipt':>18}")
+    for mode in ("serial", "thread", "process"):
+        with tempfile.TemporaryDirectory() as tmp:
+            if mode == "serial":
+                elapsed, blocked = run_serial(sales, tmp)
+            else:
+                elapsed, blocked = run_pool(sales, tmp, mode, args.workers)
+        print(f"{mode:<10} {elapsed:>9.2f} {args.receipts / elapsed:>11.1f} "
+              f"{blocked / args.receipts * 1000:>18.3f}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        first, second = run_lookups(sales, tmp)
+    print(f"\nlookups through receipt_cache: first {first / args.receipts * 1000:.3f} ms/receipt, "
+          f"repeat {second / args.receipts * 1000:.3f} ms/receipt")
+    for width in (32, 48):
+        rendered, memoized = run_text(sales, width)
+        print(f"text receipts, {width} columns: render {rendered:.1f} us, memoized {memoized:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# bench_storage.py
+# Checkout throughput of the JSON and SQLite storage backends.
+#
+#   python benchmarks/bench_storage.py [--products 5000] [--history 0,10000] [--checkouts 200]
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from bench_catalog import make_catalog
+from storage import get_storage
+
+
+def make_history(path: Path, skus: list, count: int) -> None:
+    """Write a sales.json with `count` one-to-five line sales."""
+    sales = []
+    for sale_id in range(1, count + 1):
+        items = []
+        for sku in random.sample(skus, random.randint(1, 5)):
+            qty = random.randint(1, 3)
+            items.append({"sku": sku, "name": f"Item {sku}", "quantity": qty, "price": 9.99, "total": round(9.99 * qty, 2)})
+        sales.append({"id": sale_id, "date": "2025-04-13 12:00:00", "items": items,
+                      "total": round(sum(i["total"] for i in items), 2)})
+    with open(path, "w") as f:
+        json.dump(sales, f)
+
+
+def run(kind: str, data: Path, skus: list, checkouts: int) -> float:
+    """Checkouts per second for one backend."""
+    storage = get_storage(kind, data)
+    if kind == "sqlite":
+        storage.import_json(get_storage("json", data))
+    carts = []
+    for _ in range(checkouts):
+        items = [{"sku": sku, "name": f"Item {sku}", "quantity": 1, "price": 9.99, "total": 9.99}
+                 for sku in random.sample(skus, 3)]
+        carts.append((items, round(sum(i["total"] for i in items), 2)))
+    start = time.perf_counter()
+    for items, total in carts:
+        storage.commit_sale(items, total)
+    elapsed = time.perf_counter() - start
+    if hasattr(storage, "close"):
+        storage.close()
+    return checkouts / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Storage backend checkout benchmark")
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--history", default="0,10000")
+    parser.add_argument("--checkouts", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'history':>8} {'json':>12} {'sqlite':>12}   (checkouts/s, {args.products} products)")
+    for history in (int(h) for h in args.history.split(",")):
+        rates = {}
+        for kind in ("json", "sqlite"):
+            with tempfile.TemporaryDirectory() as tmp:
+                data = Path(tmp)
+                skus = make_catalog(data / "products.json", args.products)
+                make_history(data / "sales.json", skus, history)
+                rates[kind] = run(kind, data, skus, args.checkouts)
+        print(f"{history:>8} {rates['json']:>12.1f} {rates['sqlite']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# bench_undo.py
+# Undo memory over thousands of cart edits: full cart snapshots per action
+# (the old SalesScreen.add_to_history) vs. the bounded delta history in
+# undo.py. Then checks, exiting non-zero if any fails:
+#   - the delta history's tracemalloc peak stays flat once the undo stack
+#     is full (doubling the edits grows it by less than --tolerance)
+#   - undoing every edit empties the cart, passing back through every
+#     intermediate cart state, and redoing every edit restores it
+#
+#   python benchmarks/bench_undo.py [--scans 5000] [--lines 150] [--tolerance 0.05]
+
+import argparse
+import random
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from cart import Cart
+from undo import UndoHistory
+
+
+def edits(count: int, lines: int):
+    """Scans mixed with quantity edits and deletes: (action, sku, name, price, qty)."""
+    rng = random.Random(42)
+    for _ in range(count):
+        sku = str(1000 + rng.randrange(lines))
+        action = rng.choices(("add", "set", "delete"), weights=(8, 1, 1))[0]
+        yield action, sku, f"Item {sku}", 9.99, rng.randint(1, 3)
+
+
+def apply(cart: Cart, action: str, sku: str, name: str, price: float, qty: int):
+    """Make one edit like the sales screen does; returns (old, new) quantity of the line."""
+    line = cart.get(sku)
+    old = line.quantity if line else 0
+    if action == "add":
+        cart.add(sku, name, price, qty)
+    elif action == "set":
+        cart.set_quantity(sku, qty)
+    else:
+        cart.remove(sku)
+    line = cart.get(sku)
+    return old, line.quantity if line else 0
+
+
+def state(cart: Cart):
+    """Cart contents by SKU; line order is not compared (undoing a delete re-adds the line last)."""
+    return sorted(cart.to_items(), key=lambda item: item["sku"]), round(cart.subtotal, 2)
+
+
+def measure(count: int, lines: int, snapshots: bool) -> tuple:
+    """(bytes held, peak bytes) by the cart and its history after `count` edits."""
+    cart = Cart()
+    history = [] if snapshots else UndoHistory()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    for action, sku, name, price, qty in edits(count, lines):
+        if snapshots:
+            history.append({"type": action, "snapshot": cart.to_items()})
+            apply(cart, action, sku, name, price, qty)
+        else:
+            old, new = apply(cart, action, sku, name, price, qty)
+            history.record(sku, name, price, old, new)
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return held - base, peak - base
+
+
+def check_round_trip(count: int, lines: int) -> list:
+    """Undo everything, then redo everything; returns the problems found."""
+    cart = Cart()
+    history = UndoHistory(depth=count)
+    states = [state(cart)]
+    for action, sku, name, price, qty in edits(count, lines):
+        old, new = apply(cart, action, sku, name, price, qty)
+        history.record(sku, name, price, old, new)
+        if old != new:  # no-op edits are not recorded
+            states.append(state(cart))
+    problems = []
+    if len(history) != len(states) - 1:
+        problems.append(f"{len(history)} undo steps recorded for {len(states) - 1} changes")
+    step = len(states) - 1
+    while history.undo(cart):
+        step -= 1
+        if state(cart) != states[step]:
+            problems.append(f"undo to step {step} does not restore that cart")
+            break
+    if cart:
+        problems.append(f"cart still has {len(cart)} lines after undoing everything")
+    while history.redo(cart):
+        pass
+    if state(cart) != states[-1]:
+        problems.append("redoing everything does not restore the final cart")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Undo history memory benchmark")
+    parser.add_argument("--scans", type=int, default=5000)
+    parser.add_argument("--lines", type=int, default=150)
+    parser.add_argument("--tolerance", type=float, default=0.05,
+                        help="allowed peak growth of the delta history when the edits double")
+    args = parser.parse_args()
+
+    print(f"{'edits':>8} {'snapshots':>14} {'deltas':>12} {'delta peak':>12}   ({args.lines} distinct SKUs)")
+    peaks = {}
+    for count in (args.scans // 10, args.scans // 2, args.scans):
+        snap, _ = measure(count, args.lines, snapshots=True)
+        delta, peaks[count] = measure(count, args.lines, snapshots=False)
+        print(f"{count:>8} {snap / 1024:>11.0f} KB {delta / 1024:>9.0f} KB {peaks[count] / 1024:>9.0f} KB")
+
+    problems = []
+    depth = UndoHistory()._undo.maxlen
+    half, full = peaks[args.scans // 2], peaks[args.scans]
+    if args.scans // 2 < depth:
+        print(f"note: --scans under {2 * depth} never fills the undo stack; memory check skipped")
+    elif full > half * (1 + args.tolerance) + 4096:  # 4 KB: allocator noise
+        problems.append(f"delta history peak grew from {half / 1024:.0f} KB to {full / 1024:.0f} KB "
+                        f"when the edits doubled")
+    problems += check_round_trip(2000, args.lines)
+    for problem in problems:
+        print("FAIL:", problem)
+    print("memory flat, undo/redo round trip:", "FAIL" if problems else "ok")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
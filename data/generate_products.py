@@ -1,6 +1,30 @@
+# generate_products.py
+# Synthetic catalog and transaction history generator.
+# With no arguments it appends 215 random items to ./products.json, as it
+# always has. With --fresh it streams a new data set of any size into a
+# directory: products, a sales history (journal format) and returns, as the
+# JSON files or as an SQLite pos.db. Records are produced and written in
+# chunks, so millions of products or sales never sit in memory as dicts.
+# Sampling is vectorized with numpy when it is installed and falls back to
+# the random module otherwise; --seed makes a run reproducible (per backend).
+#
+#   python generate_products.py                       # append 215 items
+#   python generate_products.py --fresh --products 1000000 --sales 5000000 \
+#       --returns 50000 --format sqlite --out /tmp/big --seed 7
+
 import random
 from datetime import datetime, timedelta
+from itertools import accumulate
+from pathlib import Path
+import argparse
+import bisect
 import json
+import sys
+
+try:
+    import numpy as np
+except ImportError:  # optional, only makes generation faster
+    np = None
 
 # Category mapping based on ID range
 id_category_map = {
@@ -35,95 +59,342 @@ price_ranges = {
     "Automotive": (4.00, 90.00)
 }
 
-# Function to generate a random date between April 2025 and September 2025
-def random_date():
-    start_date = datetime(2025, 4, 1)
-    end_date = datetime(2025, 9, 30)
-    delta = end_date - start_date
-    random_days = random.randint(0, delta.days)
-    return (start_date + timedelta(days=random_days)).strftime("%Y-%m-%d")
-
-# Function to distribute total_items randomly across categories
-def distribute_items(total_items, num_categories=7):
-    base_count = 1
-    remaining_items = total_items - num_categories * base_count
-    counts = [base_count] * num_categories
-    for _ in range(remaining_items):
-        counts[random.randint(0, num_categories - 1)] += 1
-    return counts
+# Shipment dates fall between April 2025 and September 2025
+SHIP_START = datetime(2025, 4, 1)
+SHIP_DAYS = (datetime(2025, 9, 30) - SHIP_START).days
+CHUNK = 50000  # records sampled per vectorized batch
+
+
+class Sampler:
+    """Batch random sampling: numpy when available, the random module otherwise."""
+
+    def __init__(self, seed=None, use_numpy: bool = True):
+        self.numpy = use_numpy and np is not None
+        if self.numpy:
+            self.rng = np.random.default_rng(seed)
+        else:
+            # unseeded runs share the global generator, so random.seed() still applies
+            self.rng = random.Random(seed) if seed is not None else random
+
+    def uniform(self, low: float, high: float, n: int) -> list:
+        """n prices in [low, high), rounded to cents."""
+        if self.numpy:
+            return np.round(self.rng.uniform(low, high, n), 2).tolist()
+        return [round(self.rng.uniform(low, high), 2) for _ in range(n)]
+
+    def integers(self, low: int, high: int, n: int) -> list:
+        """n integers in [low, high] (inclusive, like random.randint)."""
+        if self.numpy:
+            return self.rng.integers(low, high + 1, n).tolist()
+        return [self.rng.randint(low, high) for _ in range(n)]
+
+    def random(self, n: int) -> list:
+        if self.numpy:
+            return self.rng.random(n).tolist()
+        return [self.rng.random() for _ in range(n)]
+
+    def geometric(self, p: float, cap: int, n: int) -> list:
+        """n counts >= 1, mostly small (1 + failures before success), capped."""
+        if self.numpy:
+            return np.minimum(self.rng.geometric(p, n), cap).tolist()
+        out = []
+        for _ in range(n):
+            k = 1
+            while k < cap and self.rng.random() > p:
+                k += 1
+            out.append(k)
+        return out
+
+    def weighted(self, cum_weights, n: int) -> list:
+        """n indexes drawn with the given cumulative weights."""
+        if self.numpy:
+            return np.searchsorted(cum_weights, self.rng.random(n) * cum_weights[-1], side="right").tolist()
+        total = cum_weights[-1]
+        return [bisect.bisect_right(cum_weights, self.rng.random() * total) for _ in range(n)]
+
+    def sample(self, population: int, k: int) -> list:
+        """k distinct integers from range(population)."""
+        if self.numpy:
+            return self.rng.choice(population, k, replace=False).tolist()
+        return self.rng.sample(range(population), k)
+
+    def category_counts(self, total: int, categories: int) -> list:
+        """Spread `total` over the categories at random, at least one each."""
+        base = [1] * categories
+        remaining = max(total - categories, 0)
+        if self.numpy:
+            extra = self.rng.multinomial(remaining, [1 / categories] * categories).tolist()
+        else:
+            extra = [0] * categories
+            for _ in range(remaining):
+                extra[self.rng.randrange(categories)] += 1
+        return [b + e for b, e in zip(base, extra)]
+
+
+class UniqueNames:
+    """Hands out "Name", "Name (v2)", "Name (v3)"... per category in O(1)."""
+
+    def __init__(self, used_names=()):
+        self._next = {}  # (category, base name) -> next version number
+        for key in used_names:  # "category:name"
+            category, _, name = key.partition(":")
+            base, version = name, 1
+            if name.endswith(")") and " (v" in name:
+                head, _, tail = name.rpartition(" (v")
+                if tail[:-1].isdigit():
+                    base, version = head, int(tail[:-1])
+            slot = (category, base)
+            self._next[slot] = max(self._next.get(slot, 1), version + 1)
+
+    def get(self, base_name: str, category: str) -> str:
+        slot = (category, base_name)
+        version = self._next.get(slot, 1)
+        self._next[slot] = version + 1
+        return base_name if version == 1 else f"{base_name} (v{version})"
 
-# Function to generate a unique name
-def get_unique_name(base_name, category, used_names):
-    if f"{category}:{base_name}" not in used_names:
-        return base_name
-    version = 2
-    while True:
-        new_name = f"{base_name} (v{version})"
-        if f"{category}:{new_name}" not in used_names:
-            return new_name
-        version += 1
-
-# Load existing data and find last ID per category
-try:
-    with open("products.json", "r") as f:
-        existing_data = json.load(f)
-except FileNotFoundError:
-    existing_data = {}
 
 # Find the last ID for each category and track used names
-last_ids = {prefix: 0 for prefix in id_category_map.keys()}
-used_names = set()  # Format: "category:name"
-for item_id, item in existing_data.items():
-    prefix = item_id[0]
-    if prefix in id_category_map:
-        last_ids[prefix] = max(last_ids[prefix], int(item_id))
-        used_names.add(f"{item['category']}:{item['name']}")
-
-# User-specified total number of new items
-total_items = 215  # Change this to your desired total
-
-# Generate random distribution
-category_counts = distribute_items(total_items)
-print("Category distribution:", dict(zip(id_category_map.values(), category_counts)))
-
-# Generate new items, appending to existing data
-new_items = {}
-for category_prefix, count in zip(id_category_map.keys(), category_counts):
-    category = id_category_map[category_prefix]
-    current_id = last_ids[category_prefix]  # Start from last ID in this category
-    for _ in range(count):
-        current_id += 1
-        item_id = str(current_id)
-        base_name = random.choice(item_names[category])
-        name = get_unique_name(base_name, category, used_names)
-        used_names.add(f"{category}:{name}")
+def scan_existing(existing_data):
+    last_ids = {prefix: 0 for prefix in id_category_map.keys()}
+    used_names = set()  # Format: "category:name"
+    for item_id, item in existing_data.items():
+        prefix = item_id[0]
+        if prefix in id_category_map:
+            last_ids[prefix] = max(last_ids[prefix], int(item_id))
+            used_names.add(f"{item['category']}:{item['name']}")
+    return last_ids, used_names
+
+
+def iter_products(total_items, sampler, last_ids=None, names=None, counts=None):
+    """Yield (sku, item) for `total_items` new products, category by category in ID order."""
+    last_ids = last_ids or {}
+    names = names or UniqueNames()
+    counts = counts or sampler.category_counts(total_items, len(id_category_map))
+    # one ID width for every category keeps the keys in numeric order
+    width = max(3, len(str(max(counts) + 10)))
+    for category_prefix, count in zip(id_category_map.keys(), counts):
+        category = id_category_map[category_prefix]
+        current_id = last_ids.get(category_prefix, 0)  # Start from last ID in this category
+        if not current_id: # empty category: keep the prefix digit, e.g. 1011, 2011...
+            current_id = int(category_prefix) * 10 ** width + 10
+        bases = item_names[category]
         price_min, price_max = price_ranges[category]
-        price = round(random.uniform(price_min, price_max), 2)
-        stock = random.randint(10, 300)
-        if random.random() < 0.2:  # 20% chance of "no shipment"
-            next_ship = "no shipment"
-            next_ship_qty = 0
-        else:
-            next_ship = random_date()
-            next_ship_qty = random.randint(0, 500)
-        
-        new_items[item_id] = {
-            "category": category,
-            "name": name,
-            "price": price,
-            "stock": stock,
-            "next_ship": next_ship,
-            "next_ship_qty": next_ship_qty
-        }
-
-# Combine existing and new items
-combined_data = {**existing_data, **new_items}
-
-# Sort the combined data by ID (ascending order)
-sorted_data = dict(sorted(combined_data.items(), key=lambda x: int(x[0])))
-
-# Write sorted data back to products.json
-with open("products.json", "w") as f:
-    json.dump(sorted_data, f, indent=2)
-
-print(f"Appended {total_items} new items to 'products.json'. New total items: {len(sorted_data)}.")
\ No newline at end of file
+        for start in range(0, count, CHUNK):
+            n = min(CHUNK, count - start)
+            base_idx = sampler.integers(0, len(bases) - 1, n)
+            prices = sampler.uniform(price_min, price_max, n)
+            stocks = sampler.integers(10, 300, n)
+            no_ship = sampler.random(n)  # 20% chance of "no shipment"
+            ship_days = sampler.integers(0, SHIP_DAYS, n)
+            ship_qty = sampler.integers(0, 500, n)
+            for i in range(n):
+                current_id += 1
+                if no_ship[i] < 0.2:
+                    next_ship, next_ship_qty = "no shipment", 0
+                else:
+                    next_ship = (SHIP_START + timedelta(days=ship_days[i])).strftime("%Y-%m-%d")
+                    next_ship_qty = ship_qty[i]
+                yield str(current_id), {
+                    "category": category,
+                    "name": names.get(bases[base_idx[i]], category),
+                    "price": prices[i],
+                    "stock": stocks[i],
+                    "next_ship": next_ship,
+                    "next_ship_qty": next_ship_qty
+                }
+
+
+# Generate total_items new items after the ones in existing_data
+def generate_items(total_items, existing_data=None, sampler=None):
+    last_ids, used_names = scan_existing(existing_data or {})
+    sampler = sampler or Sampler(use_numpy=False)
+    counts = sampler.category_counts(total_items, len(id_category_map))
+    print("Category distribution:", dict(zip(id_category_map.values(), counts)))
+    return dict(iter_products(total_items, sampler, last_ids, UniqueNames(used_names), counts))
+
+# Combine existing and new items, sorted by ID (ascending order)
+def merge_items(existing_data, new_items):
+    combined_data = {**existing_data, **new_items}
+    return dict(sorted(combined_data.items(), key=lambda x: int(x[0])))
+
+
+class HistoryGenerator:
+    """Streams sales (and the returns against them) for a generated catalog.
+
+    SKU popularity follows a Zipf-like curve, most sales have a few lines of
+    quantity 1-2, and sales are spread over store hours (8:00-20:00) of the
+    date range in increasing ID/date order.
+    """
+
+    OPEN_HOUR, HOURS = 8, 12
+
+    def __init__(self, sampler, sales: int, returns: int, start: datetime, days: int):
+        self.sampler = sampler
+        self.count = sales
+        self.start = start
+        self.days = max(days, 1)
+        self.returned = set(sampler.sample(sales, min(returns, sales))) if sales else set()
+        self.returns = []
+        self.skus, self.names, self.prices = [], [], []
+
+    def track(self, products):
+        """Pass products through while remembering what sales can sell."""
+        for sku, item in products:
+            self.skus.append(sku)
+            self.names.append(item["name"])
+            self.prices.append(item["price"])
+            yield sku, item
+
+    def _popularity(self):
+        n = len(self.skus)
+        order = self.sampler.sample(n, n)  # random rank for every product
+        if self.sampler.numpy:
+            weights = np.empty(n)
+            weights[order] = 1.0 / np.arange(1, n + 1) ** 1.1
+            return np.cumsum(weights)
+        weights = [0.0] * n
+        for rank, idx in enumerate(order, 1):
+            weights[idx] = 1.0 / rank ** 1.1
+        return list(accumulate(weights))
+
+    def sales(self):
+        """Yield sale records in journal format, oldest first."""
+        if not self.count or not self.skus:
+            return
+        cum = self._popularity()
+        span = self.days * self.HOURS * 3600  # seconds the store is open
+        for chunk_start in range(0, self.count, CHUNK):
+            n = min(CHUNK, self.count - chunk_start)
+            # this chunk's slice of the date range, so the stream stays in date order
+            lo = span * chunk_start // self.count
+            hi = max(span * (chunk_start + n) // self.count - 1, lo)
+            offsets = sorted(self.sampler.integers(lo, hi, n))
+            lines = self.sampler.geometric(0.45, 12, n)
+            picks = self.sampler.weighted(cum, sum(lines))
+            qtys = self.sampler.geometric(0.7, 10, len(picks))
+            return_delay = self.sampler.integers(0, 13, n)
+            pos = 0
+            for i in range(n):
+                day, sec = divmod(offsets[i], self.HOURS * 3600)
+                when = self.start + timedelta(days=day, seconds=self.OPEN_HOUR * 3600 + sec)
+                items, seen = [], set()
+                for j in range(pos, pos + lines[i]):
+                    idx = picks[j]
+                    if idx in seen:
+                        continue
+                    seen.add(idx)
+                    price = self.prices[idx]
+                    items.append({"sku": self.skus[idx], "name": self.names[idx], "quantity": qtys[j],
+                                  "price": price, "total": round(price * qtys[j], 2)})
+                pos += lines[i]
+                sale = {"id": chunk_start + i + 1, "date": when.strftime("%Y-%m-%d %H:%M:%S"),
+                        "items": items, "total": round(sum(item["total"] for item in items), 2)}
+                if chunk_start + i in self.returned:
+                    sale["locked"] = True
+                    self._add_return(sale, when + timedelta(days=return_delay[i]))
+                yield sale
+
+    def _add_return(self, sale: dict, when: datetime) -> None:
+        item = sale["items"][0]
+        self.returns.append({
+            "id": int(when.timestamp()),
+            "sale_id": sale["id"],
+            "date": when.strftime("%Y-%m-%d %H:%M:%S"),
+            "items": [item],
+            "total_refund": item["total"]
+        })
+
+    def iter_returns(self):
+        """Returns for the sales generated so far, in date order (call after sales())."""
+        self.returns.sort(key=lambda r: r["date"])
+        return iter(self.returns)
+
+
+def write_json(out: Path, products, history: HistoryGenerator) -> dict:
+    """products.json, sales.jsonl (+ .next) and returns.json, written as they stream."""
+    counts = {"products": 0, "sales": 0, "returns": 0}
+    with open(out / "products.json", "w") as f:
+        f.write("{")
+        for sku, item in products:
+            f.write(",\n" if counts["products"] else "\n")
+            f.write(f"  {json.dumps(sku)}: {json.dumps(item)}")
+            counts["products"] += 1
+        f.write("\n}\n")
+    with open(out / "sales.jsonl", "w") as f:
+        for sale in history.sales():
+            f.write(json.dumps(sale) + "\n")
+            counts["sales"] += 1
+    (out / "sales.jsonl.next").write_text(str(counts["sales"] + 1))
+    (out / "sales.jsonl.idx").unlink(missing_ok=True)  # stale index, rebuilt on first use
+    with open(out / "returns.json", "w") as f:
+        f.write("[")
+        for record in history.iter_returns():
+            f.write(",\n" if counts["returns"] else "\n")
+            f.write("  " + json.dumps(record))
+            counts["returns"] += 1
+        f.write("\n]\n")
+    return counts
+
+
+def write_sqlite(out: Path, products, history: HistoryGenerator) -> dict:
+    """pos.db through SqliteStorage.bulk_load (one transaction, batched inserts)."""
+    sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+    from sqlite_store import SqliteStorage
+
+    def returns():  # sales are fully consumed before bulk_load reaches returns
+        yield from history.iter_returns()
+
+    store = SqliteStorage(out / "pos.db")
+    try:
+        return store.bulk_load(products, history.sales(), returns())
+    finally:
+        store.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic products, sales and returns")
+    parser.add_argument("--products", type=int, default=215)
+    parser.add_argument("--fresh", action="store_true",
+                        help="stream a new data set into --out instead of appending to products.json")
+    parser.add_argument("--sales", type=int, default=0, help="sales to generate (with --fresh)")
+    parser.add_argument("--returns", type=int, default=0, help="returned sales (with --fresh)")
+    parser.add_argument("--start", default="2025-04-01", help="first sale date")
+    parser.add_argument("--days", type=int, default=180, help="days of sales history")
+    parser.add_argument("--format", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--out", default=".", help="output directory")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--no-numpy", action="store_true", help="use the random module even if numpy is installed")
+    args = parser.parse_args(argv)
+
+    out = Path(args.out)
+    sampler = Sampler(args.seed, use_numpy=not args.no_numpy)
+
+    if not args.fresh:
+        if args.sales or args.returns or args.format != "json":
+            parser.error("--sales, --returns and --format sqlite need --fresh")
+        # Load existing data
+        try:
+            with open(out / "products.json", "r") as f:
+                existing_data = json.load(f)
+        except FileNotFoundError:
+            existing_data = {}
+        total_items = args.products
+        sorted_data = merge_items(existing_data, generate_items(total_items, existing_data, sampler))
+        # Write sorted data back to products.json
+        with open(out / "products.json", "w") as f:
+            json.dump(sorted_data, f, indent=2)
+        print(f"Appended {total_items} new items to 'products.json'. New total items: {len(sorted_data)}.")
+        return
+
+    out.mkdir(parents=True, exist_ok=True)
+    start = datetime.strptime(args.start, "%Y-%m-%d")
+    history = HistoryGenerator(sampler, args.sales, args.returns, start, args.days)
+    products = history.track(iter_products(args.products, sampler))
+    writer = write_sqlite if args.format == "sqlite" else write_json
+    counts = writer(out, products, history)
+    print(f"Wrote {counts['products']} products, {counts['sales']} sales and {counts['returns']} "
+          f"returns to {out} ({args.format}, {'numpy' if sampler.numpy else 'random'} sampling)")
+
+
+if __name__ == "__main__":
+    main()
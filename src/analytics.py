@@ -0,0 +1,361 @@
+# analytics.py
+# End-of-day sales reporting.
+# Sales lines and returned lines are loaded into columnar arrays (one
+# array per field, SKUs and categories dictionary-encoded as integer
+# codes) and aggregated with group-bys over any mix of day, hour, category
+# (joined from the catalog) and SKU. With NumPy installed the group-bys
+# are vectorized (np.unique + np.bincount); without it the same columns
+# are plain array.array buffers summed in one pass.
+# Refunds are counted on the day of the return, against the returned SKU.
+# The sale columns are cached next to the data (sales.jsonl.facts or
+# pos.db.facts) with the journal offset / sale ID they cover, so a report
+# only reads the sales made since the last one.
+#
+#   python src/analytics.py [--by category,hour] [--from 2025-04-01] [--to 2025-04-30]
+#       [--days 7] [--top 20] [--storage json|sqlite] [--data DIR]
+
+from array import array
+from datetime import datetime, timedelta
+from pathlib import Path
+import argparse
+import json
+import os
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:  # optional: the array fallback gives the same results
+    np = None
+
+from rollups import UNKNOWN_CATEGORY, refund_amount
+
+DIMENSIONS = ("day", "hour", "category", "sku")
+METRICS = ("gross", "refunds", "net", "units")
+
+
+def day_key(date: str) -> int:
+    """"YYYY-MM-DD[ HH:MM:SS]" -> YYYYMMDD as an int (sorts like the date)."""
+    return int(date[0:4]) * 10000 + int(date[5:7]) * 100 + int(date[8:10])
+
+
+def day_label(key: int) -> str:
+    return f"{key // 10000:04d}-{key // 100 % 100:02d}-{key % 100:02d}"
+
+
+class Codes:
+    """Dictionary encoding: value -> small int code, and back."""
+
+    def __init__(self):
+        self.index = {}
+        self.values = []
+
+    def code(self, value) -> int:
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class Facts:
+    """Line-level facts as parallel typed arrays."""
+
+    FIELDS = ("day", "hour", "sku", "units", "amount")
+
+    def __init__(self):
+        self.day = array("i")
+        self.hour = array("b")
+        self.sku = array("i")
+        self.units = array("i")
+        self.amount = array("d")
+
+    def __len__(self) -> int:
+        return len(self.day)
+
+    def tobytes(self) -> bytes:
+        return b"".join(getattr(self, name).tobytes() for name in self.FIELDS)
+
+    def frombytes(self, raw: bytes, count: int) -> None:
+        pos = 0
+        for name in self.FIELDS:
+            column = getattr(self, name)
+            size = count * column.itemsize
+            column.frombytes(raw[pos:pos + size])
+            pos += size
+
+    def append(self, day: int, hour: int, sku: int, units: int, amount: float) -> None:
+        self.day.append(day)
+        self.hour.append(hour)
+        self.sku.append(sku)
+        self.units.append(units)
+        self.amount.append(amount)
+
+
+class SalesData:
+    """Sales and returns of one store as columns, ready for group-bys."""
+
+    def __init__(self):
+        self.sales = Facts()
+        self.returns = Facts()
+        self.skus = Codes()
+        self.categories = Codes()
+        self.sku_category = array("i")  # sku code -> category code
+
+    # ----- loading -----
+
+    @classmethod
+    def load(cls, store=None) -> "SalesData":
+        """Read every sale and return from a storage backend (default: the shared one)."""
+        if store is None:
+            from storage import get_default_storage
+            store = get_default_storage()
+        data = cls()
+        if store.name == "sqlite":
+            data._load_sqlite(store)
+        elif hasattr(store, "journal"):
+            data._load_journal(store.journal.path)
+        else:
+            for sale in store.iter_sales():
+                data.add_sale(sale)
+        for record in store.iter_returns():
+            data.add_return(record)
+        data.join_categories(store.products())
+        return data
+
+    def _read_cache(self, cache: Path) -> dict:
+        """Load cached sale columns. Returns the cache header, {} if there is none."""
+        try:
+            with open(cache, "rb") as f:
+                header = json.loads(f.readline())
+                raw = f.read()
+            for sku in header["skus"]:
+                self.skus.code(sku)
+            self.sales.frombytes(raw, header["count"])
+            return header
+        except (FileNotFoundError, ValueError, KeyError):
+            return {}
+
+    def _write_cache(self, cache: Path, **header) -> None:
+        header.update(count=len(self.sales), skus=self.skus.values)
+        tmp = cache.with_name(f"{cache.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp, "wb") as f:
+                f.write(json.dumps(header).encode() + b"\n")
+                f.write(self.sales.tobytes())
+            os.replace(tmp, cache)
+        except OSError:
+            pass  # read-only data directory: just no cache
+
+    def _discard_cache(self) -> dict:
+        self.sales, self.skus = Facts(), Codes()
+        return {}
+
+    def _load_sqlite(self, store) -> None:
+        """Sale columns from the cache plus the sales inserted after it."""
+        cache = store.path.with_name(store.path.name + ".facts")
+        header = self._read_cache(cache)
+        max_id = header.get("max_id", 0)
+        with store._lock:
+            if header:
+                # same history up to max_id (not re-imported since)?
+                count = store.db.execute("SELECT COUNT(*) FROM sales WHERE id <= ?", (max_id,)).fetchone()[0]
+                if count != header["sales"]:
+                    header, max_id = self._discard_cache(), 0
+            rows = store.db.execute(
+                "SELECT substr(s.date, 1, 13), i.sku, i.quantity, i.total"
+                " FROM sale_items i JOIN sales s ON s.id = i.sale_id WHERE s.id > ?", (max_id,)
+            ).fetchall()
+            if not rows:
+                return
+            new_max, sales = store.db.execute("SELECT MAX(id), COUNT(*) FROM sales").fetchone()
+        stamps, skus, units, totals = zip(*rows)
+        # "YYYY-MM-DD HH" repeats a lot: parse each one once
+        parsed = {stamp: (day_key(stamp), int(stamp[11:13])) for stamp in set(stamps)}
+        code = self.skus.code
+        self.sales.day.extend([parsed[stamp][0] for stamp in stamps])
+        self.sales.hour.extend([parsed[stamp][1] for stamp in stamps])
+        self.sales.sku.extend([code(sku) for sku in skus])
+        self.sales.units.extend(units)
+        self.sales.amount.extend(totals)
+        self._write_cache(cache, max_id=new_max, sales=sales)
+
+    def _load_journal(self, path: Path) -> None:
+        """Sale columns from the cache plus the journal lines appended after it."""
+        header = self._read_cache(path.with_name(path.name + ".facts"))
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return
+        # same file (not migrated/replaced) and nothing cut off?
+        if header and (header["inode"] != st.st_ino or st.st_size < header["watermark"]):
+            header = self._discard_cache()
+        watermark, max_id = header.get("watermark", 0), header.get("max_id", 0)
+
+        start = watermark
+        with open(path, "rb") as f:
+            f.seek(watermark)
+            tail = f.read()
+        for line in tail.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break  # append still in flight
+            watermark += len(line)
+            try:
+                sale = json.loads(line)
+            except ValueError:
+                continue
+            if sale["id"] > max_id:  # lower IDs are later versions (e.g. "locked")
+                max_id = sale["id"]
+                self.add_sale(sale)
+        if watermark != start:
+            self._write_cache(path.with_name(path.name + ".facts"),
+                              inode=st.st_ino, watermark=watermark, max_id=max_id)
+
+    def add_sale(self, sale: dict) -> None:
+        date = sale["date"]
+        day, hour = day_key(date), int(date[11:13])
+        for item in sale["items"]:
+            self.sales.append(day, hour, self.skus.code(str(item["sku"])), item["quantity"], item["total"])
+
+    def add_return(self, record: dict) -> None:
+        date = record["date"]
+        day, hour = day_key(date), int(date[11:13])
+        for item in record["items"]:
+            self.returns.append(day, hour, self.skus.code(str(item["sku"])), item["quantity"], refund_amount(item))
+
+    def join_categories(self, products: dict) -> None:
+        """Map every SKU code to a category code (SKUs no longer in the catalog -> "(unknown)")."""
+        self.sku_category = array("i", (
+            self.categories.code(products[sku]["category"] if sku in products else UNKNOWN_CATEGORY)
+            for sku in self.skus.values
+        ))
+
+    # ----- group-by -----
+
+    def _labels(self, dim: str, key: int):
+        if dim == "day":
+            return day_label(key)
+        if dim == "category":
+            return self.categories.values[key]
+        if dim == "sku":
+            return self.skus.values[key]
+        return key
+
+    def group(self, by=("day",), start: str = None, end: str = None) -> list:
+        """Aggregate by the `by` dimensions, optionally within [start, end] ("YYYY-MM-DD").
+
+        Returns one dict per group, sorted by key: the dimension values plus
+        gross (sales), refunds, net (gross - refunds) and units (sold - returned).
+        """
+        by = tuple(by)
+        for dim in by:
+            if dim not in DIMENSIONS:
+                raise ValueError(f"Unknown dimension {dim!r} (use {', '.join(DIMENSIONS)})")
+        lo = day_key(start) if start else 0
+        hi = day_key(end) if end else 99999999
+        groups = self._group_numpy(by, lo, hi) if np is not None else self._group_python(by, lo, hi)
+        rows = []
+        for key, (gross, refunds, units) in sorted(groups.items()):
+            row = {dim: self._labels(dim, k) for dim, k in zip(by, key)}
+            row.update(gross=round(gross, 2), refunds=round(refunds, 2),
+                       net=round(gross - refunds, 2), units=units)
+            rows.append(row)
+        return rows
+
+    def _group_python(self, by: tuple, lo: int, hi: int) -> dict:
+        groups = {}
+        category = self.sku_category
+        for facts, slot, sign in ((self.sales, 0, 1), (self.returns, 1, -1)):
+            columns = [[category[s] for s in facts.sku] if dim == "category" else getattr(facts, dim)
+                       for dim in by]
+            keys = zip(*columns) if columns else iter(lambda: (), None)
+            for key, day, units, amount in zip(keys, facts.day, facts.units, facts.amount):
+                if lo <= day <= hi:
+                    entry = groups.get(key)
+                    if entry is None:
+                        entry = groups[key] = [0.0, 0.0, 0]
+                    entry[slot] += amount
+                    entry[2] += sign * units
+        return groups
+
+    def _group_numpy(self, by: tuple, lo: int, hi: int) -> dict:
+        category = np.frombuffer(self.sku_category, dtype=np.int32) if len(self.sku_category) else np.zeros(0, np.int32)
+        parts, gross, refunds, units = [], [], [], []
+        for facts, sign in ((self.sales, 1), (self.returns, -1)):
+            if not len(facts):
+                continue
+            day = np.frombuffer(facts.day, dtype=np.int32)
+            mask = (day >= lo) & (day <= hi)
+            sku = np.frombuffer(facts.sku, dtype=np.int32)[mask]
+            columns = {"day": day[mask], "hour": np.frombuffer(facts.hour, dtype=np.int8)[mask].astype(np.int32),
+                       "sku": sku, "category": category[sku]}
+            parts.append(np.stack([columns[dim] for dim in by], axis=1) if by else np.zeros((len(sku), 0), np.int32))
+            amount = np.frombuffer(facts.amount, dtype=np.float64)[mask]
+            zero = np.zeros(len(amount))
+            gross.append(amount if sign > 0 else zero)
+            refunds.append(zero if sign > 0 else amount)
+            units.append(sign * np.frombuffer(facts.units, dtype=np.int32)[mask].astype(np.int64))
+        if not parts or not sum(len(p) for p in parts):
+            return {}
+        keys = np.concatenate(parts)
+        uniq, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        sums = [np.bincount(inverse, weights=np.concatenate(w), minlength=len(uniq)) for w in (gross, refunds, units)]
+        return {
+            tuple(int(k) for k in key): (float(g), float(r), int(round(u)))
+            for key, g, r, u in zip(uniq, *sums)
+        }
+
+
+def format_table(rows: list, by: tuple) -> str:
+    headers = list(by) + list(METRICS)
+    cells = [[str(row[h]) if h not in ("gross", "refunds", "net") else f"{row[h]:.2f}" for h in headers]
+             for row in rows]
+    widths = [max([len(h)] + [len(c[i]) for c in cells]) for i, h in enumerate(headers)]
+    lines = ["  ".join(h.rjust(w) for h, w in zip(headers, widths))]
+    lines += ["  ".join(c.rjust(w) for c, w in zip(cell, widths)) for cell in cells]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sales report: revenue, refunds and units by day/hour/category/SKU")
+    parser.add_argument("--by", default="day", help=f"comma-separated dimensions from {', '.join(DIMENSIONS)}")
+    parser.add_argument("--from", dest="start", help="first day (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", help="last day (YYYY-MM-DD)")
+    parser.add_argument("--days", type=int, help="the last N days, today included")
+    parser.add_argument("--top", type=int, default=0, help="only the N rows with the highest net revenue")
+    parser.add_argument("--storage", default=None, help="json or sqlite (default: POS_STORAGE)")
+    parser.add_argument("--data", default=None, help="data directory (default: data/)")
+    args = parser.parse_args(argv)
+    if args.days:
+        args.start = (datetime.now() - timedelta(days=args.days - 1)).strftime("%Y-%m-%d")
+
+    from storage import get_storage
+    begin = time.perf_counter()
+    store = get_storage(args.storage, Path(args.data) if args.data else None)
+    data = SalesData.load(store)
+    loaded = time.perf_counter()
+    by = tuple(d.strip() for d in args.by.split(",") if d.strip())
+    try:
+        rows = data.group(by, args.start, args.end)
+    except ValueError as e:
+        parser.error(str(e))
+    done = time.perf_counter()
+    if args.top:
+        rows = sorted(rows, key=lambda r: r["net"], reverse=True)[:args.top]
+    print(format_table(rows, by))
+    total = {m: sum(r[m] for r in rows) for m in METRICS}
+    print(f"\n{len(rows)} groups, net ${total['net']:.2f} (gross ${total['gross']:.2f}, "
+          f"refunds ${total['refunds']:.2f}), {total['units']} units")
+    print(f"{len(data.sales)} sale lines, {len(data.returns)} returned lines; "
+          f"load {loaded - begin:.3f}s, group {done - loaded:.3f}s ({'numpy' if np is not None else 'array'})",
+          file=sys.stderr)
+    if hasattr(store, "close"):
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+# atomic.py
+# Crash-safe file replacement: write to a temp file in the same directory,
+# fsync it, then rename over the target. Readers see either the old or the
+# new contents, never a half-written file.
+
+from pathlib import Path
+import json
+import os
+
+
+def write_atomic(path: Path, text: str, fsync: bool = True, on_staged=None) -> None:
+    """Replace `path` with `text` via a temp file + rename.
+
+    `on_staged(tmp_path)` is called once the temp file is complete, just
+    before the rename (the file keeps its inode/mtime/size across it).
+    """
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        f.write(text)
+        f.flush()
+        if fsync:
+            os.fsync(f.fileno())
+    if on_staged is not None:
+        on_staged(tmp)
+    os.replace(tmp, path)
+
+
+def write_json_atomic(path: Path, data, indent: int = 2, fsync: bool = True, on_staged=None) -> None:
+    """json.dump `data` to `path` atomically."""
+    write_atomic(path, json.dumps(data, indent=indent), fsync=fsync, on_staged=on_staged)
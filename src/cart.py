@@ -0,0 +1,119 @@
+# cart.py
+# Cart keyed by SKU.
+# Lines live in an insertion-ordered dict, so add / set-quantity / remove /
+# lookup are O(1) and the display order is the scan order. The subtotal is
+# kept up to date on every change instead of being re-summed.
+
+class CartLine:
+    """One SKU in the cart."""
+
+    __slots__ = ("sku", "name", "price", "quantity")
+
+    def __init__(self, sku: str, name: str, price: float, quantity: int):
+        self.sku = sku
+        self.name = name
+        self.price = price
+        self.quantity = quantity
+
+    @property
+    def total(self) -> float:
+        return round(self.price * self.quantity, 2)
+
+    def to_dict(self) -> dict:
+        """The item shape used by save_sale and ReceiptGenerator."""
+        return {
+            "sku": self.sku,
+            "name": self.name,
+            "quantity": self.quantity,
+            "price": self.price,
+            "total": self.total
+        }
+
+    def __repr__(self) -> str:
+        return f"CartLine({self.sku!r}, {self.name!r}, {self.price!r}, {self.quantity!r})"
+
+
+class Cart:
+    """SKU-keyed cart with a cached subtotal."""
+
+    def __init__(self):
+        self._lines = {}
+        self._subtotal = 0.0
+
+    @classmethod
+    def from_items(cls, items: list) -> "Cart":
+        """Build a cart from a list of item dicts (as stored in a sale)."""
+        cart = cls()
+        for item in items:
+            cart.add(str(item["sku"]), item["name"], item["price"], item["quantity"])
+        return cart
+
+    # ----- queries -----
+
+    def get(self, sku: str):
+        return self._lines.get(sku)
+
+    def __contains__(self, sku: str) -> bool:
+        return sku in self._lines
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def __bool__(self) -> bool:
+        return bool(self._lines)
+
+    def __iter__(self):
+        return iter(self._lines.values())
+
+    @property
+    def subtotal(self) -> float:
+        return round(self._subtotal, 2)
+
+    def to_items(self) -> list:
+        """Serialize to the list of item dicts that save_sale expects."""
+        return [line.to_dict() for line in self._lines.values()]
+
+    # ----- changes -----
+
+    def add(self, sku: str, name: str, price: float, quantity: int = 1) -> CartLine:
+        """Add `quantity` of a SKU, merging with an existing line."""
+        line = self._lines.get(sku)
+        if line is None:
+            line = self._lines[sku] = CartLine(sku, name, price, 0)
+        line.quantity += quantity
+        self._subtotal += price * quantity
+        return line
+
+    def set_quantity(self, sku: str, quantity: int):
+        """Set a line's quantity (0 or less removes it). Returns the line or None."""
+        line = self._lines.get(sku)
+        if line is None:
+            return None
+        if quantity <= 0:
+            self.remove(sku)
+            return None
+        self._subtotal += line.price * (quantity - line.quantity)
+        line.quantity = quantity
+        return line
+
+    def put(self, sku: str, name: str, price: float, quantity: int):
+        """Make the line for `sku` hold exactly `quantity`, creating or removing it."""
+        if quantity <= 0:
+            self.remove(sku)
+            return None
+        if sku in self._lines:
+            return self.set_quantity(sku, quantity)
+        return self.add(sku, name, price, quantity)
+
+    def remove(self, sku: str):
+        """Remove a line. Returns the removed line or None."""
+        line = self._lines.pop(sku, None)
+        if line is not None:
+            self._subtotal -= line.total
+        if not self._lines:
+            self._subtotal = 0.0  # drop accumulated float drift
+        return line
+
+    def clear(self) -> None:
+        self._lines.clear()
+        self._subtotal = 0.0
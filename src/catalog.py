@@ -0,0 +1,106 @@
+# catalog.py
+# Process-wide product catalog.
+# products.json is parsed once and kept in memory; every lookup checks the
+# file's mtime/size/inode so edits made outside this process (another terminal,
+# a text editor, generate_products.py) are picked up on the next access.
+# With POS_CATALOG=compact the products are held column-wise in a
+# ProductTable (product_store.py) instead of a dict of dicts.
+
+from pathlib import Path
+import json
+import os
+import threading
+from atomic import write_atomic
+from product_store import COMPACT_CATALOG, ProductTable
+
+DATA_PATH = Path(__file__).parent.parent / "data"
+PRODUCTS_FILE = DATA_PATH / "products.json"
+
+
+class ProductCatalog:
+    """In-memory SKU -> product mapping backed by products.json."""
+
+    def __init__(self, path: Path = PRODUCTS_FILE, compact: bool = None):
+        self.path = Path(path)
+        self.compact = COMPACT_CATALOG if compact is None else compact
+        self.generation = 0  # bumped every time the in-memory data changes
+        self._products = ProductTable() if self.compact else {}
+        self._stamp = None  # (mtime_ns, size, inode) of the file we last loaded/wrote
+        self._lock = threading.RLock()
+        self.on_load = None  # called with the fresh dict after every reload
+
+    def _file_stamp(self, path: Path = None):
+        try:
+            st = os.stat(path or self.path)
+        except FileNotFoundError:
+            return None
+        # the inode changes on every atomic replace, even within one mtime tick
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    @property
+    def stamp(self):
+        """File stamp of the snapshot currently in memory."""
+        return self._stamp
+
+    def refresh(self, force: bool = False) -> bool:
+        """Reload products.json if it changed on disk. Returns True on reload."""
+        with self._lock:
+            stamp = self._file_stamp()
+            if not force and stamp == self._stamp:
+                return False
+            if stamp is None:
+                self._products = ProductTable() if self.compact else {}
+            elif self.compact:
+                self._products = ProductTable.load(self.path)
+            else:
+                with open(self.path, "r") as f:
+                    self._products = json.load(f)
+            self._stamp = stamp
+            if self.on_load is not None:
+                self.on_load(self._products)
+            self.generation += 1
+            return True
+
+    def products(self) -> dict:
+        """Return the shared SKU -> product mapping (reloaded if the file changed)."""
+        self.refresh()
+        return self._products
+
+    def get(self, sku, default=None):
+        """Look up a single product by SKU."""
+        return self.products().get(str(sku), default)
+
+    def __contains__(self, sku) -> bool:
+        return str(sku) in self.products()
+
+    def __len__(self) -> int:
+        return len(self.products())
+
+    def save(self, products: dict = None, on_staged=None) -> None:
+        """Atomically write the catalog back to products.json without forcing a re-parse."""
+        with self._lock:
+            if products is not None:
+                self._products = products
+            write_atomic(self.path, self._dumps(), on_staged=on_staged)
+            self._stamp = self._file_stamp()
+            self.generation += 1
+
+    def write_snapshot(self, on_staged=None) -> None:
+        """Write the in-memory data to products.json; the data itself is unchanged."""
+        with self._lock:
+            write_atomic(self.path, self._dumps(), on_staged=on_staged)
+            self._stamp = self._file_stamp()
+
+    def _dumps(self) -> str:
+        if isinstance(self._products, ProductTable):
+            return self._products.dumps(indent=2)
+        return json.dumps(self._products, indent=2)
+
+    def touch(self) -> None:
+        """Mark the in-memory data as changed (e.g. after an in-place stock edit)."""
+        with self._lock:
+            self.generation += 1
+
+
+# Shared instance used by every screen
+catalog = ProductCatalog()
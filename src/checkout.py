@@ -0,0 +1,174 @@
+# checkout.py
+# Headless checkout engine.
+# Everything a sale needs (SKU lookup, quantity rules, stock checks, undo,
+# the running total and the final commit) lives here instead of in
+# SalesScreen, so the screens only translate widget input into calls and
+# render the result, and the transaction path can be driven from scripts
+# and benchmarks without a terminal UI.
+#
+#   engine = CheckoutEngine()
+#   engine.scan("4012.2")          # or engine.add("4012", 2)
+#   engine.set_quantity("4012", 3)
+#   engine.undo()
+#   sale = engine.commit()         # stored sale dict; a new sale is opened
+#
+# Each engine is one checkout lane. Every quantity change reserves stock for
+# the lane in storage (scan-time, optimistic), so ten terminals selling the
+# same SKU can't sell more than is on the shelf; the holds are released when
+# the sale is voided or committed. The lane name comes from POS_LANE, or is
+# "<host>-<pid>".
+
+import os
+import socket
+
+from cart import Cart, CartLine
+from undo import UndoHistory
+from storage import get_default_storage
+
+
+class CheckoutError(Exception):
+    """A checkout action was rejected; the message is meant for the cashier."""
+
+
+class UnknownSku(CheckoutError):
+    """The scanned SKU is not in the catalog."""
+
+
+def parse_scan(text: str) -> tuple:
+    """Split scanner/keyboard input "SKU" or "SKU.QUANTITY" into (sku, quantity)."""
+    text = text.strip()
+    if not text:
+        raise CheckoutError("Please enter a SKU")
+    if '.' not in text:
+        return text, 1
+    try:
+        sku, quantity_str = text.split('.')
+        quantity = int(quantity_str)
+    except ValueError:
+        raise CheckoutError("Invalid quantity format (use SKU.QUANTITY)") from None
+    if quantity <= 0:
+        raise CheckoutError("Quantity must be positive")
+    return sku, quantity
+
+
+def default_lane() -> str:
+    return os.environ.get("POS_LANE") or f"{socket.gethostname()}-{os.getpid()}"
+
+
+class CheckoutEngine:
+    """One open sale: a Cart, its undo history and the storage it commits to."""
+
+    def __init__(self, store=None, lane: str = None):
+        self._storage = store  # None: the shared store, opened on first use
+        self.lane = lane or default_lane()
+        self.cart = Cart()
+        self.history = UndoHistory()
+        self._holds = True  # a previous run of this lane may have left holds behind
+
+    @property
+    def storage(self):
+        if self._storage is None:
+            self._storage = get_default_storage()
+        return self._storage
+
+    # ----- sale lifecycle -----
+
+    def open_sale(self) -> None:
+        """Start a new, empty sale (drops the current cart, its undo history and its stock holds)."""
+        self.cart.clear()
+        self.history.clear()
+        if self._holds:
+            self.storage.release(self.lane)
+            self._holds = False
+
+    @property
+    def total(self) -> float:
+        return self.cart.subtotal
+
+    def commit(self) -> dict:
+        """Deduct stock, record the sale and open a new one. Returns the stored sale."""
+        if not self.cart:
+            raise CheckoutError("Cart is empty")
+        sale = self.storage.commit_sale(self.cart.to_items(), self.cart.subtotal, lane=self.lane)
+        self._holds = False  # released by the commit
+        self.open_sale()
+        return sale
+
+    # ----- cart changes -----
+
+    def _record(self, line: CartLine, old_qty: int, new_qty: int) -> None:
+        self.history.record(line.sku, line.name, line.price, old_qty, new_qty)
+
+    def _reserve(self, sku: str, quantity: int) -> None:
+        """Hold `quantity` of `sku` for this lane, or raise if other lanes/stock don't allow it."""
+        available = self.storage.reserve(self.lane, sku, quantity)
+        if quantity > available:
+            raise CheckoutError(f"Only {available} available in stock")
+        self._holds = True
+
+    def add(self, sku, quantity: int = 1) -> CartLine:
+        """Add `quantity` of a SKU (merging with its line). Returns the cart line."""
+        sku = str(sku)
+        if quantity <= 0:
+            raise CheckoutError("Quantity must be positive")
+        item = self.storage.product(sku)
+        if item is None:
+            raise UnknownSku(f"SKU {sku} not found")
+        existing = self.cart.get(sku)
+        old_qty = existing.quantity if existing is not None else 0
+        self._reserve(sku, old_qty + quantity)
+        line = self.cart.add(sku, item["name"], item["price"], quantity)
+        self._record(line, old_qty, line.quantity)
+        return line
+
+    def scan(self, text: str) -> CartLine:
+        """Add from scanner/keyboard input ("SKU" or "SKU.QUANTITY")."""
+        return self.add(*parse_scan(text))
+
+    def set_quantity(self, sku, quantity: int) -> CartLine:
+        """Change a line's quantity, checking it against stock."""
+        sku = str(sku)
+        line = self.cart.get(sku)
+        if line is None:
+            raise CheckoutError(f"SKU {sku} is not in the cart")
+        if quantity <= 0:
+            raise CheckoutError("Quantity must be positive")
+        self._reserve(sku, quantity)
+        self._record(line, line.quantity, quantity)
+        return self.cart.set_quantity(sku, quantity)
+
+    def remove(self, sku) -> CartLine:
+        """Remove a line from the cart. Returns the removed line."""
+        sku = str(sku)
+        line = self.cart.get(sku)
+        if line is None:
+            raise CheckoutError(f"SKU {sku} is not in the cart")
+        self._record(line, line.quantity, 0)
+        self.storage.release(self.lane, sku)
+        return self.cart.remove(sku)
+
+    def undo(self):
+        """Revert the last change. Returns its CartDelta, or None."""
+        delta = self.history.undo(self.cart)
+        if delta is not None:
+            self._resync(delta, delta.old_qty, self.history.redo)
+        return delta
+
+    def redo(self):
+        """Re-apply the last undone change. Returns its CartDelta, or None."""
+        delta = self.history.redo(self.cart)
+        if delta is not None:
+            self._resync(delta, delta.new_qty, self.history.undo)
+        return delta
+
+    def _resync(self, delta, quantity: int, revert) -> None:
+        """Move the lane's hold to the line's restored quantity; roll back if stock is gone."""
+        try:
+            self._reserve(delta.sku, quantity)
+        except CheckoutError:
+            revert(self.cart)
+            raise
+
+
+# Shared engine: every SalesScreen and InventoryScreen's quick-add use the same sale
+checkout = CheckoutEngine()
@@ -0,0 +1,236 @@
+# forecast.py
+# Replenishment forecast: how fast each SKU sells, when it runs out, and
+# whether the shipment scheduled in products.json (next_ship /
+# next_ship_qty) arrives in time.
+# Sales velocity is an exponentially weighted moving average of units sold
+# per day over the last WINDOW days, so recent days count most (a day
+# HALF_LIFE days ago weighs half as much as today). Days with no sales
+# count as zero demand.
+# For every SKU:
+#   days_left        stock / velocity (inf when it does not sell)
+#   days_after_ship  days the stock lasts counting the scheduled shipment
+#   reorder_point    units needed to cover LEAD_TIME days of sales
+#   status           "short"   runs out before its next shipment arrives
+#                    "reorder" no shipment scheduled and stock is at or
+#                              below the reorder point
+#                    "ok"
+# The whole catalog is computed in one batch over the analytics.py columns
+# (vectorized with NumPy when installed) and cached until the next commit.
+#
+#   python src/forecast.py [--all] [--lead-time 7] [--half-life 14]
+#       [--storage json|sqlite] [--data DIR]
+
+from array import array
+from datetime import date, datetime, timedelta
+from pathlib import Path
+import argparse
+import math
+import os
+import sys
+import threading
+import time
+
+from analytics import SalesData, day_key, np
+
+HALF_LIFE = 14   # days
+WINDOW = 120     # days of history used; older sales weigh under 0.3%
+LEAD_TIME = int(os.environ.get("POS_LEAD_TIME", "7"))  # days from reorder to delivery
+STATUSES = ("ok", "reorder", "short")
+
+
+def ship_in_days(product: dict, today: date):
+    """Days until the product's next shipment, or None if none is scheduled (or it is overdue)."""
+    try:
+        ship = datetime.strptime(product.get("next_ship") or "", "%Y-%m-%d").date()
+    except ValueError:
+        return None  # "no shipment", None, ...
+    days = (ship - today).days
+    return days if days >= 0 and product.get("next_ship_qty", 0) > 0 else None
+
+
+class Forecast:
+    """Per-SKU forecast columns for one catalog snapshot, in catalog order."""
+
+    def __init__(self, skus: list, stock, velocity, days_left, days_after_ship, ship_days,
+                 reorder_point, status, today: date):
+        self.skus = skus
+        self.index = {sku: row for row, sku in enumerate(skus)}
+        self.stock = stock
+        self.velocity = velocity
+        self.days_left = days_left
+        self.days_after_ship = days_after_ship
+        self.ship_days = ship_days  # None: no shipment scheduled
+        self.reorder_point = reorder_point
+        self.status = status
+        self.today = today
+
+    def __len__(self) -> int:
+        return len(self.skus)
+
+    def _row(self, row: int) -> dict:
+        days_left = self.days_left[row]
+        return {
+            "sku": self.skus[row],
+            "stock": self.stock[row],
+            "velocity": round(self.velocity[row], 3),
+            "days_left": days_left,
+            "stockout": None if math.isinf(days_left) else
+                        (self.today + timedelta(days=int(days_left))).strftime("%Y-%m-%d"),
+            "ship_days": self.ship_days[row],
+            "days_after_ship": self.days_after_ship[row],
+            "reorder_point": self.reorder_point[row],
+            "status": self.status[row],
+        }
+
+    def get(self, sku):
+        row = self.index.get(str(sku))
+        return None if row is None else self._row(row)
+
+    def at_risk(self) -> list:
+        """SKUs flagged "short" or "reorder", soonest stock-out first."""
+        rows = [row for row, status in enumerate(self.status) if status != "ok"]
+        rows.sort(key=lambda row: self.days_left[row])
+        return [self._row(row) for row in rows]
+
+
+class Forecaster:
+    """Computes forecasts for a store's whole catalog and caches them until the next commit."""
+
+    def __init__(self, half_life: float = HALF_LIFE, window: int = WINDOW, lead_time: float = LEAD_TIME):
+        self.half_life = half_life
+        self.window = window
+        self.lead_time = lead_time
+        self._lock = threading.Lock()
+        self._key = None
+        self._forecast = None
+
+    def forecast(self, store=None) -> Forecast:
+        """The forecast for `store` (default: the shared one), recomputed only after commits."""
+        if store is None:
+            from storage import get_default_storage
+            store = get_default_storage()
+        with self._lock:
+            # read before computing: a commit made meanwhile invalidates the result
+            key = (id(store), store.generation, date.today())
+            if key != self._key:
+                self._forecast = self.compute(store, key[2])
+                self._key = key
+            return self._forecast
+
+    def day_weights(self, today: date) -> dict:
+        """YYYYMMDD -> EWMA weight for each day in the window; the weights sum to 1."""
+        decay = 0.5 ** (1 / self.half_life)
+        norm = (1 - decay) / (1 - decay ** self.window)
+        return {
+            day_key((today - timedelta(days=age)).strftime("%Y-%m-%d")): norm * decay ** age
+            for age in range(self.window)
+        }
+
+    def compute(self, store, today: date = None) -> Forecast:
+        today = today or date.today()
+        products = store.products()
+        skus = list(products)
+        data = SalesData.load(store)
+        weights = self.day_weights(today)
+        stock = [products[sku]["stock"] for sku in skus]
+        ship_days = [ship_in_days(products[sku], today) for sku in skus]
+        ship_qty = [products[sku].get("next_ship_qty", 0) for sku in skus]
+        codes = [data.skus.index.get(sku, -1) for sku in skus]
+        if np is not None:
+            columns = self._project_numpy(data, weights, codes, stock, ship_days, ship_qty)
+        else:
+            columns = self._project_python(data, weights, codes, stock, ship_days, ship_qty)
+        velocity, days_left, days_after_ship, reorder_point, status = columns
+        return Forecast(skus, stock, velocity, days_left, days_after_ship, ship_days,
+                        reorder_point, status, today)
+
+    def _project_python(self, data: SalesData, weights: dict, codes: list, stock: list,
+                        ship_days: list, ship_qty: list) -> tuple:
+        per_code = array("d", bytes(8 * (len(data.skus) + 1)))  # last slot: never sold
+        facts = data.sales
+        for day, sku, units in zip(facts.day, facts.sku, facts.units):
+            weight = weights.get(day)
+            if weight is not None:
+                per_code[sku] += weight * units
+        velocity, days_left, days_after_ship, reorder_point, status = [], [], [], [], []
+        for code, units, ship, qty in zip(codes, stock, ship_days, ship_qty):
+            v = per_code[code]
+            left = units / v if v > 0 else math.inf
+            short = ship is not None and left < ship
+            velocity.append(v)
+            days_left.append(left)
+            days_after_ship.append((units + qty) / v if v > 0 and ship is not None and not short else left)
+            reorder_point.append(math.ceil(v * self.lead_time))
+            status.append("short" if short else
+                          "reorder" if ship is None and v > 0 and units <= reorder_point[-1] else "ok")
+        return velocity, days_left, days_after_ship, reorder_point, status
+
+    def _project_numpy(self, data: SalesData, weights: dict, codes: list, stock: list,
+                       ship_days: list, ship_qty: list) -> tuple:
+        per_code = np.zeros(len(data.skus) + 1)  # last slot: never sold
+        if len(data.sales):
+            day = np.frombuffer(data.sales.day, dtype=np.int32)
+            mask = day >= min(weights)
+            days, inverse = np.unique(day[mask], return_inverse=True)
+            day_weight = np.array([weights.get(int(d), 0.0) for d in days])
+            units = np.frombuffer(data.sales.units, dtype=np.int32)[mask]
+            sku = np.frombuffer(data.sales.sku, dtype=np.int32)[mask]
+            per_code[:-1] = np.bincount(sku, weights=day_weight[inverse.reshape(-1)] * units,
+                                        minlength=len(data.skus))
+        v = per_code[np.array(codes, dtype=np.int64)]
+        units = np.array(stock, dtype=np.float64)
+        ship = np.array([math.nan if s is None else s for s in ship_days], dtype=np.float64)
+        qty = np.array(ship_qty, dtype=np.float64)
+        selling = v > 0
+        safe_v = np.where(selling, v, 1.0)
+        left = np.where(selling, units / safe_v, np.inf)
+        scheduled = ~np.isnan(ship)
+        short = scheduled & (left < np.nan_to_num(ship, nan=np.inf))
+        after = np.where(selling & scheduled & ~short, (units + qty) / safe_v, left)
+        reorder_point = np.ceil(v * self.lead_time).astype(np.int64)
+        reorder = ~scheduled & selling & (units <= reorder_point)
+        status = np.where(short, "short", np.where(reorder, "reorder", "ok"))
+        return v.tolist(), left.tolist(), after.tolist(), reorder_point.tolist(), status.tolist()
+
+
+# Shared instance (its cache is keyed by the store it is asked about)
+forecaster = Forecaster()
+
+
+def format_days(days: float) -> str:
+    return "-" if days is None or math.isinf(days) else f"{days:.1f}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sales velocity and stock-out forecast per SKU")
+    parser.add_argument("--all", action="store_true", help="every SKU, not only those at risk")
+    parser.add_argument("--lead-time", type=float, default=LEAD_TIME, help="days from reorder to delivery")
+    parser.add_argument("--half-life", type=float, default=HALF_LIFE, help="EWMA half-life in days")
+    parser.add_argument("--storage", default=None, help="json, sqlite or remote (default: POS_STORAGE)")
+    parser.add_argument("--data", default=None, help="data directory (default: data/)")
+    args = parser.parse_args(argv)
+
+    from storage import get_storage
+    store = get_storage(args.storage, Path(args.data) if args.data else None)
+    begin = time.perf_counter()
+    forecast = Forecaster(args.half_life, lead_time=args.lead_time).forecast(store)
+    elapsed = time.perf_counter() - begin
+    rows = [forecast.get(sku) for sku in forecast.skus] if args.all else forecast.at_risk()
+    products = store.products()
+    print(f"{'SKU':>6}  {'Name':<28} {'Stock':>6} {'Per day':>8} {'Days left':>9} "
+          f"{'Ship in':>7} {'After ship':>10} {'Reorder at':>10}  Status")
+    for row in rows:
+        ship = "-" if row["ship_days"] is None else str(row["ship_days"])
+        print(f"{row['sku']:>6}  {products[row['sku']]['name'][:28]:<28} {row['stock']:>6} "
+              f"{row['velocity']:>8.3f} {format_days(row['days_left']):>9} {ship:>7} "
+              f"{format_days(row['days_after_ship']):>10} {row['reorder_point']:>10}  {row['status']}")
+    counts = {s: forecast.status.count(s) for s in STATUSES}
+    print(f"\n{len(forecast)} SKUs: {counts['short']} short before their shipment, "
+          f"{counts['reorder']} to reorder", file=sys.stderr)
+    print(f"computed in {elapsed:.3f}s ({'numpy' if np is not None else 'array'})", file=sys.stderr)
+    if hasattr(store, "close"):
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,19 +7,50 @@ from textual.containers import Vertical, Horizontal
 from textual.reactive import reactive
 from textual.binding import Binding
 from textual import events, on
+from textual.message import Message
 from pathlib import Path
-import json
+from itertools import islice
+from functools import partial
+import math
 from rich.text import Text
 from sales import SalesScreen
+from storage import get_default_storage
+from lazy_table import LazyDataTable
+from search_index import search_index
+from checkout import CheckoutError, checkout
+from forecast import forecaster
+from stock_alerts import stock_watch
 
 
 DATA_PATH = Path(__file__).parent.parent / "data"
 PRODUCTS_FILE = DATA_PATH / "products.json"
 
 def get_inventory():
-    """Retrieve the current inventory from products.json."""
-    with open(PRODUCTS_FILE, "r") as f:
-        return json.load(f)
+    """Retrieve the current inventory from the storage backend."""
+    return get_default_storage().products()
+
+class LowStock(Message, bubble=False):
+    """Stock alert events from stock_alerts.StockWatch (safe to post from any thread)."""
+
+    def __init__(self, alerts: list) -> None:
+        super().__init__()
+        self.alerts = alerts
+
+def outlook_cell(outlook) -> Text:
+    """Days of stock left (forecast.py): red if it runs out before its shipment, yellow to reorder."""
+    if outlook is None:
+        return Text("")
+    days = outlook["days_left"]
+    text = "-" if math.isinf(days) else f"{days:.0f}d"
+    return Text(text, style={"short": "bold red", "reorder": "yellow"}.get(outlook["status"], ""))
+
+def inventory_row(item_id: str, item: dict, outlook: dict = None) -> tuple:
+    """Table cells for one product."""
+    return (
+        item_id, item["category"], item["name"], f"${item['price']:.2f}",
+        str(item["stock"]), item.get("next_ship", "N/A"), str(item.get("next_ship_qty", 0)),
+        outlook_cell(outlook)
+    )
 
         
 class InventoryScreen(Screen):
@@ -35,6 +66,8 @@ class InventoryScreen(Screen):
         Binding("2", "full_view", "Toggle Full/Paginated View"),  # Updated description
         Binding("ctrl+d", "focus_search", "Focus Search", priority=True),
         Binding("a", "add_to_cart", "Add to Cart (A)"),
+        Binding("r", "reorder_list", "Reorder List (R)"),
+        Binding("l", "low_stock", "Low Stock (L)"),
         Binding("up", "focus_table", "Focus Table", show=False),
         Binding("down", "focus_table", "Focus Table", show=False),
         
@@ -43,14 +76,56 @@ class InventoryScreen(Screen):
     page = reactive(1)
     page_size = 35  # Number of items per page
     is_full_view = reactive(False)  # New reactive variable to track full view state
-    current_inventory = reactive({})  # Track currently displayed inventory
+    current_inventory = {}  # Currently displayed inventory (plain attribute: no O(n) reactive compare)
     selected_item_id = reactive(None)  # Track selected item ID
+    forecast = None  # forecast.Forecast, computed in the background
+    is_filtered = False  # showing search results / the reorder list
+    showing_low = False  # the low-stock list, kept current by stock alert events
     
     temp_message = reactive("", init=False)  # Temporary message for status updates
     
     def on_mount(self)-> None:
         """Initialize the screen and set up the inventory table."""
         self.update_table()
+        self.index_search(get_inventory())
+        stock_watch.subscribe(self.stock_events)
+
+    def on_unmount(self) -> None:
+        stock_watch.unsubscribe(self.stock_events)
+
+    def stock_events(self, alerts: list) -> None:
+        self.post_message(LowStock(alerts))
+
+    def on_low_stock(self, message: LowStock) -> None:
+        """A commit changed the low-stock list: redraw it if it is showing."""
+        if self.showing_low:
+            self.action_low_stock()
+
+    def on_screen_resume(self) -> None:
+        """Refresh the stock-out forecast (a no-op unless sales were made since)."""
+        self.run_worker(self.load_forecast, thread=True, exclusive=True, group="forecast")
+
+    def index_search(self, inventory) -> None:
+        """Start indexing `inventory` in the background unless that is done or underway."""
+        if search_index.needs_build(inventory):
+            self.run_worker(partial(search_index.build, inventory), thread=True, group="search-index")
+
+    def load_forecast(self) -> None:
+        forecast = forecaster.forecast(get_default_storage())
+        if forecast is not self.forecast:
+            # alert at the reorder point when it is above the default threshold
+            stock_watch.set_thresholds(dict(zip(forecast.skus, forecast.reorder_point)), get_default_storage().products())
+            self.app.call_from_thread(self.show_forecast, forecast)
+
+    def show_forecast(self, forecast) -> None:
+        self.forecast = forecast
+        if self.showing_low:
+            self.action_low_stock()
+        else:
+            self.update_table(self.current_inventory if self.is_filtered else None, filtered=self.is_filtered)
+
+    def outlook(self, item_id: str):
+        return self.forecast.get(item_id) if self.forecast is not None else None
     
     def watch_temp_message(self, message: str) -> None:
         """Handle temporary message updates."""
@@ -70,8 +145,7 @@ class InventoryScreen(Screen):
             item_count = len(self.current_inventory)
             self.status.update(f"[yellow]Showing {item_count} items (Full View)[/yellow]")
         else:
-            items = list(self.current_inventory.items())
-            item_count = len(items)
+            item_count = len(self.current_inventory)
             page_count = (item_count + self.page_size - 1) // self.page_size
             start_index = (self.page - 1) * self.page_size
             end_index = min(start_index + self.page_size, item_count)
@@ -175,8 +249,8 @@ class InventoryScreen(Screen):
     """
 
     def compose(self) -> ComposeResult:
-        self.table = DataTable()
-        self.table.add_columns("ID", "Category", "Name", "Price", "Stock", "Next Shipment", "Incoming Stock")
+        self.table = LazyDataTable()
+        self.table.add_columns("ID", "Category", "Name", "Price", "Stock", "Next Shipment", "Incoming Stock", "Runs Out")
         self.table.zebra_stripes = True
         self.table.cursor_type = "row"
         self.status = Static("", classes="status")
@@ -190,6 +264,8 @@ class InventoryScreen(Screen):
  [b]Select Items[/b]: Up/Down Arrow Keys 
  [b]Full Inventory View[/b]: Toggle with "2" 
  [b]Add to Cart[/b]: "A" after selecting an item               
+ [b]Reorder List[/b]: "R" (red: runs out before its shipment)
+ [b]Low Stock[/b]: "L" (updates as sales are made)
  [b]Search by Page[/b]: "P", page number and Enter
  [b]Back to Main Menu[/b]: F3 
 ─────────────────────────────""",
@@ -215,6 +291,10 @@ class InventoryScreen(Screen):
                             self.add_to_cart_btn,
                             Button("Full View\n(2)", id="full"),
                         ),
+                        Horizontal(
+                            Button("Reorder\n(R)", id="reorder"),
+                            Button("Low Stock\n(L)", id="low-stock"),
+                        ),
                         Horizontal(
                             Button("Help\n(F1)", id="help"),       
                         ),
@@ -239,37 +319,32 @@ class InventoryScreen(Screen):
         """Update the table with inventory data, either paginated or filtered."""
         inventory = inventory or get_inventory()
         self.current_inventory = inventory
+        self.is_filtered = filtered
+        self.showing_low = False
         
         #clear existing rows
         self.table.clear()
         
         # Add columns to the table
         if filtered or self.is_full_view:
-            for i, ii in inventory.items():
-                self.table.add_row(
-                    i, ii["category"], ii["name"], f"${ii['price']:.2f}",
-                    str(ii["stock"]), ii.get("next_ship", "N/A"), str(ii.get("next_ship_qty", 0)),
-                    key=i # Use the item ID as the key for the row
-                )
+            # rows are materialized lazily as the table scrolls (item ID is the row key)
+            self.table.set_source((i, inventory_row(i, ii, self.outlook(i))) for i, ii in inventory.items())
             #disable next and previous page buttons when in full view/ filtered search
             self.query_one("#prev", Button).disabled = True
             self.query_one("#next", Button).disabled = True
             self.status.update(f"[yellow]Showing {len(inventory)} items (Full View)[/yellow]")
         else:
             # page/item indexing calculations
-            items = list(inventory.items())
-            item_count = len(items)
+            item_count = len(inventory)
             page_count = (item_count + self.page_size - 1) // self.page_size
             start_index = (self.page - 1) * self.page_size
             end_index = min(start_index + self.page_size, item_count)
             
             # Add rows to the table for the current page
             if start_index < item_count and self.page > 0:
-                for item_id, item in items[start_index:end_index]:
-                    self.table.add_row(
-                        item_id, item["category"], item["name"], f"${item['price']:.2f}",
-                        str(item["stock"]), item.get("next_ship", "N/A"), str(item.get("next_ship_qty", 0)), key=item_id
-                    )
+                # walk to the page instead of copying the whole catalog
+                for item_id, item in islice(inventory.items(), start_index, end_index):
+                    self.table.add_row(*inventory_row(item_id, item, self.outlook(item_id)), key=item_id)
                 self.status.update(f"[yellow]Showing items {start_index + 1}-{end_index} of {item_count} (Page {self.page}/{page_count})[/yellow]")
                 
                 if self.page == 1:# Disable previous button on first page
@@ -308,48 +383,17 @@ class InventoryScreen(Screen):
         self.handle_row_selected(event) 
 
     def action_add_to_cart(self) -> None:
-        """Add selected item to cart with proper screen initialization."""
+        """Add one of the selected item to the open sale (the sales screen shows it on return)."""
         if not self.selected_item_id:
             self.temp_message = "[red]No item selected![/red]"
             return
         
         try:
-            # Avoid circular import
-            from sales import SalesScreen
-            sales_screen = self.app.get_screen("SalesScreen")
-            
-            # Verify we can access the screen's widgets
-            if not hasattr(sales_screen, 'query_one'):
-                raise AttributeError("SalesScreen not properly initialized")
-            
-            # Get the input_sku widget - wait for it to be available
-            input_sku = None
-            for _ in range(5):  # Try a few times
-                input_sku = sales_screen.query_one("#sku-input", Input)
-                if input_sku:
-                    break
-                self.app.process_events()  # Allow the screen to process events
-            
-            #debug
-            if not input_sku:
-                raise AttributeError("Could not find SKU input field in SalesScreen")
-            
-            # debug
-            if not hasattr(sales_screen, 'add_item'):
-                raise AttributeError("SalesScreen missing add_item method")
-            
-            # Prepare input
-            selected_item = self.current_inventory[self.selected_item_id]
-            sku_input = f"{self.selected_item_id}.1"  # Default quantity of 1
-            
-            # Set the input and trigger add_item
-            input_sku.value = sku_input
-            sales_screen.add_item()
-            
-            self.temp_message = f"[green]Added {selected_item['name']} to cart[/green]"
-            
-        except Exception as e:
-            self.temp_message(f"[red]Error adding to cart: {str(e)}[/red]")
+            line = checkout.add(self.selected_item_id, 1)
+        except CheckoutError as e:
+            self.temp_message = f"[red]Error adding to cart: {e}[/red]"
+            return
+        self.temp_message = f"[green]Added {line.name} to cart[/green]"
 
     def on_button_pressed(self, event: Button.Pressed):
         """Handle button presses for navigation."""
@@ -372,6 +416,10 @@ class InventoryScreen(Screen):
             self.update_table()
         elif event.button.id == "add-to-cart":
             self.action_add_to_cart()
+        elif event.button.id == "reorder":
+            self.action_reorder_list()
+        elif event.button.id == "low-stock":
+            self.action_low_stock()
 
         
 
@@ -404,23 +452,56 @@ class InventoryScreen(Screen):
                     self.status.update("[red]Invalid page number![/red]")
                 self.search_input.placeholder = "Search by ID, name, or category (Enter to search)"
             else:
-                try: 
-                    sku = int(search_term)
-                    filtered = {k: v for k, v in inventory.items() if int(k) == sku}
-                except ValueError:
-                    filtered = {
-                        k: v for k, v in inventory.items()
-                        if search_term in v["name"].lower() or search_term in v["category"].lower()
-                    }
-                if filtered: #update if filtered is found
-                    self.update_table(filtered, filtered=True)
-                else:
-                    self.status.update("[red]No items found![/red]")
+                self.show_search_results(search_term)
             
             #reset and refocus search bar after input submission
             self.search_input.value = ""
             self.search_input.focus()
 
+    def show_search_results(self, search_term: str) -> None:
+        """Filter the table through the prebuilt search index (exact SKU or ranked name/category)."""
+        inventory = get_inventory()
+        self.index_search(inventory)  # a reloaded catalog: searched by the old index until it is built
+        filtered = {sku: inventory[sku] for sku in search_index.search(inventory, search_term)}
+        if filtered: #update if filtered is found
+            self.update_table(filtered, filtered=True)
+        else:
+            self.status.update("[red]No items found![/red]")
+
+    @on(Input.Changed, "#search")
+    def search_as_you_type(self, event: Input.Changed) -> None:
+        """Live-filter while typing; Enter still handles paging and full view."""
+        search_term = event.value.strip().lower()
+        if len(search_term) < 2 or "page number" in self.search_input.placeholder:
+            return # leave the table alone (this also covers the reset after Enter)
+        self.show_search_results(search_term)
+
+    def action_reorder_list(self) -> None:
+        """Show SKUs that run out before their next shipment or need reordering, soonest first."""
+        if self.forecast is None:
+            self.temp_message = "[yellow]Forecast still loading...[/yellow]"
+            return
+        inventory = get_inventory()
+        at_risk = {row["sku"]: inventory[row["sku"]] for row in self.forecast.at_risk() if row["sku"] in inventory}
+        if not at_risk:
+            self.status.update("[green]Nothing is forecast to run out[/green]")
+            return
+        self.update_table(at_risk, filtered=True)
+        self.status.update(f"[yellow]{len(at_risk)} items run out before their shipment or need reordering[/yellow]")
+
+    def action_low_stock(self) -> None:
+        """Show the low-stock watch list, furthest below its threshold first."""
+        alerts = stock_watch.alerts()
+        inventory = get_inventory()
+        low = {sku: inventory[sku] for sku, _, _ in alerts if sku in inventory}
+        if not low:
+            self.update_table()
+            self.status.update("[green]No items are low on stock[/green]")
+        else:
+            self.update_table(low, filtered=True)
+            self.status.update(f"[yellow]{len(low)} items at or below their reorder point[/yellow]")
+        self.showing_low = True
+
     def action_page_mode(self):
         """Enter page selection mode."""
         self.search_input.value = ""
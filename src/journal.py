@@ -0,0 +1,269 @@
+# journal.py
+# Append-only sales journal.
+# Each sale is one JSON object per line in data/sales.jsonl, appended and
+# fsync'd on checkout, so a sale costs O(1) disk work instead of rewriting
+# the whole history. A later line with the same "id" supersedes the earlier
+# one (used to mark a sale "locked" after a return).
+# The next sale ID lives in a small sidecar file (sales.jsonl.next), and
+# lookups by ID, date or SKU go through a ReceiptIndex (sales.jsonl.idx).
+#
+#   python src/journal.py migrate    # one-time import of data/sales.json
+
+from pathlib import Path
+from datetime import datetime
+import json
+import os
+import sys
+import threading
+from receipt_index import ReceiptIndex
+from atomic import write_atomic as _write_atomic
+
+DATA_PATH = Path(__file__).parent.parent / "data"
+SALES_FILE = DATA_PATH / "sales.json"
+SALES_JOURNAL = DATA_PATH / "sales.jsonl"
+
+
+class SalesJournal:
+    """JSON Lines sale log with a sidecar next-ID counter."""
+
+    def __init__(self, path: Path = SALES_JOURNAL, legacy_path: Path = SALES_FILE, fsync: bool = True):
+        self.path = Path(path)
+        self.fsync_each = fsync  # False: appends reach the OS now and the disk on fsync()
+        self.legacy_path = Path(legacy_path)
+        self.id_path = self.path.with_name(self.path.name + ".next")
+        self.index = ReceiptIndex(self.path)
+        self._next_id = None
+        self._lock = threading.RLock()
+
+    # ----- setup / recovery -----
+
+    def _open(self) -> None:
+        """Migrate legacy data and recover the next ID on first use."""
+        if self._next_id is not None:
+            return
+        if not self.path.exists():
+            self.migrate()
+        self._recover()
+
+    def _recover(self) -> None:
+        """Drop a torn trailing line and make sure the ID counter is ahead of it."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.touch(exist_ok=True)
+        last = None
+        with open(self.path, "rb+") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size:
+                f.seek(max(size - 65536, 0))
+                tail = f.read()
+                if not tail.endswith(b"\n"):
+                    # power loss mid-append: discard the partial record
+                    cut = tail.rfind(b"\n") + 1
+                    f.truncate(size - len(tail) + cut)
+                    tail = tail[:cut]
+                lines = tail.splitlines()
+                if lines:
+                    try:
+                        last = json.loads(lines[-1])
+                    except json.JSONDecodeError:
+                        last = None
+
+        try:
+            next_id = int(self.id_path.read_text().strip())
+        except (FileNotFoundError, ValueError):
+            next_id = max((s.get("id", 0) for s in self._latest()), default=0) + 1
+        if last and last.get("id", 0) >= next_id:
+            next_id = last["id"] + 1
+        self._next_id = next_id
+        _write_atomic(self.id_path, str(next_id))
+
+    def migrate(self) -> int:
+        """Import data/sales.json into the journal. Returns the number of sales."""
+        try:
+            with open(self.legacy_path, "r") as f:
+                sales = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            sales = []
+        body = "".join(json.dumps(sale) + "\n" for sale in sales)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        _write_atomic(self.path, body)
+        self.index.invalidate()
+        next_id = max((s.get("id", 0) for s in sales), default=0) + 1
+        _write_atomic(self.id_path, str(next_id))
+        self._next_id = None
+        return len(sales)
+
+    # ----- writes -----
+
+    def _append_line(self, record: dict) -> None:
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def append_sale(self, items: list, total: float, date: str = None) -> dict:
+        """Assign the next sale ID, append the sale and return the stored record."""
+        return self.append_sales([(items, total)], date)[0]
+
+    def append_sales(self, orders: list, date: str = None) -> list:
+        """Append several (items, total) sales with one write and one fsync."""
+        with self._lock:
+            self._open()
+            date = date or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            sales = [
+                {"id": self._next_id + n, "date": date, "items": items, "total": total}
+                for n, (items, total) in enumerate(orders)
+            ]
+            # bump the counter first: a crash in between leaves a gap in the
+            # IDs rather than two sales sharing one
+            self._next_id += len(sales)
+            _write_atomic(self.id_path, str(self._next_id), fsync=self.fsync_each)
+            with open(self.path, "a") as f:
+                f.write("".join(json.dumps(sale) + "\n" for sale in sales))
+                f.flush()
+                if self.fsync_each:
+                    os.fsync(f.fileno())
+            self.index.catch_up()
+            return sales
+
+    def fsync(self) -> None:
+        """Force appends made without fsync (fsync_each=False) onto the disk."""
+        with self._lock:
+            try:
+                fd = os.open(self.path, os.O_RDONLY)
+            except FileNotFoundError:
+                return
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def sync(self) -> None:
+        """Pick up sale IDs handed out by other processes sharing the journal.
+
+        Call while holding the data-directory lock, right before append_sale.
+        """
+        with self._lock:
+            self._open()
+            try:
+                on_disk = int(self.id_path.read_text().strip())
+            except (FileNotFoundError, ValueError):
+                return
+            self._next_id = max(self._next_id, on_disk)
+
+    def sales_after(self, sale_id: int) -> list:
+        """Sales with an ID above `sale_id`, including ones other processes appended."""
+        with self._lock:
+            self.sync()
+            self.index.catch_up()
+            found = (self.index.read(i) for i in range(sale_id + 1, self._next_id))
+            return [sale for sale in found if sale is not None]  # gaps: crash before append
+
+    def update(self, sale: dict) -> None:
+        """Append a new version of an existing sale (e.g. with "locked": True)."""
+        with self._lock:
+            self._open()
+            self._append_line(sale)
+            self.index.catch_up()
+
+    # ----- reads -----
+
+    def _iter_records(self):
+        try:
+            f = open(self.path, "r")
+        except FileNotFoundError:
+            return
+        with f:
+            for line in f:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn write, skipped
+
+    def _latest(self) -> list:
+        latest = {}
+        for record in self._iter_records():
+            latest[record.get("id")] = record
+        return list(latest.values())
+
+    def iter_sales(self):
+        """Yield the latest version of every sale, in order of first appearance."""
+        with self._lock:
+            self._open()
+        return iter(self._latest())
+
+    def read_sales(self) -> list:
+        """Latest version of every sale, read as the files are (sales.json if there is
+        no journal yet): no migration, torn-line repair or ID counter is written."""
+        if self.path.exists():
+            return self._latest()
+        try:
+            with open(self.legacy_path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+
+    def find(self, sale_id):
+        """Return the latest version of a sale by ID, or None."""
+        with self._lock:
+            self._open()
+            return self.index.read(sale_id)
+
+    def search(self, sku=None, start: str = None, end: str = None) -> list:
+        """Sales containing `sku` (optional) dated within [start, end]."""
+        with self._lock:
+            self._open()
+            return self.index.search(sku, start, end)
+
+    def iter_between(self, start: str = None, end: str = None):
+        """Yield sales dated within [start, end] one at a time, oldest first."""
+        with self._lock:
+            self._open()
+            offsets = [self.index.offsets[i] for i in self.index.ids_between(start, end)]
+        if not offsets:
+            return
+        # the journal is append-only, so the offsets stay valid while we read
+        with open(self.path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                yield json.loads(f.readline())
+
+    def last(self):
+        """Return the most recently completed sale, or None."""
+        with self._lock:
+            self._open()
+            last_id = self._next_id - 1
+            sale = self.index.read(last_id) if last_id > 0 else None
+            if sale is None and self.index.max_id:
+                # the newest ID can be a gap: a lane took it and crashed before appending
+                sale = self.index.read(self.index.max_id)
+            return sale
+
+    def checkpoint_index(self) -> bool:
+        """Save the receipt index if it is due; the file is written outside the lock."""
+        with self._lock:
+            if not self.index.checkpoint_due():
+                return False
+            snapshot = self.index.snapshot()
+        self.index.write(snapshot)
+        return True
+
+    def next_id(self) -> int:
+        with self._lock:
+            self._open()
+            return self._next_id
+
+
+# Shared instance used by the sales, receipt and returns screens
+journal = SalesJournal()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["migrate"]:
+        if journal.path.exists():
+            print(f"{journal.path} already exists; remove it to re-import.")
+        else:
+            count = journal.migrate()
+            print(f"Imported {count} sales from {journal.legacy_path} into {journal.path}")
+    else:
+        print("usage: python src/journal.py migrate")
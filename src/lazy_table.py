@@ -0,0 +1,64 @@
+# lazy_table.py
+# DataTable that materializes rows on demand.
+# Instead of add_row() for every product up front, the table is given a row
+# iterator and only pulls enough rows to fill the viewport plus a small
+# overscan. More rows are pulled as the cursor or the scroll position gets
+# near the end of what has been loaded, so opening a 50k-SKU view costs the
+# same as opening a 50-SKU one.
+
+from itertools import islice
+
+from textual.widgets import DataTable
+
+
+class LazyDataTable(DataTable):
+    """DataTable fed lazily from an iterator of (key, row_cells) pairs."""
+
+    overscan = 20  # rows loaded beyond the bottom of the viewport
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._source = None
+        self._loaded = 0
+
+    def clear(self, columns: bool = False):
+        """Clear rows and drop any pending row source."""
+        self._source = None
+        self._loaded = 0
+        return super().clear(columns)
+
+    def set_source(self, rows) -> None:
+        """Show the rows produced by an iterator of (key, cells) pairs."""
+        self.clear()
+        self._source = iter(rows)
+        self._fill_to(self._viewport_rows() + self.overscan)
+
+    def _viewport_rows(self) -> int:
+        # before the first layout the table has no height; assume full screen
+        height = self.scrollable_content_region.height
+        return height if height > 0 else max(self.app.size.height, 1)
+
+    def _fill_to(self, wanted: int) -> None:
+        """Materialize rows until at least `wanted` are loaded (or the source ends)."""
+        if self._source is None or self._loaded >= wanted:
+            return
+        requested = wanted - self._loaded
+        added = 0
+        for key, cells in islice(self._source, requested):
+            self.add_row(*cells, key=key)
+            added += 1
+        self._loaded += added
+        if added < requested:
+            self._source = None  # exhausted
+
+    def _ensure_visible(self, row: int) -> None:
+        if self._source is not None and row + self.overscan >= self._loaded:
+            self._fill_to(row + self._viewport_rows() + self.overscan)
+
+    def watch_cursor_coordinate(self, old_coordinate, new_coordinate) -> None:
+        super().watch_cursor_coordinate(old_coordinate, new_coordinate)
+        self._ensure_visible(new_coordinate.row)
+
+    def watch_scroll_y(self, old_value: float, new_value: float) -> None:
+        super().watch_scroll_y(old_value, new_value)
+        self._ensure_visible(int(new_value) + self.scrollable_content_region.height)
@@ -4,10 +4,9 @@ from textual.widgets import Static, Input, Button, DataTable
 from textual.screen import Screen
 from textual.reactive import reactive
 from textual.binding import Binding
+from textual.message import Message
 from textual import events
 from pathlib import Path
-import json
-from datetime import datetime
 import pyfiglet
 from inventory import *  # inventory viewing logic is in inventory.py
 from rich.text import Text
@@ -15,26 +14,26 @@ from textual import on
 from sales import *  # sales logic is in sales.py
 from returns import *  # returns logic is in returns.py
 from returns import ReturnsScreen
+from reports import ReportsScreen
+from storage import get_default_storage
+from stock_alerts import stock_watch
 
 DATA_PATH = Path(__file__).parent.parent / "data"
 PRODUCTS_FILE = DATA_PATH / "products.json"
 SALES_FILE = DATA_PATH / "sales.json"
 
 def load_inventory():
-    with open(PRODUCTS_FILE) as f:
-        return json.load(f)
+    return get_default_storage().products()
 
 def save_sale(items, total):
-    with open(SALES_FILE) as f:
-        sales = json.load(f)
-    sale = {
-        "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "items": items,
-        "total": total
-    }
-    sales.append(sale)
-    with open(SALES_FILE, "w") as f:
-        json.dump(sales, f, indent=2)
+    return get_default_storage().commit_sale(items, total)["id"]
+
+class SaveFailed(Message, bubble=False):
+    """A background write of the data files failed; it is retried (posted from the write-behind thread)."""
+
+    def __init__(self, error: Exception) -> None:
+        super().__init__()
+        self.error = error
 
 class IntroScreen(Screen):
     BINDINGS = [Binding("f3", "app.pop_screen", "Back"),
@@ -72,8 +71,8 @@ class Menu(Screen):
         Binding("2", "goto_inventory", "View Inventory"),
         Binding("3", "goto_returns", "Go to Returns"),
         Binding("4", "receipt_search", "Search Receipt"),
-        
-        Binding("5", "quit", "Exit"),
+        Binding("5", "reports", "Reports"),
+        Binding("6", "quit", "Exit"),
         Binding("f1", "help", "Help"),
         Binding("f3", "back", "Back")
     ]
@@ -86,7 +85,8 @@ class Menu(Screen):
                 Button("2. View Inventory", id="inventory"),
                 Button("3. Returns", id="returns"),
                 Button("4. Search Receipt", id="receipt"),
-                Button("5. Exit", id="exit"),
+                Button("5. Reports", id="reports"),
+                Button("6. Exit", id="exit"),
                 id="menu"
             )
         )
@@ -101,6 +101,8 @@ class Menu(Screen):
             self.app.push_screen(ReturnsScreen())  # Transition to ReturnsScreen
         elif btn_id == "receipt":
             self.app.push_screen(ReceiptSearchScreen())
+        elif btn_id == "reports":
+            self.app.push_screen(ReportsScreen())
         elif btn_id == "exit":
             self.app.exit()
         
@@ -111,6 +113,7 @@ class Menu(Screen):
     def action_help(self): self.app.push_screen(HelpScreen())
     def action_back(self): self.app.pop_screen()
     def action_receipt_search(self): self.app.push_screen(ReceiptSearchScreen())
+    def action_reports(self): self.app.push_screen(ReportsScreen())
 
 
 class HelpScreen(Screen):
@@ -120,7 +123,9 @@ class HelpScreen(Screen):
             "  [green]1[/green] - Go to Sales\n"
             "  [green]2[/green] - View Inventory\n"
             "  [green]3[/green] - Go to Returns\n"
-            "  [green]4[/green] - Exit App\n"
+            "  [green]4[/green] - Search Receipt\n"
+            "  [green]5[/green] - Reports\n"
+            "  [green]6[/green] - Exit App\n"
             "  [green]F1[/green] - Help Menu (Anywhere)\n"
             "  [green]F3[/green] - Go Back (Universal)\n"
         )
@@ -199,6 +204,42 @@ class POSApp(App):
         
         self.push_screen(IntroScreen())
 
+        # low-stock alerts are pushed as sales and returns commit (stock_alerts.py)
+        stock_watch.attach(get_default_storage())
+        stock_watch.subscribe(self.stock_events)
+        if hasattr(get_default_storage(), "on_flush_error"):
+            get_default_storage().on_flush_error = lambda error: self.post_message(SaveFailed(error))
+
+    def stock_events(self, alerts):
+        self.post_message(LowStock(alerts))
+
+    def on_low_stock(self, message):
+        """Pop up a notice when an item drops to its reorder point or sells out."""
+        alerts = [e for e in message.alerts if e["kind"] in ("low", "out")]
+        if len(alerts) > 3:
+            self.notify(f"{len(alerts)} items dropped to their reorder point (Inventory, L)",
+                        title="Low stock", severity="warning")
+            return
+        for event in alerts:
+            product = get_default_storage().product(event["sku"])
+            name = product["name"] if product else event["sku"]
+            if event["kind"] == "out":
+                self.notify(f"{name} is out of stock", title="Low stock", severity="error")
+            else:
+                self.notify(f"{name}: {event['stock']} left", title="Low stock", severity="warning")
+
+    def on_save_failed(self, message):
+        self.notify(f"Could not save products.json ({message.error}); retrying in the background",
+                    title="Storage", severity="error", timeout=10)
+
+    def on_unmount(self):
+        stock_watch.unsubscribe(self.stock_events)
+        if hasattr(get_default_storage(), "on_flush_error"):
+            get_default_storage().on_flush_error = None
+        # an unfinished sale is abandoned: give its reserved stock back to the other lanes
+        from checkout import checkout
+        checkout.open_sale()
+
 if __name__ == "__main__":
     app = POSApp()
     app.run()
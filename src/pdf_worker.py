@@ -0,0 +1,8 @@
+# pdf_worker.py
+# Main module of the PDF pool's worker processes (see receipt_pdf.py).
+# A spawned worker re-imports its parent's __main__ before it runs any job;
+# PdfRenderPool starts workers with this module standing in for it, so they
+# load ReportLab and the receipt renderers instead of the whole app (Textual,
+# every screen and the storage backends).
+
+import receipt_pdf  # noqa: F401  (the jobs: render_pdf, receipt_cache.render_cached, ...)
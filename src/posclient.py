@@ -0,0 +1,160 @@
+# posclient.py
+# Client side of the inventory daemon (posd.py).
+# RemoteStorage has the same methods as JsonStorage/SqliteStorage, so the
+# screens and CheckoutEngine use it unchanged: start the daemon once per
+# store and run every terminal with POS_STORAGE=remote.
+#   POS_SERVER=/path/to/posd.sock or POS_SERVER=127.0.0.1:8765
+#   (default: data/posd.sock, 127.0.0.1:8765 on Windows)
+# The catalog is cached in the terminal; refreshing it only transfers the
+# stock levels that changed since the last refresh.
+
+import itertools
+import json
+import socket
+import threading
+
+from posd import default_address, parse_address
+from storage import SaleLocked
+from rollups import check_dimension
+
+
+class RemoteError(Exception):
+    """The daemon rejected a request; the message is the daemon-side error."""
+
+
+class PosClient:
+    """One connection to posd. Thread-safe: requests are sent one at a time."""
+
+    def __init__(self, address: str = None, timeout: float = 30):
+        self.address = address or default_address()
+        self.timeout = timeout
+        self._sock = None
+        self._file = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _connect(self) -> None:
+        kind, *where = parse_address(self.address)
+        if kind == "tcp":
+            sock = socket.create_connection(tuple(where), timeout=self.timeout)
+        else:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(where[0])
+        self._sock = sock
+        self._file = sock.makefile("rb")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._sock is not None:
+                self._file.close()
+                self._sock.close()
+                self._sock = self._file = None
+
+    def call(self, op: str, **args):
+        """Send one request and wait for its reply."""
+        request = {"id": next(self._ids), "op": op, "args": args}
+        with self._lock:
+            if self._sock is None:
+                self._connect()
+            try:
+                self._sock.sendall(json.dumps(request).encode() + b"\n")
+                line = self._file.readline()
+            except OSError:
+                self._sock = self._file = None  # reconnect on the next call
+                raise
+            if not line:
+                self._sock = self._file = None
+                raise ConnectionError(f"posd at {self.address} closed the connection")
+        reply = json.loads(line)
+        if "error" in reply:
+            if reply.get("type") == "SaleLocked":
+                raise SaleLocked(reply["error"])
+            raise RemoteError(reply["error"])
+        return reply["result"]
+
+
+class RemoteStorage:
+    """Storage backend that forwards everything to the daemon."""
+
+    name = "remote"
+
+    def __init__(self, address: str = None, client: PosClient = None):
+        self.client = client or PosClient(address)
+        self._products = {}
+        self._epoch = None
+        self._version = -1
+        self.on_stock_change = None  # called with (products, changed SKUs or None for all)
+
+    def close(self) -> None:
+        self.client.close()
+
+    # ----- products -----
+
+    def products(self) -> dict:
+        """SKU -> product dict; the same dict is patched in place between refreshes."""
+        reply = self.client.call("products", since=self._version, epoch=self._epoch)
+        if "products" in reply:
+            self._products = reply["products"]
+            changed = None
+        else:
+            changed = [sku for sku in reply["stock"] if sku in self._products]
+            for sku in changed:
+                self._products[sku]["stock"] = reply["stock"][sku]
+        self._epoch, self._version = reply["epoch"], reply["version"]
+        if self.on_stock_change is not None and (changed is None or changed):
+            self.on_stock_change(self._products, changed)
+        return self._products
+
+    def product(self, sku):
+        return self.client.call("product", sku=str(sku))
+
+    @property
+    def generation(self):
+        self.products()
+        return (self._epoch, self._version)
+
+    # ----- reservations -----
+
+    def reserve(self, lane: str, sku, quantity: int) -> int:
+        return self.client.call("reserve", lane=lane, sku=str(sku), quantity=quantity)
+
+    def release(self, lane: str, sku=None) -> None:
+        self.client.call("release", lane=lane, sku=None if sku is None else str(sku))
+
+    # ----- sales -----
+
+    def commit_sale(self, items: list, total: float, lane: str = None) -> dict:
+        return self.client.call("commit_sale", items=items, total=total, lane=lane)
+
+    def find_sale(self, sale_id):
+        return self.client.call("find_sale", sale_id=sale_id)
+
+    def last_sale(self):
+        return self.client.call("last_sale")
+
+    def search_sales(self, sku=None, start: str = None, end: str = None) -> list:
+        return self.client.call("search_sales", sku=sku, start=start, end=end)
+
+    def iter_sales(self):
+        return iter(self.client.call("iter_sales"))
+
+    def iter_sales_between(self, start: str = None, end: str = None):
+        return iter(self.client.call("sales_between", start=start, end=end))
+
+    # ----- returns -----
+
+    def iter_returns(self):
+        return iter(self.client.call("iter_returns"))
+
+    def commit_return(self, sale: dict, items: list, total_refund: float) -> dict:
+        return self.client.call("commit_return", sale=sale, items=items, total_refund=total_refund)
+
+    # ----- rollups -----
+
+    def rollup(self, dimension: str = "day") -> list:
+        check_dimension(dimension)
+        return self.client.call("rollup", dimension=dimension)
+
+    def rebuild_rollups(self) -> dict:
+        return self.client.call("rebuild_rollups")
@@ -0,0 +1,296 @@
+# posd.py
+# Optional inventory daemon: one process owns the catalog, sales and returns
+# and every terminal talks to it over a local socket instead of parsing and
+# rewriting the shared files itself (POS_STORAGE=remote, see posclient.py).
+# - lookups are answered from the daemon's in-memory state
+# - stock reservations live in memory; a lane's holds are dropped when its
+#   connection closes
+# - sales and returns go through one writer task. Checkouts that arrive
+#   while the previous write is on disk are group-committed: one catalog
+#   write and one fsync'd journal append per batch.
+# Protocol: one JSON object per line each way.
+#   -> {"id": 7, "op": "reserve", "args": {"lane": "lane-1", "sku": "4012", "quantity": 2}}
+#   <- {"id": 7, "result": 2}        or {"id": 7, "error": "...", "type": "ValueError"}
+#
+#   python src/posd.py [--storage json|sqlite] [--data data/] [--listen data/posd.sock | 127.0.0.1:8765]
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+
+from storage import DATA_PATH, get_storage
+from reservations import ReservationBook
+
+STOCK_LOG = 2000  # stock changes kept for incremental catalog refreshes
+
+
+def default_address(data_path: Path = None) -> str:
+    """POS_SERVER, else a Unix socket in the data directory (TCP on Windows)."""
+    if os.environ.get("POS_SERVER"):
+        return os.environ["POS_SERVER"]
+    if sys.platform == "win32":
+        return "127.0.0.1:8765"
+    return str(Path(data_path or DATA_PATH) / "posd.sock")
+
+
+def parse_address(address: str):
+    """("tcp", host, port) for "host:port", ("unix", path) otherwise."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and "/" not in address:
+        return ("tcp", host or "127.0.0.1", int(port))
+    return ("unix", address)
+
+
+class PosServer:
+    """Serves one storage backend to many terminals."""
+
+    def __init__(self, store, max_batch: int = 64):
+        self.store = store
+        self.max_batch = max_batch
+        self.reservations = ReservationBook(None)  # in memory only
+        self.queue = asyncio.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="posd-writer")
+        # catalog versions: clients ask for the stock changes since theirs;
+        # the epoch tells them apart from versions of an earlier daemon run
+        self.epoch = os.urandom(4).hex()
+        self.version = 0
+        self.full_since = 0  # a client older than this must re-read everything
+        self.stock_log = deque(maxlen=STOCK_LOG)  # (version, {sku: stock})
+        self._generation = store.generation
+        self._writing = False
+        self._clients = set()
+        self.stats = {"commits": 0, "batches": 0, "connections": 0}
+        self.ops = {
+            "products": self.op_products,
+            "product": lambda sku: self.store.product(sku),
+            "reserve": self.op_reserve,
+            "release": self.op_release,
+            "commit_sale": self.op_commit_sale,
+            "commit_return": self.op_commit_return,
+            "find_sale": lambda sale_id: self.store.find_sale(sale_id),
+            "last_sale": lambda: self.store.last_sale(),
+            "search_sales": lambda sku=None, start=None, end=None: self.store.search_sales(sku, start, end),
+            "sales_between": lambda start=None, end=None: list(self.store.iter_sales_between(start, end)),
+            "iter_sales": lambda: list(self.store.iter_sales()),
+            "iter_returns": lambda: list(self.store.iter_returns()),
+            "rollup": lambda dimension="day": self.store.rollup(dimension),
+            "rebuild_rollups": lambda: self.store.rebuild_rollups(),
+            "stats": self.op_stats,
+        }
+
+    # ----- catalog -----
+
+    def _check_external(self) -> None:
+        """Someone edited the data outside the daemon: clients must reload."""
+        if self._writing:
+            return  # our own write in progress, accounted for when it finishes
+        generation = self.store.generation
+        if generation != self._generation:
+            self._generation = generation
+            self.version += 1
+            self.full_since = self.version
+            self.stock_log.clear()
+
+    def op_products(self, since: int = -1, epoch: str = None) -> dict:
+        """The full catalog, or only the stock levels changed after version `since`."""
+        self._check_external()
+        reply = {"epoch": self.epoch, "version": self.version}
+        log_gap = self.stock_log and since < self.stock_log[0][0] - 1
+        if epoch != self.epoch or since < self.full_since or log_gap:
+            reply["products"] = self.store.products()
+            return reply
+        stock = {}
+        for version, changes in self.stock_log:
+            if version > since:
+                stock.update(changes)
+        reply["stock"] = stock
+        return reply
+
+    # ----- reservations -----
+
+    def op_reserve(self, lane: str, sku, quantity: int) -> int:
+        sku = str(sku)
+        self.reservations.expire()
+        product = self.store.product(sku)
+        available = max((product["stock"] if product else 0) - self.reservations.held_by_others(lane, sku), 0)
+        if quantity <= available:
+            self.reservations.set(lane, sku, quantity)
+        return available
+
+    def op_release(self, lane: str, sku=None) -> None:
+        self.reservations.release(lane, None if sku is None else str(sku))
+
+    # ----- writes -----
+
+    async def op_commit_sale(self, items: list, total: float, lane: str = None) -> dict:
+        return await self._submit("sale", (items, total), lane)
+
+    async def op_commit_return(self, sale: dict, items: list, total_refund: float) -> dict:
+        return await self._submit("return", (sale, items, total_refund), None)
+
+    async def _submit(self, kind: str, args: tuple, lane):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((kind, args, lane, future))
+        return await future
+
+    def _write(self, batch: list) -> list:
+        """Runs on the writer thread. Consecutive sales share one commit."""
+        results = []
+        i = 0
+        while i < len(batch):
+            kind = batch[i][0]
+            if kind == "sale":
+                j = i
+                while j < len(batch) and batch[j][0] == "sale":
+                    j += 1
+                try:
+                    results.extend(self.store.commit_sales([b[1] for b in batch[i:j]]))
+                except Exception as e:
+                    results.extend([e] * (j - i))
+                i = j
+            else:
+                try:
+                    results.append(self.store.commit_return(*batch[i][1]))
+                except Exception as e:
+                    results.append(e)
+                i += 1
+        return results
+
+    async def writer(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            self._check_external()
+            self._writing = True
+            try:
+                results = await loop.run_in_executor(self.executor, self._write, batch)
+            finally:
+                self._writing = False
+
+            # stock is on disk now; only then give the lanes' holds back
+            changed = {}
+            for (kind, args, lane, future), result in zip(batch, results):
+                items = args[0] if kind == "sale" else args[1]
+                for item in items:
+                    product = self.store.product(item["sku"])
+                    if product is not None:
+                        changed[str(item["sku"])] = product["stock"]
+                if lane is not None:
+                    self.reservations.release(lane)
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+            self.version += 1
+            self.stock_log.append((self.version, changed))
+            self._generation = self.store.generation
+            self.stats["commits"] += len(batch)
+            self.stats["batches"] += 1
+
+    def op_stats(self) -> dict:
+        return {**self.stats, "version": self.version, "lanes_holding": len(self.reservations.lanes)}
+
+    # ----- connections -----
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        lanes = set()  # lanes that reserved over this connection
+        self.stats["connections"] += 1
+        self._clients.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = None
+                try:
+                    # a malformed request gets an error reply like any failed op; it must
+                    # not end the connection and release the terminal's holds
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be a JSON object")
+                    op, args = request.get("op"), request.get("args", {})
+                    if op not in self.ops:
+                        raise ValueError(f"unknown operation {op!r}")
+                    if not isinstance(args, dict):
+                        raise ValueError("args must be a JSON object")
+                    if op == "reserve":
+                        lanes.add(args.get("lane"))
+                    result = self.ops[op](**args)
+                    if asyncio.iscoroutine(result):
+                        result = await result
+                    reply = {"id": request.get("id"), "result": result}
+                except Exception as e:
+                    request_id = request.get("id") if isinstance(request, dict) else None
+                    reply = {"id": request_id, "error": str(e), "type": type(e).__name__}
+                # default=dict: a compact (ProductTable) catalog serializes like the dict it replaces
+                writer.write(json.dumps(reply, default=dict).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for lane in lanes:  # terminal gone: its cart is abandoned
+                self.reservations.release(lane)
+            self._clients.discard(writer)
+            writer.close()
+
+    async def serve(self, address: str) -> None:
+        kind, *where = parse_address(address)
+        if kind == "tcp":
+            server = await asyncio.start_server(self.handle, where[0], where[1], limit=2 ** 24)
+        else:
+            path = Path(where[0])
+            if path.exists():
+                path.unlink()  # left over from a daemon that did not shut down cleanly
+            server = await asyncio.start_unix_server(self.handle, str(path), limit=2 ** 24)
+        writer = asyncio.create_task(self.writer())
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows: Ctrl+C raises KeyboardInterrupt instead
+        print(f"posd: serving {self.store.name} storage on {address}", flush=True)
+        async with server:
+            await stop.wait()
+            # finish writes that were already accepted, then hang up on the terminals
+            while not self.queue.empty() or self._writing:
+                await asyncio.sleep(0.01)
+            for client in list(self._clients):
+                client.close()
+            while self._clients:
+                await asyncio.sleep(0.01)
+        writer.cancel()
+        self.executor.shutdown(wait=True)
+        if kind == "unix":
+            Path(where[0]).unlink(missing_ok=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="POS inventory daemon")
+    parser.add_argument("--storage", default=None, help="json or sqlite (default: POS_STORAGE or json)")
+    parser.add_argument("--data", default=str(DATA_PATH), help="data directory")
+    parser.add_argument("--listen", default=None, help="socket path or host:port")
+    parser.add_argument("--max-batch", type=int, default=64, help="most checkouts per group commit")
+    args = parser.parse_args()
+
+    if (args.storage or os.environ.get("POS_STORAGE", "json")).lower() == "remote":
+        parser.error("the daemon needs a local backend (json or sqlite)")
+    store = get_storage(args.storage, Path(args.data))
+    server = PosServer(store, args.max_batch)
+    try:
+        asyncio.run(server.serve(args.listen or default_address(args.data)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+# product_store.py
+# Compact, column-wise product catalog for very large stores.
+# A dict of per-SKU dicts costs roughly 1 KB per product: six key/value
+# slots, a float and int object per product, and a separate copy of every
+# category, name and shipment string. ProductTable keeps one SKU -> row
+# index and one typed array per field instead:
+#   price           array("d")  (float64)
+#   stock           array("q")  (int64)
+#   next_ship_qty   array("q")
+#   category        array("i")  codes into a table of distinct categories
+#   next_ship       array("i")  codes into a table of distinct dates
+#   name            array("i")  ids into an interned string table (one
+#                               UTF-8 buffer plus offsets; repeated
+#                               names are stored once)
+#   shape           array("i")  0 for the usual product: the six FIELDS in
+#                               that order, float price; otherwise a code
+#                               for the row's own key order and whether its
+#                               price is an int
+# A value its column cannot hold exactly (a float stock, a price past
+# 2**53, a name that is not a string) is kept as is in a per-row `extra`
+# dict, with fields beyond FIELDS. So a product reads back with the keys,
+# order and types it was written with, and dumps() reproduces
+# json.dumps(products, indent=2) byte for byte.
+# It reads like the dict it replaces: table[sku]["price"], .get(sku),
+# `sku in table`, len() and .items() all work, and the rows it hands out
+# are live views that also accept stock updates (row["stock"] = n).
+# Set POS_CATALOG=compact to use it for the shared catalog (JSON backend)
+# and the SQLite product cache; products.json is parsed straight into
+# the columns one product at a time, without building the whole dict first.
+
+from array import array
+from collections.abc import ItemsView, Mapping, MutableMapping
+from pathlib import Path
+import json
+import os
+import re
+
+COMPACT_CATALOG = os.environ.get("POS_CATALOG", "dict").lower() == "compact"
+FIELDS = ("category", "name", "price", "stock", "next_ship", "next_ship_qty")
+REQUIRED = ("category", "name", "price", "stock")
+INT64 = 2 ** 63
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+# products.json between products: one match per SKU, group 1 = the SKU (None at the closing brace)
+_KEY = r'[ \t\n\r]*"([^"\\\x00-\x1f]*(?:\\.[^"\\\x00-\x1f]*)*)"[ \t\n\r]*:[ \t\n\r]*'
+FIRST_KEY = re.compile(r"[ \t\n\r]*\{(?:" + _KEY + r"|[ \t\n\r]*\})")
+NEXT_KEY = re.compile(r"[ \t\n\r]*(?:," + _KEY + r"|\})")
+
+
+class StringTable:
+    """Interned strings: value <-> small int id, stored in one UTF-8 buffer."""
+
+    def __init__(self):
+        self.blob = bytearray()
+        self.offsets = array("q", [0])
+        self.ids = {}  # value -> id
+
+    def intern(self, value: str) -> int:
+        sid = self.ids.get(value)
+        if sid is None:
+            sid = self.ids[value] = len(self.offsets) - 1
+            self.blob += value.encode("utf-8", "surrogatepass")
+            self.offsets.append(len(self.blob))
+        return sid
+
+    def __getitem__(self, sid: int) -> str:
+        return self.blob[self.offsets[sid]:self.offsets[sid + 1]].decode("utf-8", "surrogatepass")
+
+    def compact(self) -> None:
+        """Drop the reverse index after a bulk load (re-created if names are added later)."""
+        self.ids = None
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+
+class Codes:
+    """Dictionary encoding for a few distinct values (categories, shipment dates)."""
+
+    def __init__(self):
+        self.values = []
+        self.index = {}
+
+    def code(self, value) -> int:
+        key = (value.__class__, value)  # keeps 1, 1.0 and True apart
+        code = self.index.get(key)
+        if code is None:
+            code = self.index[key] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class ProductRow(MutableMapping):
+    """Live view of one product row; reads and writes go to the table's columns."""
+
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table: "ProductTable", row: int):
+        self._table = table
+        self._row = row
+
+    def __getitem__(self, field):
+        table = self._table
+        if table.shape[self._row]:
+            return table._get_odd(self._row, field)
+        column = table.numeric.get(field)
+        if column is not None:
+            return column[self._row]
+        return table._get(self._row, field)
+
+    def __setitem__(self, field, value) -> None:
+        self._table._set(self._row, field, value)
+
+    def __delitem__(self, field) -> None:
+        raise TypeError("product fields cannot be removed")
+
+    def __iter__(self):
+        return iter(self._table._shape(self._row)[0])
+
+    def __len__(self) -> int:
+        return len(self._table._shape(self._row)[0])
+
+    def to_dict(self) -> dict:
+        return {field: self[field] for field in self}
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+
+
+class ProductTable(Mapping):
+    """SKU -> product, stored column-wise (see the module header)."""
+
+    def __init__(self):
+        self.index = {}  # sku -> row
+        self.price = array("d")
+        self.stock = array("q")
+        self.next_ship_qty = array("q")
+        self.category = array("i")
+        self.next_ship = array("i")
+        self.name = array("i")
+        self.shape = array("i")
+        self.categories = Codes()
+        self.ship_dates = Codes()
+        self.names = StringTable()
+        self.shapes = Codes()  # (keys, int price) of the rows whose shape is not 0
+        self.shapes.code(None)
+        self.extra = {}  # row -> values kept outside the columns (rare)
+        self.numeric = {"price": self.price, "stock": self.stock, "next_ship_qty": self.next_ship_qty}
+
+    # ----- building -----
+
+    def _append(self, product) -> int:
+        row = len(self.price)
+        if tuple(product) == FIELDS:
+            category, name, price, stock, next_ship, qty = product.values()
+            if (type(price) is float and type(name) is str and type(stock) is int and type(qty) is int
+                    and -INT64 <= stock < INT64 and -INT64 <= qty < INT64):
+                try:
+                    category = self.categories.code(category)
+                    next_ship = self.ship_dates.code(next_ship)
+                except TypeError:  # unhashable: kept in extra below
+                    pass
+                else:
+                    self.price.append(price)
+                    self.stock.append(stock)
+                    self.next_ship_qty.append(qty)
+                    self.category.append(category)
+                    self.next_ship.append(next_ship)
+                    self.name.append(self._intern(name))
+                    self.shape.append(0)
+                    return row
+        return self._append_odd(row, product)
+
+    def _append_odd(self, row: int, product) -> int:
+        missing = [field for field in REQUIRED if field not in product]
+        if missing:
+            raise ValueError(f"missing {', '.join(map(repr, missing))}")
+        for column in (self.price, self.stock, self.next_ship_qty, self.category, self.next_ship, self.name):
+            column.append(0)
+        self.shape.append(0)
+        for field, value in product.items():
+            self._store(row, field, value)
+        self._reshape(row, tuple(product), type(product["price"]) is int)
+        return row
+
+    def _intern(self, name: str) -> int:
+        if self.names.ids is None:
+            self.names.ids = {self.names[i]: i for i in range(len(self.names))}
+        return self.names.intern(name)
+
+    def add(self, sku, product) -> None:
+        """Insert or replace one product."""
+        sku = str(sku)
+        row = self.index.get(sku)
+        if row is None:
+            self.index[sku] = self._append(product)
+        else:
+            for field, value in product.items():
+                self._set(row, field, value)
+
+    @classmethod
+    def from_items(cls, items) -> "ProductTable":
+        """Build from (sku, product mapping) pairs, e.g. dict.items() or database rows."""
+        table = cls()
+        for sku, product in items:
+            table.add(sku, product)
+        table.names.compact()
+        return table
+
+    @classmethod
+    def load(cls, path: Path) -> "ProductTable":
+        """Parse products.json into columns; only one product dict exists at a time.
+
+        Raises ValueError (json.JSONDecodeError for broken JSON) if the file is
+        not an object of SKU -> product, or a product lacks a REQUIRED field.
+        """
+        with open(path, "r") as f:
+            text = f.read()
+        table = cls()
+        scan = json.JSONDecoder().scan_once  # the C scanner json.load uses
+        match = FIRST_KEY.match(text)
+        if match is None:
+            raise json.JSONDecodeError("Expecting an object of SKU -> product", text, 0)
+        while match.group(1) is not None:
+            sku = match.group(1)
+            if "\\" in sku:
+                sku = json.decoder.scanstring(text, match.start(1))[0]
+            pos = match.end()
+            try:
+                product, pos = scan(text, pos)
+            except StopIteration:
+                raise json.JSONDecodeError("Expecting value", text, pos) from None
+            if not isinstance(product, dict):
+                raise ValueError(f"{path}: product {sku!r} is not an object")
+            try:
+                table.index[sku] = table._append(product)  # a repeated SKU keeps the last, like json.load
+            except ValueError as e:
+                raise ValueError(f"{path}: product {sku!r}: {e}") from None
+            match = NEXT_KEY.match(text, pos)
+            if match is None:
+                raise json.JSONDecodeError("Expecting ',' delimiter", text, pos)
+        if WHITESPACE.match(text, match.end()).end() != len(text):
+            raise json.JSONDecodeError("Extra data", text, match.end())
+        table.names.compact()
+        return table
+
+    # ----- column access -----
+
+    def _get(self, row: int, field):
+        if field == "name":
+            return self.names[self.name[row]]
+        if field == "category":
+            return self.categories.values[self.category[row]]
+        if field == "next_ship":
+            return self.ship_dates.values[self.next_ship[row]]
+        if field in self.numeric:
+            return self.numeric[field][row]
+        raise KeyError(field)
+
+    def _get_odd(self, row: int, field):
+        keys, int_price = self.shapes.values[self.shape[row]]
+        if field not in keys:
+            raise KeyError(field)
+        extra = self.extra.get(row)
+        if extra and field in extra:
+            return extra[field]
+        value = self._get(row, field)
+        return int(value) if int_price and field == "price" else value
+
+    def _shape(self, row: int) -> tuple:
+        """(keys in order, price is an int) for one row."""
+        code = self.shape[row]
+        return self.shapes.values[code] if code else (FIELDS, False)
+
+    def _reshape(self, row: int, keys: tuple, int_price: bool) -> None:
+        if keys == FIELDS and not int_price and row not in self.extra:
+            self.shape[row] = 0
+        else:
+            self.shape[row] = self.shapes.code((keys, int_price))
+
+    def _store(self, row: int, field, value) -> None:
+        """Put one value in its column, or in extra if the column cannot hold it exactly."""
+        extra = self.extra.get(row)
+        if extra and field in extra:
+            del extra[field]
+            if not extra:
+                del self.extra[row]
+        try:
+            if field == "price":
+                if type(value) not in (float, int) or float(value) != value:
+                    raise TypeError(field)
+                self.price[row] = value
+            elif field == "stock" or field == "next_ship_qty":
+                if type(value) is not int:
+                    raise TypeError(field)
+                self.numeric[field][row] = value
+            elif field == "name":
+                if type(value) is not str:
+                    raise TypeError(field)
+                self.name[row] = self._intern(value)
+            elif field == "category":
+                self.category[row] = self.categories.code(value)
+            elif field == "next_ship":
+                self.next_ship[row] = self.ship_dates.code(value)
+            else:
+                raise TypeError(field)
+        except (TypeError, OverflowError):
+            self.extra.setdefault(row, {})[field] = value
+
+    def _set(self, row: int, field, value) -> None:
+        if not self.shape[row] and field == "stock" and type(value) is int and -INT64 <= value < INT64:
+            self.stock[row] = value  # the checkout path
+            return
+        keys, int_price = self._shape(row)
+        self._store(row, field, value)
+        if field not in keys:
+            keys += (field,)
+        if field == "price":
+            int_price = type(value) is int
+        self._reshape(row, keys, int_price)
+
+    # ----- Mapping API -----
+
+    def __getitem__(self, sku) -> ProductRow:
+        return ProductRow(self, self.index[sku])
+
+    def get(self, sku, default=None):
+        row = self.index.get(sku)
+        return default if row is None else ProductRow(self, row)
+
+    def __contains__(self, sku) -> bool:
+        return sku in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def items(self) -> "ProductItems":
+        return ProductItems(self)
+
+    def to_dict(self) -> dict:
+        return {sku: ProductRow(self, row).to_dict() for sku, row in self.index.items()}
+
+    def dumps(self, indent: int = 2) -> str:
+        """products.json text, converting one product at a time."""
+        rows = {sku: ProductRow(self, row) for sku, row in self.index.items()}
+        return json.dumps(rows, indent=indent, default=ProductRow.to_dict)
+
+
+class ProductItems(ItemsView):
+    """table.items(), iterating the row index directly instead of looking up each SKU."""
+
+    def __iter__(self):
+        table = self._mapping
+        for sku, row in table.index.items():
+            yield sku, ProductRow(table, row)
@@ -1,4 +1,3 @@
-import json
 from datetime import datetime
 from textual.app import App, ComposeResult
 from textual.containers import Container, Center
@@ -12,96 +11,48 @@ from pathlib import Path
 from rich.text import Text
 from textual import on
 from main import load_inventory, save_sale
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from pathlib import Path
 from datetime import datetime
 import os
+from datetime import timedelta
+from storage import get_default_storage
+from receipt_pdf import RECEIPTS_DIR, render_pdf
+from receipt_cache import receipt_cache
+from receipt_text import receipt_renderer
+
+
+def parse_receipt_query(text: str) -> dict:
+    """Parse a receipt search like "sku:4012 days:7" or "sku:4012 from:2025-04-01 to:2025-04-30".
+
+    Returns {"sku", "start", "end"} (any may be None). Raises ValueError on bad input.
+    """
+    query = {"sku": None, "start": None, "end": None}
+    for token in text.split():
+        key, sep, value = token.partition(":")
+        if not sep or not value:
+            raise ValueError(token)
+        key = key.lower()
+        if key == "sku":
+            query["sku"] = value
+        elif key in ("from", "to"):
+            datetime.strptime(value, "%Y-%m-%d")  # validate
+            query["start" if key == "from" else "end"] = value
+        elif key == "days":
+            query["start"] = (datetime.now() - timedelta(days=int(value))).strftime("%Y-%m-%d")
+        else:
+            raise ValueError(token)
+    return query
 
 class ReceiptGenerator:
     @staticmethod
-    def generate_receipt(sale_data:dict)->str:
-        """Generate a formatted receipt from sale data."""
-        width = 32
-        receipt_lines = [
-            "╔" + "═" * (width - 2) + "╗",
-            "║{:^{width}}║".format("INVOICE RECEIPT", width=width - 2),
-            "╟" + "─" * (width - 2) + "╢",
-            "║ Sale #: {:<21}║".format(sale_data['id']),
-            "║ Date: {:<23}║".format(sale_data['date']),
-            "╟" + "─" * (width - 2) + "╢"
-        ]
-        #add sales items
-        for i in sale_data["items"]:
-            name=i['name'][:22]
-            name_line="║ {:<29}║".format(name)
-            detail_line= "║   {:>2} x ${:<6.2f} ${:>12.2f} ║".format(
-                i['quantity'], i['price'], i['total']
-            )
-            receipt_lines.extend([name_line, detail_line])
-        
-        #add footer
-        receipt_lines.extend([
-            "╟" + "─" * (width - 2) + "╢",
-            "║ TOTAL: ${:>20.2f} ║".format(sale_data['total']),
-            "╚" + "═" * (width - 2) + "╝",
-            "",
-            "Thank you for your business!",
-            "Returns within 14 days with receipt"
-        ])
-        return "\n".join(receipt_lines)
+    def generate_receipt(sale_data:dict, width: int = 32)->str:
+        """Generate a formatted receipt from sale data (memoized, see receipt_text.py)."""
+        return receipt_renderer.render(sale_data, width)
         
     # def view_pdf(self)-> None:
     @staticmethod
-    def generate_pdf_receipt(sale_data: dict, output_dir: str = "data/receipts") -> str:
-        """Generate a PDF receipt and return the file path"""
-        # Create receipts directory if it doesn't exist
-        receipts_dir = Path(output_dir)
-        receipts_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Clean date for filename
-        clean_date = sale_data['date'][:10].replace("-", "")
-        filename = f"receipt_{sale_data['id']}_{clean_date}.pdf"
-        filepath = receipts_dir / filename
-        
-        # Create PDF
-        c = canvas.Canvas(str(filepath), pagesize=letter)
-        width, height = letter
-        
-        # Header
-        c.setFont("Helvetica-Bold", 18)
-        c.drawCentredString(width/2, height-50, "INVOICE RECEIPT")
-        
-        # Sale info
-        c.setFont("Helvetica", 12)
-        c.drawString(100, height-80, f"Sale #: {sale_data['id']}")
-        c.drawString(100, height-100, f"Date: {sale_data['date']}")
-        c.line(100, height-110, width-100, height-110)
-        
-        # Items
-        y_position = height-130
-        for item in sale_data['items']:
-            c.setFont("Helvetica-Bold", 12)
-            c.drawString(100, y_position, item['name'])
-            y_position -= 20
-            
-            c.setFont("Helvetica", 10)
-            item_text = f"{item['quantity']} x ${item['price']:.2f} = ${item['total']:.2f}"
-            c.drawString(120, y_position, item_text)
-            y_position -= 25
-        
-        # Total
-        c.line(100, y_position-10, width-100, y_position-10)
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(100, y_position-30, f"TOTAL: ${sale_data['total']:.2f}")
-        
-        # Footer
-        c.setFont("Helvetica-Oblique", 10)
-        c.drawCentredString(width/2, 50, "Thank you for your business!")
-        c.drawCentredString(width/2, 30, "Returns within 14 days with receipt")
-        
-        c.save()
-        return str(filepath)
+    def generate_pdf_receipt(sale_data: dict, output_dir: str = RECEIPTS_DIR) -> str:
+        """Generate a PDF receipt and return the file path (blocking, see pdf_pool)"""
+        return render_pdf(sale_data, output_dir)
     
     @staticmethod
     def view_pdf(filepath:str) -> bool:
@@ -130,34 +81,50 @@ class ReceiptScreen(Screen):
         self.app.pop_screen()
         
     def action_view_pdf(self) -> None:
-        ReceiptGenerator.view_pdf(self.pdf_path)
+        if self.pdf_path:
+            ReceiptGenerator.view_pdf(self.pdf_path)
         
     def action_close(self) -> None:
         self.app.pop_screen()
         
     
         
-    def __init__(self, text_receipt:str, pdf_path:str, *args, **kwargs):
+    def __init__(self, text_receipt:str, pdf_path:str = None, sale: dict = None, *args, **kwargs):
+        """Show `text_receipt` now; if only `sale` is given the PDF is rendered in the background."""
         super().__init__(*args,**kwargs)
         self.text_receipt = text_receipt
-        self.pdf_path = pdf_path
+        self.pdf_path = pdf_path or (sale and receipt_cache.get(sale))
+        self.sale = sale
         
         
     def compose(self) -> ComposeResult:
         yield Container(
             Static(self.text_receipt, classes="receipt"),
             Horizontal(
-                Button("View PDF", id="view_pdf"),
+                Button("View PDF", id="view_pdf", disabled=not self.pdf_path),
                 # Button("Email Receipt", id="email"),
                 Button("Close", id="close"),
                 classes="buttons"
             )
         )
         
+    def on_mount(self) -> None:
+        if not self.pdf_path and self.sale is not None:
+            self.run_worker(self.render_pdf(), exclusive=True)
+            
+    async def render_pdf(self) -> None:
+        """Wait for the pool to write the PDF, then enable View PDF."""
+        try:
+            self.pdf_path = await receipt_cache.fetch(self.sale)
+        except Exception as e:
+            self.notify(f"PDF receipt failed: {e}", severity="error")
+            return
+        self.query_one("#view_pdf").disabled = False
+        
     def on_button_pressed(self, event: Button.Pressed)->None:
         """Handle button presses in the receipt screen."""
         if event.button.id == "view_pdf":
-            ReceiptGenerator.view_pdf(self.pdf_path)
+            self.action_view_pdf()
         # elif event.button.id == "email":
         #     self.email_receipt()
         elif event.button.id == "close":
@@ -170,14 +137,15 @@ class ReceiptSearchScreen(Screen):
         Binding('c', 'close', 'Close'),
     ]
     def action_view_pdf(self) -> None:
-        ReceiptGenerator.view_pdf(self.pdf_path)
+        if self.pdf_path:
+            ReceiptGenerator.view_pdf(self.pdf_path)
         
     def action_close(self) -> None:
         self.app.pop_screen()
     
     def __init__ (self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.search_input = Input(placeholder="Search by Sales ID (Enter to search)", id="search-input")
+        self.search_input = Input(placeholder="Sales ID, or sku:4012 days:7 / from:YYYY-MM-DD to:YYYY-MM-DD", id="search-input")
         self.pdf_path = ""
         
     def compose(self) -> ComposeResult:
@@ -196,12 +164,10 @@ class ReceiptSearchScreen(Screen):
         
     @staticmethod
     def find_receipt_by_id(receipt_id: int) -> dict:
-        """Search sales.json for a receipt by ID"""
+        """Look up a receipt by ID through the storage backend"""
         try:
-            with open("data/sales.json", "r") as f:
-                sales = json.load(f)
-            return next((sale for sale in sales if sale['id'] == receipt_id), None)
-        except (FileNotFoundError, json.JSONDecodeError):
+            return get_default_storage().find_sale(receipt_id)
+        except OSError:
             return None
         
     @on(Button.Pressed, "#search")
@@ -217,6 +183,11 @@ class ReceiptSearchScreen(Screen):
             self.query_one("#view_pdf").disabled = True
             return
         
+        if ":" in search_value: #search by SKU and/or date range
+            self.show_matches(search_value)
+            self.search_input.value = ""
+            return
+        
         try: #search by ID
             receipt_id = int(search_value)
             receipt = self.find_receipt_by_id(receipt_id)
@@ -225,9 +196,12 @@ class ReceiptSearchScreen(Screen):
                 text_receipt = ReceiptGenerator.generate_receipt(receipt)
                 receipt_display.update(text_receipt)
                 receipt_display.styles.color = "yellow"
-                self.pdf_path = ReceiptGenerator.generate_pdf_receipt(receipt)
-                #enable view pdf button
-                self.query_one("#view_pdf").disabled = False
+                #reuse the cached pdf, otherwise render it in the background
+                #and enable view pdf when it's ready
+                self.pdf_path = receipt_cache.get(receipt) or ""
+                self.query_one("#view_pdf").disabled = not self.pdf_path
+                if not self.pdf_path:
+                    self.run_worker(self.render_pdf(receipt), exclusive=True, group="pdf")
             else: # Receipt not found
                 receipt_display.update(f"Receipt {receipt_id} not found")
                 receipt_display.styles.color = "red"
@@ -245,6 +219,39 @@ class ReceiptSearchScreen(Screen):
         
 
 
+    async def render_pdf(self, receipt: dict) -> None:
+        """Render the looked-up receipt off the event loop (or reuse it), then enable View PDF."""
+        try:
+            pdf_path = await receipt_cache.fetch(receipt)
+        except Exception as e:
+            self.notify(f"PDF receipt failed: {e}", severity="error")
+            return
+        self.pdf_path = pdf_path
+        self.query_one("#view_pdf").disabled = False
+
+    def show_matches(self, search_value: str) -> None:
+        """List receipts matching a sku:/from:/to:/days: query"""
+        receipt_display = self.query_one("#receipt-display")
+        self.query_one("#view_pdf").disabled = True
+        try:
+            query = parse_receipt_query(search_value)
+        except ValueError:
+            receipt_display.update(f"Invalid search {search_value} not recognized.")
+            receipt_display.styles.color = "yellow"
+            return
+        
+        matches = get_default_storage().search_sales(query["sku"], query["start"], query["end"])
+        if not matches:
+            receipt_display.update("No receipts found")
+            receipt_display.styles.color = "red"
+            return
+        
+        lines = [f"{len(matches)} receipt(s) found:"]
+        for sale in matches[-50:]: # newest 50
+            lines.append(f"  #{sale['id']:<6} {sale['date']}  ${sale['total']:.2f}")
+        receipt_display.update("\n".join(lines))
+        receipt_display.styles.color = "yellow"
+
     @on(Button.Pressed, "#view_pdf")
     def view_pdf(self) -> None:
         """View the generated PDF"""
@@ -0,0 +1,125 @@
+# receipt_cache.py
+# Content-addressed cache of PDF receipts in data/receipts.
+# A cached file is named receipt_{id}_{date}_{digest}.pdf, where the digest
+# is a hash of the sale record, so a lookup is one stat(): the file exists
+# exactly when this version of the sale was rendered before. When a sale
+# changes (e.g. it gets locked by a return) its digest changes, the next
+# lookup renders a new file and the outdated versions of that sale are
+# deleted. Every `evict_every` renders, files older than `max_age_days` are
+# removed and then the oldest ones until the directory fits in `max_bytes`.
+# Only files with exactly that name shape are ever deleted; receipts saved
+# before the cache (receipt_{id}_{date}.pdf) and anything else in the
+# directory are left alone.
+
+from concurrent.futures import Future
+from pathlib import Path
+import asyncio
+import os
+import re
+import threading
+import time
+
+from receipt_pdf import RECEIPTS_DIR, pdf_pool, render_pdf
+from receipt_text import sale_digest
+
+
+# receipt_{id}_{YYYYMMDD}_{sale_digest: 8-byte blake2b as 16 hex digits}.pdf
+CACHED_NAME = re.compile(r"receipt_(\d+)_\d{8}_[0-9a-f]{16}\.pdf")
+
+
+def cached_filename(sale_data: dict) -> str:
+    clean_date = sale_data['date'][:10].replace("-", "")
+    return f"receipt_{sale_data['id']}_{clean_date}_{sale_digest(sale_data)}.pdf"
+
+
+def render_cached(sale_data: dict, directory: str) -> str:
+    """Render a sale into the cache and drop its outdated versions (runs on the pool)."""
+    directory = Path(directory)
+    filename = cached_filename(sale_data)
+    tmp_name = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+    render_pdf(sale_data, directory, tmp_name)
+    path = directory / filename
+    os.replace(directory / tmp_name, path)  # readers never see a half-written PDF
+    for old in directory.glob(f"receipt_{sale_data['id']}_*.pdf"):
+        match = CACHED_NAME.fullmatch(old.name)
+        if match and match.group(1) == str(sale_data['id']) and old.name != filename:
+            try:
+                old.unlink()
+            except FileNotFoundError:
+                pass
+    return str(path)
+
+
+def evict_receipts(directory: str, max_age_days: float, max_bytes: int) -> int:
+    """Delete cached receipts past `max_age_days`, then oldest first until they fit in `max_bytes`."""
+    cutoff = time.time() - max_age_days * 86400
+    files = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not CACHED_NAME.fullmatch(entry.name):
+                continue  # not written by the cache
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, st.st_size, entry.path))
+    files.sort()
+
+    removed = 0
+    total = sum(size for _, size, _ in files)
+    for mtime, size, path in files:
+        if mtime >= cutoff and total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+        total -= size
+    return removed
+
+
+class ReceiptCache:
+    """PDF receipts keyed by sale ID + content hash."""
+
+    def __init__(self, directory: str = RECEIPTS_DIR, max_age_days: float = 90,
+                 max_bytes: int = 200 * 1024 * 1024, evict_every: int = 50, pool=None):
+        self.directory = str(directory)
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        self.evict_every = evict_every
+        self.pool = pool or pdf_pool
+        self._renders = 0
+
+    def path_for(self, sale_data: dict) -> Path:
+        return Path(self.directory) / cached_filename(sale_data)
+
+    def get(self, sale_data: dict):
+        """Path of the cached PDF for this exact sale, or None (a single stat)."""
+        path = self.path_for(sale_data)
+        return str(path) if path.exists() else None
+
+    def submit(self, sale_data: dict):
+        """Future of the PDF path: already done on a hit, rendered on the pool on a miss."""
+        path = self.get(sale_data)
+        if path is not None:
+            future = Future()
+            future.set_result(path)
+            return future
+        future = self.pool.call(render_cached, sale_data, self.directory)
+        self._renders += 1
+        if self._renders % self.evict_every == 0:
+            self.evict()
+        return future
+
+    async def fetch(self, sale_data: dict) -> str:
+        """PDF path for a sale, rendering it off the event loop only on a miss."""
+        return await asyncio.wrap_future(self.submit(sale_data))
+
+    def evict(self):
+        """Queue an eviction pass on the pool; returns its Future (count removed)."""
+        return self.pool.call(evict_receipts, self.directory, self.max_age_days, self.max_bytes)
+
+
+# Shared cache used by the receipt screens
+receipt_cache = ReceiptCache()
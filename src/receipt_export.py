@@ -0,0 +1,135 @@
+# receipt_export.py
+# Headless batch export of PDF receipts for a date range (for auditors).
+# Sales are streamed from storage and handed out in chunks to a process
+# pool that writes one file per receipt. Workers live for the whole export,
+# so ReportLab is imported and its font metrics loaded once per worker, but
+# each file still needs its own canvas and page template (a ReportLab form
+# belongs to one document): a file costs about three times a --single page.
+# With --single every receipt becomes a page of one PDF, drawn on a single
+# canvas that reuses the page template.
+#
+#   python src/receipt_export.py --from 2025-04-01 --to 2025-04-30
+#   python src/receipt_export.py --from 2025-04-01 --to 2025-04-30 --single
+#   python src/receipt_export.py --days 7 --out exports --workers 4
+
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timedelta
+from itertools import islice
+from pathlib import Path
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+from receipt_pdf import ReceiptDocument, receipt_filename
+
+EXPORT_DIR = Path(__file__).parent.parent / "data" / "exports"
+
+
+def render_batch(sales: list, output_dir: str) -> int:
+    """Write each sale to its own PDF (runs in a worker process; one canvas per file)."""
+    for sale in sales:
+        document = ReceiptDocument(Path(output_dir) / receipt_filename(sale))
+        document.add(sale)
+        document.save()
+    return len(sales)
+
+
+def _chunks(sales, size: int):
+    sales = iter(sales)
+    while True:
+        chunk = list(islice(sales, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def export_files(sales, output_dir, workers: int = None, chunk: int = 25, progress=None) -> int:
+    """Render every sale into `output_dir` in parallel. Returns the receipt count.
+
+    Only `workers * 2` chunks are in flight at a time, so a long range is
+    never loaded into memory all at once.
+    """
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    done = 0
+    pending = set()
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=ctx) as pool:
+        for batch in _chunks(sales, chunk):
+            if len(pending) >= workers * 2:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    done += future.result()
+                if progress:
+                    progress(done)
+            pending.add(pool.submit(render_batch, batch, str(output_dir)))
+        for future in pending:
+            done += future.result()
+            if progress:
+                progress(done)
+    return done
+
+
+def export_single(sales, path, progress=None, every: int = 25) -> int:
+    """Render every sale as a page of one PDF. Returns the receipt count.
+
+    ReportLab can't write one document from several processes, so this mode
+    runs in the calling process; the shared canvas and template keep it fast.
+    """
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    document = ReceiptDocument(path)
+    for sale in sales:
+        document.add(sale)
+        if progress and document.pages % every == 0:
+            progress(document.pages)
+    document.save()
+    if progress:
+        progress(document.pages)
+    return document.pages
+
+
+def _progress_printer():
+    started = time.perf_counter()
+
+    def report(done: int) -> None:
+        rate = done / max(time.perf_counter() - started, 1e-9)
+        print(f"\r{done} receipts exported ({rate:.0f}/s)", end="", file=sys.stderr, flush=True)
+    return report
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Export PDF receipts for a date range")
+    parser.add_argument("--from", dest="start", help="first day, YYYY-MM-DD")
+    parser.add_argument("--to", dest="end", help="last day, YYYY-MM-DD")
+    parser.add_argument("--days", type=int, help="the last N days instead of --from")
+    parser.add_argument("--out", default=None, help="output directory (default data/exports)")
+    parser.add_argument("--single", action="store_true", help="one multi-page PDF")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk", type=int, default=25, help="receipts per worker task")
+    args = parser.parse_args(argv)
+
+    start, end = args.start, args.end
+    if args.days is not None:
+        start = (datetime.now() - timedelta(days=args.days)).strftime("%Y-%m-%d")
+    for value in (start, end):
+        if value:
+            datetime.strptime(value, "%Y-%m-%d")  # validate
+
+    from storage import get_default_storage
+    sales = get_default_storage().iter_sales_between(start, end)
+    label = f"{start or 'start'}_{end or 'today'}"
+    out = Path(args.out) if args.out else EXPORT_DIR
+    progress = _progress_printer()
+    if args.single:
+        target = out / f"receipts_{label}.pdf"
+        count = export_single(sales, target, progress)
+    else:
+        target = out / f"receipts_{label}"
+        count = export_files(sales, target, args.workers, args.chunk, progress)
+    print(f"\n{count} receipts written to {target}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+# receipt_index.py
+# Persistent lookup index over the sales journal.
+# - primary:   sale ID -> byte offset of its latest line in sales.jsonl
+# - secondary: day ("YYYY-MM-DD") -> sale IDs, SKU -> sale IDs
+# The index remembers how many journal bytes it has seen, so on open (or when
+# another process appended) only the new tail of the journal is scanned.
+# Checkpoints to disk are taken by the caller (SalesJournal.checkpoint_index,
+# from the write-behind thread), never while indexing a sale, and only once
+# the unsaved tail reaches 1/CHECKPOINT_FRACTION of the index, so rewriting
+# the whole file costs O(1) per sale over time. If the checkpoint is lost or
+# stale the journal is simply re-read from the last watermark.
+
+from pathlib import Path
+from bisect import bisect_left, bisect_right
+import json
+import os
+import threading
+
+CHECKPOINT_FRACTION = 8
+
+class ReceiptIndex:
+    """Sale ID / date / SKU index for a JSON Lines sales journal."""
+
+    def __init__(self, journal_path: Path, index_path: Path = None, checkpoint_every: int = 50):
+        self.journal_path = Path(journal_path)
+        self.path = Path(index_path) if index_path else self.journal_path.with_name(self.journal_path.name + ".idx")
+        self.checkpoint_every = checkpoint_every
+        self._reset()
+        self._loaded = False
+        self._dirty = 0
+
+    def _reset(self) -> None:
+        self.watermark = 0  # journal bytes already indexed
+        self.offsets = {}   # "id" -> byte offset of latest version
+        self.days = {}      # "id" -> "YYYY-MM-DD"
+        self.by_day = {}    # "YYYY-MM-DD" -> [id, ...]
+        self.by_sku = {}    # "sku" -> [id, ...]
+        self._sorted_days = []
+        self.max_id = 0     # highest sale ID in the journal
+
+    # ----- persistence -----
+
+    def _load(self) -> None:
+        self._loaded = True
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        self.watermark = data.get("watermark", 0)
+        self.offsets = data.get("offsets", {})
+        self.days = data.get("days", {})
+        # an ID listed without an offset is past the watermark (an older
+        # checkpoint could save one): it is indexed again from the journal
+        offsets = self.offsets
+        self.by_day = {day: [i for i in ids if i in offsets] for day, ids in data.get("by_day", {}).items()}
+        self.by_sku = {sku: [i for i in ids if i in offsets] for sku, ids in data.get("by_sku", {}).items()}
+        self._sorted_days = sorted(self.by_day)
+        self.max_id = max((int(i) for i in self.offsets if i.isdigit()), default=0)
+
+    def checkpoint_due(self) -> bool:
+        """Enough sales went unsaved to be worth rewriting the index file."""
+        return self._dirty >= max(self.checkpoint_every, len(self.offsets) // CHECKPOINT_FRACTION)
+
+    def snapshot(self) -> dict:
+        """Copy of the index to write with write(), taken under the journal lock.
+
+        Only copies, no JSON encoding, so the lock is held briefly; the ID
+        lists are copied too, since sales indexed while write() runs must
+        not reach the file without their offsets.
+        """
+        self._dirty = 0
+        return {
+            "watermark": self.watermark,
+            "offsets": self.offsets.copy(),
+            "days": self.days.copy(),
+            "by_day": {day: ids[:] for day, ids in self.by_day.items()},
+            "by_sku": {sku: ids[:] for sku, ids in self.by_sku.items()},
+        }
+
+    def write(self, snapshot: dict) -> None:
+        """Write a snapshot() to disk (temp file + rename)."""
+        # lanes, and threads within one, may checkpoint at once
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w") as f:
+            f.write(json.dumps(snapshot))
+        os.replace(tmp, self.path)
+
+    def checkpoint(self) -> None:
+        """Write the index to disk now."""
+        self.write(self.snapshot())
+
+    def invalidate(self) -> None:
+        """Forget everything (the journal was rewritten)."""
+        self._reset()
+        self._loaded = True
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    # ----- maintenance -----
+
+    def add(self, sale: dict, offset: int, end: int = None) -> None:
+        """Index one journal record that starts at byte `offset`."""
+        sale_id = str(sale.get("id"))
+        first_seen = sale_id not in self.offsets
+        self.offsets[sale_id] = offset
+        if end is not None:
+            self.watermark = max(self.watermark, end)
+        if not first_seen:
+            return  # superseding version (e.g. locked); items and date unchanged
+
+        if sale_id.isdigit():
+            self.max_id = max(self.max_id, int(sale_id))
+        day = str(sale.get("date", ""))[:10]
+        self.days[sale_id] = day
+        if day not in self.by_day:
+            self.by_day[day] = []
+            self._sorted_days.insert(bisect_left(self._sorted_days, day), day)
+        self.by_day[day].append(sale_id)
+        for item in sale.get("items", []):
+            ids = self.by_sku.setdefault(str(item.get("sku")), [])
+            if not ids or ids[-1] != sale_id:
+                ids.append(sale_id)
+        self._dirty += 1
+
+    def catch_up(self) -> None:
+        """Index any journal bytes appended since the last watermark."""
+        if not self._loaded:
+            self._load()
+        try:
+            size = os.path.getsize(self.journal_path)
+        except FileNotFoundError:
+            return
+        if size < self.watermark:
+            # journal was truncated or replaced: rebuild from scratch
+            self.invalidate()
+        if size == self.watermark:
+            return
+        with open(self.journal_path, "rb") as f:
+            f.seek(self.watermark)
+            offset = self.watermark
+            for line in f:
+                end = offset + len(line)
+                if not line.endswith(b"\n"):
+                    break  # partial append still in flight
+                if line.strip():
+                    try:
+                        self.add(json.loads(line), offset, end)
+                    except json.JSONDecodeError:
+                        pass
+                self.watermark = end
+                offset = end
+
+    # ----- queries -----
+
+    def read(self, sale_id):
+        """Return the latest version of a sale by ID, or None."""
+        self.catch_up()
+        return self._read(sale_id)
+
+    def _read(self, sale_id):
+        offset = self.offsets.get(str(sale_id))
+        if offset is None:
+            return None
+        with open(self.journal_path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def ids_between(self, start: str = None, end: str = None) -> list:
+        """Sale IDs whose date falls in [start, end] (inclusive, "YYYY-MM-DD")."""
+        self.catch_up()
+        lo = bisect_left(self._sorted_days, start) if start else 0
+        hi = bisect_right(self._sorted_days, end) if end else len(self._sorted_days)
+        ids = []
+        for day in self._sorted_days[lo:hi]:
+            ids.extend(self.by_day[day])
+        return ids
+
+    def search(self, sku=None, start: str = None, end: str = None) -> list:
+        """Return sales matching an optional SKU and date range, oldest first."""
+        self.catch_up()
+        if sku is not None:
+            ids = [
+                i for i in self.by_sku.get(str(sku), [])
+                if (not start or self.days[i] >= start) and (not end or self.days[i] <= end)
+            ]
+        else:
+            ids = self.ids_between(start, end)
+        return [self._read(i) for i in ids]
@@ -0,0 +1,187 @@
+# receipt_pdf.py
+# PDF receipts, rendered off the UI thread.
+# ReportLab canvas building and the file write take long enough to stall the
+# Textual event loop, so screens hand the sale to `pdf_pool` and get the PDF
+# path back later (a Future, or `await pdf_pool.render(sale)` from a worker).
+# This module only depends on ReportLab, and pool processes start from
+# pdf_worker.py rather than re-running the app's main module, so they start
+# quickly and never open the data directory.
+# The pool kind is picked with POS_PDF_POOL=process or thread; by default
+# processes are used only when there is more than one CPU to run them on.
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from pathlib import Path
+import asyncio
+import multiprocessing
+import os
+import sys
+import threading
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+RECEIPTS_DIR = "data/receipts"
+
+
+def receipt_filename(sale_data: dict) -> str:
+    clean_date = sale_data['date'][:10].replace("-", "")
+    return f"receipt_{sale_data['id']}_{clean_date}.pdf"
+
+
+TEMPLATE = "receipt_template"
+
+
+class ReceiptDocument:
+    """A PDF with one receipt per page.
+
+    The parts that are the same on every receipt (title, rule, footer) are
+    drawn once as a form and stamped onto each page, so a batch of receipts
+    shares one canvas, one set of fonts and one page template.
+    """
+
+    def __init__(self, path, pagesize=letter):
+        self.path = str(path)
+        self.canvas = canvas.Canvas(self.path, pagesize=pagesize)
+        self.width, self.height = pagesize
+        self.pages = 0
+        self._has_template = False
+
+    def _define_template(self) -> None:
+        c = self.canvas
+        width, height = self.width, self.height
+        c.beginForm(TEMPLATE)
+        # Header
+        c.setFont("Helvetica-Bold", 18)
+        c.drawCentredString(width/2, height-50, "INVOICE RECEIPT")
+        c.line(100, height-110, width-100, height-110)
+        # Footer
+        c.setFont("Helvetica-Oblique", 10)
+        c.drawCentredString(width/2, 50, "Thank you for your business!")
+        c.drawCentredString(width/2, 30, "Returns within 14 days with receipt")
+        c.endForm()
+        self._has_template = True
+
+    def add(self, sale_data: dict) -> None:
+        """Draw one receipt on a new page."""
+        c = self.canvas
+        width, height = self.width, self.height
+        if self.pages:
+            c.showPage()
+        if not self._has_template:
+            self._define_template()
+        c.doForm(TEMPLATE)
+
+        # Sale info
+        c.setFont("Helvetica", 12)
+        c.drawString(100, height-80, f"Sale #: {sale_data['id']}")
+        c.drawString(100, height-100, f"Date: {sale_data['date']}")
+
+        # Items
+        y_position = height-130
+        for item in sale_data['items']:
+            c.setFont("Helvetica-Bold", 12)
+            c.drawString(100, y_position, item['name'])
+            y_position -= 20
+
+            c.setFont("Helvetica", 10)
+            item_text = f"{item['quantity']} x ${item['price']:.2f} = ${item['total']:.2f}"
+            c.drawString(120, y_position, item_text)
+            y_position -= 25
+
+        # Total
+        c.line(100, y_position-10, width-100, y_position-10)
+        c.setFont("Helvetica-Bold", 14)
+        c.drawString(100, y_position-30, f"TOTAL: ${sale_data['total']:.2f}")
+        self.pages += 1
+
+    def save(self) -> str:
+        self.canvas.save()
+        return self.path
+
+
+def render_pdf(sale_data: dict, output_dir: str = RECEIPTS_DIR, filename: str = None) -> str:
+    """Generate a PDF receipt and return the file path"""
+    # Create receipts directory if it doesn't exist
+    receipts_dir = Path(output_dir)
+    receipts_dir.mkdir(parents=True, exist_ok=True)
+    document = ReceiptDocument(receipts_dir / (filename or receipt_filename(sale_data)))
+    document.add(sale_data)
+    return document.save()
+
+
+@contextmanager
+def _worker_main():
+    """Spawn workers with pdf_worker as their main module instead of the app's __main__."""
+    import pdf_worker
+    saved = sys.modules["__main__"]
+    sys.modules["__main__"] = pdf_worker  # workers import it by name (its __spec__)
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = saved
+
+
+class PdfRenderPool:
+    """Executor for render_pdf with a lazily started process (or thread) pool."""
+
+    def __init__(self, workers: int = None, kind: str = None):
+        cpus = os.cpu_count() or 1
+        self.workers = workers or min(4, cpus)
+        self.kind = (kind or os.environ.get("POS_PDF_POOL")
+                     or ("process" if cpus > 1 else "thread")).lower()
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    # spawn: forking a process that runs the UI threads is unsafe
+                    ctx = multiprocessing.get_context("spawn")
+                    self._executor = ProcessPoolExecutor(self.workers, mp_context=ctx)
+                else:
+                    self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="pdf")
+            return self._executor
+
+    def _submit(self, fn, *args):
+        executor = self._get_executor()
+        if self.kind != "process":
+            return executor.submit(fn, *args)
+        with self._lock, _worker_main():  # submit() is where new workers are spawned
+            return executor.submit(fn, *args)
+
+    def call(self, fn, *args):
+        """Run a module-level function on the pool; returns a concurrent.futures.Future."""
+        try:
+            return self._submit(fn, *args)
+        except (BrokenProcessPool, OSError, ValueError):
+            # workers could not be started (sandbox, Textual's redirected
+            # stdio, dead worker): fall back to threads
+            self.shutdown(wait=False)
+            self.kind = "thread"
+            return self._submit(fn, *args)
+
+    def submit(self, sale_data: dict, output_dir: str = RECEIPTS_DIR):
+        """Queue a receipt; returns a concurrent.futures.Future of the PDF path."""
+        return self.call(render_pdf, sale_data, output_dir)
+
+    async def render(self, sale_data: dict, output_dir: str = RECEIPTS_DIR) -> str:
+        """Render a receipt without blocking the event loop; returns the PDF path."""
+        return await asyncio.wrap_future(self.submit(sale_data, output_dir))
+
+    def map(self, sales, output_dir: str = RECEIPTS_DIR) -> list:
+        """Render many receipts concurrently (end-of-day reprints); returns paths in order."""
+        futures = [self.submit(sale, output_dir) for sale in sales]
+        return [f.result() for f in futures]
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+# Shared pool used by the receipt screens
+pdf_pool = PdfRenderPool()
@@ -0,0 +1,106 @@
+# receipt_text.py
+# Text receipts from a precompiled layout.
+# A ReceiptTemplate builds the box-drawing frame and the %-format strings for
+# one paper width once; rendering a sale only fills its slots of a line
+# buffer whose fixed lines (borders, title, footer) are already in place.
+# Rendered receipts are memoized per (sale id, content hash, width), so
+# looking the same receipt up again on the search screen is a dict hit.
+# Width 32 is the original layout; 48 fits 80mm thermal printers.
+
+from collections import OrderedDict
+import hashlib
+import json
+
+
+def sale_digest(sale_data: dict) -> str:
+    """Short stable hash of a sale record (stable across processes, for file names)."""
+    blob = json.dumps(sale_data, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.blake2b(blob, digest_size=8).hexdigest()
+
+
+def _content_key(sale_data: dict):
+    """In-process fingerprint of the fields a text receipt shows; much cheaper than sale_digest."""
+    return hash((
+        sale_data['date'], sale_data['total'],
+        tuple((i['name'], i['quantity'], i['price'], i['total']) for i in sale_data['items']),
+    ))
+
+
+class ReceiptTemplate:
+    """The receipt layout for one paper width."""
+
+    def __init__(self, width: int = 32):
+        if width < 32:
+            raise ValueError("receipt width must be at least 32 columns")
+        self.width = width
+        inner = width - 2
+        rule = "╟" + "─" * inner + "╢"
+        self.head = [
+            "╔" + "═" * inner + "╗",
+            "║{:^{width}}║".format("INVOICE RECEIPT", width=inner),
+            rule,
+        ]
+        self.sale_fmt = "║ Sale #: %%-%ds║" % (width - 11)
+        self.date_fmt = "║ Date: %%-%ds║" % (width - 9)
+        self.rule = rule
+        self.name_fmt = "║ %%-%ds║" % (width - 3)
+        self.name_cut = width - 10
+        # extra columns go before the right-aligned amounts
+        self.detail_fmt = "║   %%2s x $%%-%d.2f $%%12.2f ║" % (width - 26)
+        self.total_fmt = "║ TOTAL: " + " " * (width - 32) + "$%20.2f ║"
+        self.tail = [
+            "╚" + "═" * inner + "╝",
+            "",
+            "Thank you for your business!",
+            "Returns within 14 days with receipt",
+        ]
+
+    def render(self, sale_data: dict) -> str:
+        """Lay out one sale."""
+        items = sale_data["items"]
+        lines = self.head + [None] * (3 + 2 * len(items) + 2) + self.tail
+        lines[3] = self.sale_fmt % (sale_data['id'],)
+        lines[4] = self.date_fmt % (sale_data['date'],)
+        lines[5] = self.rule
+        pos = 6
+        name_fmt, detail_fmt, cut = self.name_fmt, self.detail_fmt, self.name_cut
+        for i in items:
+            lines[pos] = name_fmt % (i['name'][:cut],)
+            lines[pos + 1] = detail_fmt % (i['quantity'], i['price'], i['total'])
+            pos += 2
+        lines[pos] = self.rule
+        lines[pos + 1] = self.total_fmt % (sale_data['total'],)
+        return "\n".join(lines)
+
+
+class ReceiptRenderer:
+    """Templates per width plus an LRU cache of rendered receipts."""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._templates = {}
+        self._rendered = OrderedDict()
+
+    def template(self, width: int = 32) -> ReceiptTemplate:
+        template = self._templates.get(width)
+        if template is None:
+            template = self._templates[width] = ReceiptTemplate(width)
+        return template
+
+    def render(self, sale_data: dict, width: int = 32) -> str:
+        key = (sale_data.get('id'), _content_key(sale_data), width)
+        text = self._rendered.get(key)
+        if text is not None:
+            self._rendered.move_to_end(key)
+            return text
+        text = self._rendered[key] = self.template(width).render(sale_data)
+        if len(self._rendered) > self.maxsize:
+            self._rendered.popitem(last=False)
+        return text
+
+    def clear(self) -> None:
+        self._rendered.clear()
+
+
+# Shared renderer used by ReceiptGenerator
+receipt_renderer = ReceiptRenderer()
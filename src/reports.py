@@ -0,0 +1,152 @@
+# reports.py
+# Reports screen: net revenue, refunds and units grouped by day, hour,
+# category and/or SKU. Single-dimension reports (by day, or all-time by SKU
+# or category) come straight from the precomputed rollups (rollups.py);
+# anything else is computed by analytics.py from the sales history.
+# Queries use the same key:value style as the receipt search, e.g.
+#   category hour days:7        by:sku from:2025-04-01 to:2025-04-30 top:20
+
+from datetime import datetime, timedelta
+
+from textual import on
+from textual.app import ComposeResult
+from textual.binding import Binding
+from textual.containers import Container, Horizontal
+from textual.screen import Screen
+from textual.widgets import Button, DataTable, Input, Static
+
+from analytics import METRICS, SalesData
+from rollups import ROLLUP_DIMENSIONS
+from storage import get_default_storage
+
+
+def parse_report_query(text: str) -> dict:
+    """"category hour days:7" -> {"by": ("category", "hour"), "start": ..., "end": None, "top": 0}."""
+    query = {"by": [], "start": None, "end": None, "top": 0}
+    for token in text.lower().split():
+        key, _, value = token.partition(":")
+        if not value:
+            query["by"].append(key)
+        elif key == "by":
+            query["by"].extend(d for d in value.split(",") if d)
+        elif key == "from":
+            query["start"] = value
+        elif key == "to":
+            query["end"] = value
+        elif key == "days":
+            query["start"] = (datetime.now() - timedelta(days=int(value) - 1)).strftime("%Y-%m-%d")
+        elif key == "top":
+            query["top"] = int(value)
+        else:
+            raise ValueError(f"Unknown filter {key!r}")
+    query["by"] = tuple(query["by"]) or ("day",)
+    return query
+
+
+class ReportsScreen(Screen):
+    BINDINGS = [
+        Binding("f3", "app.pop_screen", "Back"),
+        Binding("f5", "reload", "Reload"),
+        Binding("ctrl+d", "group('day')", "By day"),
+        Binding("ctrl+o", "group('hour')", "By hour"),
+        Binding("ctrl+g", "group('category')", "By category"),
+        Binding("ctrl+k", "group('sku')", "By SKU"),
+    ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.query_input = Input(placeholder="category hour days:7 / by:sku from:YYYY-MM-DD to:YYYY-MM-DD top:20",
+                                 id="report-query")
+        self.table = DataTable(id="report-table", zebra_stripes=True)
+        self.summary = Static("Loading sales history...", id="report-summary")
+        self.data = None
+
+    def compose(self) -> ComposeResult:
+        yield Container(
+            Static("[bold cyan] NewOldPOS Terminal[/bold cyan]", classes="title"),
+            Static("Sales Reports", classes="title"),
+            self.query_input,
+            self.table,
+            self.summary,
+            Horizontal(
+                Button("Run", id="run"),
+                Button("Reload", id="reload"),
+                Button("Close", id="close"),
+                classes="buttons"
+            )
+        )
+
+    def on_mount(self) -> None:
+        self.query_input.value = "by:day days:30"
+        self.run_report()
+
+    def action_reload(self) -> None:
+        """Pick up sales made since the history was loaded."""
+        self.data = None
+        self.run_report()
+
+    def load_history(self) -> None:
+        """Read sales and returns (only new sales are parsed) in a background thread."""
+        self.summary.update("Loading sales history...")
+        self.run_worker(self.load, thread=True, exclusive=True, group="report-load")
+
+    def load(self) -> None:
+        data = SalesData.load(get_default_storage())
+        self.app.call_from_thread(self.loaded, data)
+
+    def loaded(self, data: SalesData) -> None:
+        self.data = data
+        self.run_report()
+
+    def action_group(self, dimension: str) -> None:
+        """Hotkeys: regroup the current query by one dimension."""
+        words = [w for w in self.query_input.value.split() if ":" in w and not w.startswith("by:")]
+        self.query_input.value = " ".join([f"by:{dimension}"] + words)
+        self.run_report()
+
+    @on(Button.Pressed, "#run")
+    @on(Input.Submitted, "#report-query")
+    def run_report(self) -> None:
+        try:
+            query = parse_report_query(self.query_input.value)
+            rows = self.from_rollups(query)
+            if rows is None:
+                if self.data is None:
+                    self.load_history()  # runs the report again when loaded
+                    return
+                rows = self.data.group(query["by"], query["start"], query["end"])
+        except ValueError as e:
+            self.summary.update(f"[red]{e}[/red]")
+            return
+        if query["top"]:
+            rows = sorted(rows, key=lambda r: r["net"], reverse=True)[:query["top"]]
+
+        self.table.clear(columns=True)
+        self.table.add_columns(*(d.title() for d in query["by"]), "Gross", "Refunds", "Net", "Units")
+        for row in rows:
+            self.table.add_row(*(str(row[d]) for d in query["by"]),
+                               *(f"${row[m]:,.2f}" for m in METRICS[:3]), str(row["units"]))
+        total = {m: sum(r[m] for r in rows) for m in METRICS}
+        self.summary.update(
+            f"{len(rows)} rows   [bold]Net ${total['net']:,.2f}[/bold]   Gross ${total['gross']:,.2f}   "
+            f"Refunds ${total['refunds']:,.2f}   Units {total['units']}"
+        )
+
+    def from_rollups(self, query: dict):
+        """Rows from the precomputed rollups, or None if the query needs the full history."""
+        by = query["by"]
+        if len(by) != 1 or by[0] not in ROLLUP_DIMENSIONS:
+            return None
+        if by[0] != "day":
+            return None if query["start"] or query["end"] else get_default_storage().rollup(by[0])
+        return [row for row in get_default_storage().rollup("day")
+                if (not query["start"] or row["day"] >= query["start"])
+                and (not query["end"] or row["day"] <= query["end"])]
+
+    @on(Button.Pressed, "#reload")
+    def reload_pressed(self) -> None:
+        self.action_reload()
+
+    @on(Button.Pressed, "#close")
+    def close_pressed(self) -> None:
+        self.app.pop_screen()
@@ -0,0 +1,73 @@
+# reservations.py
+# Stock held by open carts, for the JSON backend (data/reservations.json).
+# Each lane (one checkout terminal) holds {sku: quantity} for the items in
+# its open sale. A scan only succeeds if stock minus what other lanes hold
+# covers it, so two lanes can't both sell the last unit. Holds are dropped
+# when the sale is voided or committed; a lane that has not touched its
+# holds for `ttl` seconds (crashed terminal) is ignored and cleaned up.
+# The caller must hold the data-directory FileLock around load/change/save.
+
+from pathlib import Path
+import json
+import time
+
+from atomic import write_json_atomic
+
+RESERVATION_TTL = 30 * 60
+
+
+class ReservationBook:
+    """lane -> {"ts": last update, "skus": {sku: quantity}} kept in one JSON file."""
+
+    def __init__(self, path: Path = None, ttl: float = RESERVATION_TTL):
+        self.path = Path(path) if path is not None else None  # None: kept in memory only
+        self.ttl = ttl
+        self.lanes = {}
+
+    def load(self) -> "ReservationBook":
+        try:
+            with open(self.path, "r") as f:
+                self.lanes = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.lanes = {}
+        self.expire()
+        return self
+
+    def expire(self) -> None:
+        """Forget lanes that have not touched their holds within the TTL."""
+        cutoff = time.time() - self.ttl
+        for lane in [l for l, entry in self.lanes.items() if entry["ts"] < cutoff]:
+            del self.lanes[lane]
+
+    def save(self) -> None:
+        # no fsync: this runs on every scan under the lock, and holds lost in a
+        # power cut only matter until their carts are rescanned or expire
+        write_json_atomic(self.path, self.lanes, indent=None, fsync=False)
+
+    def held_by_others(self, lane: str, sku: str) -> int:
+        return sum(entry["skus"].get(sku, 0) for l, entry in self.lanes.items() if l != lane)
+
+    def set(self, lane: str, sku: str, quantity: int) -> None:
+        """Make `lane` hold exactly `quantity` of `sku` (0 drops the hold)."""
+        entry = self.lanes.setdefault(lane, {"ts": 0, "skus": {}})
+        entry["ts"] = time.time()
+        if quantity > 0:
+            entry["skus"][sku] = quantity
+        else:
+            entry["skus"].pop(sku, None)
+            if not entry["skus"]:
+                del self.lanes[lane]
+
+    def release(self, lane: str, sku: str = None) -> bool:
+        """Drop one hold or all of a lane's holds. Returns True if anything changed."""
+        entry = self.lanes.get(lane)
+        if entry is None:
+            return False
+        if sku is None:
+            del self.lanes[lane]
+            return True
+        if entry["skus"].pop(sku, None) is None:
+            return False
+        if not entry["skus"]:
+            del self.lanes[lane]
+        return True
@@ -4,7 +4,7 @@
 # - Add return items
 # - Undo return items
 # - Finalize transaction: issue refund, update inventory, log return
-# - Lock the original receipt in sales.json to prevent multiple returns
+# - Lock the original receipt to prevent multiple returns
 
 from textual.app import ComposeResult
 from textual.screen import Screen
@@ -12,8 +12,7 @@ from textual.widgets import Label, Input, Button, Static
 from textual.events import Key
 from textual.binding import Binding
 from pathlib import Path
-from datetime import datetime
-import json
+from storage import SaleLocked, get_default_storage
 
 # File paths for inventory, sales, and return logs
 DATA_PATH = Path(__file__).parent.parent / "data"
@@ -71,20 +70,18 @@ class ReturnsScreen(Screen):
             self.load_receipt()
 
     def load_receipt(self) -> None:
-        """Load and display receipt details from sales.json by ID."""
+        """Load and display receipt details by ID."""
         receipt_id = self.receipt_id_input.value.strip()
         if not receipt_id:
             self.receipt_area.update("[red]Receipt ID cannot be empty.[/red]")
             return
 
         try:
-            with open(SALES_FILE) as f:
-                sales = json.load(f)
+            self.sale = get_default_storage().find_sale(receipt_id)
         except Exception as e:
             self.receipt_area.update(f"[red]Error loading sales: {e}[/red]")
             return
 
-        self.sale = next((s for s in sales if str(s["id"]) == receipt_id), None)
         if not self.sale:
             self.receipt_area.update(f"[red]Sale with ID {receipt_id} not found.[/red]")
             return
@@ -201,63 +198,24 @@ class ReturnsScreen(Screen):
             charge = item["charge"] * item["quantity"]
             total_refund += charge
             summary += f"- {item['name']} (SKU: {item['sku']}) x {item['quantity']} → Refund: ${charge:.2f}\n"
-            self.update_inventory(item)
 
-        summary += f"\n[bold]Total Refunded:[/bold] ${total_refund:.2f}"
-        self.return_summary_area.update(summary)
-
-        self.save_return_transaction(total_refund)
-        self.lock_original_receipt()
-
-    def update_inventory(self, item) -> None:
-        """Update product stock in products.json by adding returned quantity."""
-        try:
-            with open(PRODUCTS_FILE, "r") as f:
-                products = json.load(f)
-        except Exception:
-            return
-
-        if item["id"] in products:
-            products[item["id"]]["stock"] += item["quantity"]
-
-        with open(PRODUCTS_FILE, "w") as f:
-            json.dump(products, f, indent=2)
-
-    def save_return_transaction(self, total_refund: float) -> None:
-        """Append a return record to returns.json."""
-        return_data = {
-            "id": int(datetime.now().timestamp()),
-            "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "items": self.returned_items,
-            "total_refund": round(total_refund, 2)
-        }
-
-        if RETURNS_FILE.exists():
-            with open(RETURNS_FILE, "r") as f:
-                returns = json.load(f)
-        else:
-            returns = []
-
-        returns.append(return_data)
-
-        with open(RETURNS_FILE, "w") as f:
-            json.dump(returns, f, indent=2)
-
-    def lock_original_receipt(self) -> None:
-        """Mark the original sale record in sales.json as locked after return."""
+        # restock, log the return and lock the sale as one commit
         try:
-            with open(SALES_FILE, "r") as f:
-                sales = json.load(f)
-        except Exception:
+            get_default_storage().commit_return(self.sale, self.returned_items, total_refund)
+        except SaleLocked:
+            # another terminal returned this receipt after we loaded it
+            self.return_summary_area.update(
+                f"[red]Sale ID {self.sale['id']} has already been returned and is locked. Nothing was refunded.[/red]")
+            self.returned_items = []
+            self.sale = None
             return
 
-        for sale in sales:
-            if sale["id"] == self.sale["id"]:
-                sale["locked"] = True
-                break
+        summary += f"\n[bold]Total Refunded:[/bold] ${total_refund:.2f}"
+        self.return_summary_area.update(summary)
 
-        with open(SALES_FILE, "w") as f:
-            json.dump(sales, f, indent=2)
+        # sale is now locked; clear state so F8 cannot refund twice
+        self.returned_items = []
+        self.sale = None
 
     def action_back(self) -> None:
         """Return to the previous screen."""
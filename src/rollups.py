@@ -0,0 +1,171 @@
+# rollups.py
+# Running sales totals per day, SKU and category, updated as each sale and
+# return commits, so the reports screen and dashboards read them without
+# scanning the history.
+# Every key holds gross sales, refunds and net units (sold - returned);
+# net revenue is gross - refunds. A return counts on the day it was made,
+# under the category its SKU has at that time.
+# The JSON backend keeps them in data/rollups.json, written together with
+# the products.json snapshot and stamped with the last sale ID and the
+# number of returns they include; whatever the file is missing is folded
+# in from the journal and returns.json on the next commit or read.
+# The SQLite backend keeps them in the rollups table, updated in the same
+# transaction as the sale or return.
+#
+#   python src/rollups.py show [--by day|sku|category] [--storage json|sqlite] [--data DIR]
+#   python src/rollups.py rebuild [--storage json|sqlite] [--data DIR]
+
+from pathlib import Path
+import argparse
+import json
+
+from atomic import write_json_atomic
+
+ROLLUP_DIMENSIONS = ("day", "sku", "category")
+UNKNOWN_CATEGORY = "(unknown)"
+
+
+def refund_amount(item: dict) -> float:
+    """Refund for one returned line (the returns screen stores a per-unit charge)."""
+    if "charge" in item:
+        return item["charge"] * item["quantity"]
+    if "total" in item:
+        return item["total"]
+    return item.get("price", 0) * item["quantity"]
+
+
+def _category(products, sku: str) -> str:
+    product = products.get(sku)
+    return product["category"] if product is not None else UNKNOWN_CATEGORY
+
+
+def sale_rows(sale: dict, products) -> list:
+    """(dimension, key, gross, refunds, units) increments for one sale."""
+    day = sale["date"][:10]
+    rows = []
+    for item in sale["items"]:
+        sku = str(item["sku"])
+        amount, quantity = item["total"], item["quantity"]
+        rows += [("day", day, amount, 0.0, quantity),
+                 ("sku", sku, amount, 0.0, quantity),
+                 ("category", _category(products, sku), amount, 0.0, quantity)]
+    return rows
+
+
+def return_rows(record: dict, products) -> list:
+    """(dimension, key, gross, refunds, units) increments for one return."""
+    day = record["date"][:10]
+    rows = []
+    for item in record["items"]:
+        sku = str(item["sku"])
+        refund, quantity = refund_amount(item), item["quantity"]
+        rows += [("day", day, 0.0, refund, -quantity),
+                 ("sku", sku, 0.0, refund, -quantity),
+                 ("category", _category(products, sku), 0.0, refund, -quantity)]
+    return rows
+
+
+def rollup_rows(dimension: str, totals) -> list:
+    """(key, gross, refunds, units) tuples -> report rows, sorted by key."""
+    return [
+        {dimension: key, "gross": round(gross, 2), "refunds": round(refunds, 2),
+         "net": round(gross - refunds, 2), "units": units}
+        for key, gross, refunds, units in sorted(totals)
+    ]
+
+
+def check_dimension(dimension: str) -> None:
+    if dimension not in ROLLUP_DIMENSIONS:
+        raise ValueError(f"No rollup by {dimension!r} (use {', '.join(ROLLUP_DIMENSIONS)})")
+
+
+class SalesRollups:
+    """In-memory rollups for the JSON backend, saved to `path`."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.clear()
+        self._saved = None
+
+    def clear(self) -> None:
+        self.totals = {dim: {} for dim in ROLLUP_DIMENSIONS}  # key -> [gross, refunds, units]
+        self.last_sale = 0  # highest sale ID included
+        self.returns = 0    # returns.json records included
+
+    def load(self) -> "SalesRollups":
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            self.totals = {dim: data["totals"][dim] for dim in ROLLUP_DIMENSIONS}
+            self.last_sale, self.returns = data["last_sale"], data["returns"]
+            self._saved = (self.last_sale, self.returns)
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            self.clear()  # rebuilt from the history on first use
+        return self
+
+    def save(self) -> None:
+        """Write the rollups if they changed since the last save."""
+        if self._saved == (self.last_sale, self.returns):
+            return
+        write_json_atomic(self.path, {"last_sale": self.last_sale, "returns": self.returns,
+                                      "totals": self.totals}, indent=None)
+        self._saved = (self.last_sale, self.returns)
+
+    def apply(self, rows) -> None:
+        for dimension, key, gross, refunds, units in rows:
+            totals = self.totals[dimension].get(key)
+            if totals is None:
+                self.totals[dimension][key] = [gross, refunds, units]
+            else:
+                totals[0] += gross
+                totals[1] += refunds
+                totals[2] += units
+
+    def add_sales(self, sales, products) -> None:
+        """Fold in sales newer than `last_sale` (in ID order)."""
+        for sale in sales:
+            if sale["id"] > self.last_sale:
+                self.apply(sale_rows(sale, products))
+                self.last_sale = sale["id"]
+
+    def add_returns(self, records, products) -> None:
+        for record in records:
+            self.apply(return_rows(record, products))
+            self.returns += 1
+
+    def rows(self, dimension: str) -> list:
+        check_dimension(dimension)
+        return rollup_rows(dimension, ((key, *totals) for key, totals in self.totals[dimension].items()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precomputed sales totals per day, SKU and category")
+    parser.add_argument("command", choices=["show", "rebuild"])
+    parser.add_argument("--by", default="day", help=", ".join(ROLLUP_DIMENSIONS))
+    parser.add_argument("--storage", default=None, help="json, sqlite or remote (default: POS_STORAGE)")
+    parser.add_argument("--data", default=None, help="data directory (default: data/)")
+    args = parser.parse_args(argv)
+
+    from analytics import METRICS, format_table
+    from storage import get_storage
+    store = get_storage(args.storage, Path(args.data) if args.data else None)
+    try:
+        if args.command == "rebuild":
+            counts = store.rebuild_rollups()
+            print(f"Rebuilt rollups from {counts['sales']} sales and {counts['returns']} returns")
+            return
+        try:
+            rows = store.rollup(args.by)
+        except ValueError as e:
+            parser.error(str(e))
+        print(format_table(rows, (args.by,)))
+        total = {m: sum(r[m] for r in rows) for m in METRICS}
+        print(f"\n{len(rows)} rows, net ${total['net']:.2f} (gross ${total['gross']:.2f}, "
+              f"refunds ${total['refunds']:.2f}), {total['units']} units")
+    finally:
+        if hasattr(store, "close"):
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,3 @@
-import json
-from datetime import datetime
 from textual.app import App, ComposeResult
 from textual.containers import Container, Center
 from textual.widgets import Static, Input, Button, DataTable
@@ -11,16 +9,16 @@ from textual import events
 from pathlib import Path
 from rich.text import Text
 from textual import on
-from main import load_inventory, save_sale
+from main import save_sale
 from receipt import *
+from storage import get_default_storage
+from cart import CartLine
+from checkout import CheckoutError, UnknownSku, checkout
 
 def add_item_to_sale(item_id: str, quantity: int):
     """Add an item to a sale, checking stock availability."""
-    with open("data/products.json", "r") as f:
-        products = json.load(f)
-    
-    if item_id in products:
-        item = products[item_id]
+    item = get_default_storage().product(item_id)
+    if item is not None:
         if item["stock"] >= quantity:
             return {"name": item["name"], "total": item["price"] * quantity}
         else:
@@ -28,42 +26,9 @@ def add_item_to_sale(item_id: str, quantity: int):
     return {"error": "Item not found!"}
 
 def save_sale(cart: list, total: float):
-    """Save the sale details to sales.json."""
-    try:
-        with open("data/sales.json", "r") as f:
-            sales = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        sales = []
-        
-    if sales:
-        last_id = max(sale.get("id",0) for sale in sales)
-        new_id = last_id +1
-    else:
-        new_id = 1
-    
-    #json sales entry    
-    sale = {
-        "id": new_id,
-        "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "items": cart,
-        "total": total
-    }
-    sales.append(sale)
-    
-    #update inventory
-    inventory = load_inventory()
-    for item in cart:
-        sku = str(item["sku"])
-        qty_sold = item["quantity"]
-        if sku in inventory:
-            inventory[sku]['stock']=max(inventory[sku]['stock']-qty_sold,0)
-            
-    with open("data/products.json", "w") as f:
-        json.dump(inventory, f, indent=2)
-    with open("data/sales.json", "w") as f:
-        json.dump(sales, f, indent=2)
-        
-    return new_id
+    """Deduct stock and record the sale through the storage backend."""
+    sale = get_default_storage().commit_sale(cart, total)
+    return sale["id"]
         
 class SalesScreen(Screen):
     BINDINGS = [
@@ -74,22 +39,26 @@ class SalesScreen(Screen):
         Binding("enter", "add_item", "Add Item"),
         Binding("ctrl+z", "undo_last", "Undo Last"),
         Binding("-", "undo_last", "Undo Last"),
+        Binding("ctrl+y", "redo_last", "Redo"),
         Binding("f12", "complete_sale", "Complete Sale"),
     ]
 
 
-    cart = reactive([])
-    action_history = []  # Track all actions for undo
-    selected_item = reactive(None)  # Track selected item for editing
+    selected_item = reactive(None)  # Track selected cart line for editing
 
     def compose(self) -> ComposeResult:
+        self.checkout = checkout  # pricing, stock checks, undo and commit
+        self.cart = checkout.cart  # read-only here, changed through self.checkout
         self.cart_table = DataTable(id="cart-table")
         self.cart_table.cursor_type = "row"  # Ensure row selection is enabled
-        self.cart_table.add_columns("SKU", "Name", "Qty", "Price")
+        self._qty_col, self._price_col = self.cart_table.add_columns("SKU", "Name", "Qty", "Price")[2:]
+        self._rendered = {}  # sku -> quantity currently shown in the table
+        self._has_total_row = False
         
         self.input_sku = Input(placeholder="Scan or enter SKU", id="sku-input")
         self.input_qty = Input(placeholder="Enter new quantity", id="qty-input")
         self.message = Static("", id="message")
+        self.last_sale = None  # the sale this lane completed last; F4 prints it
         
                 # Add operations help box
         self.operations_help = Static(
@@ -99,6 +68,7 @@ class SalesScreen(Screen):
  [b]Edit Qty[/b]: Select + New Value 
  [b]Delete[/b]: Select + "-" or "d"  
  [b]Undo[/b]: Ctrl+Z               
+ [b]Redo[/b]: Ctrl+Y               
  [b]Complete Sale[/b]: F12
  [b]Back to Main Menu[/b]: F3 
  [b]Print Receipt[/b]: F4 
@@ -159,16 +129,11 @@ class SalesScreen(Screen):
         #focus sku input bar 
         self.input_sku.focus()
 
-        
-    def add_to_history(self, action_type: str, data: dict):
-        """Record an action in history"""
-        self.action_history.append({
-            "type": action_type,
-            "data": data,
-            "snapshot": [item.copy() for item in self.cart]  # Save cart state
-        })
+    def on_screen_resume(self) -> None:
+        #pick up items quick-added from the inventory screen
+        self.refresh_cart_table()
 
-    def watch_selected_item(self, selected_item: dict | None) -> None:
+    def watch_selected_item(self, selected_item: CartLine | None) -> None:
         # Remove disabling of the quantity input field so it is always enabled.
         self.input_qty.disabled = selected_item is None
         self.query_one("#update").disabled = selected_item is None
@@ -176,7 +141,7 @@ class SalesScreen(Screen):
 
         if selected_item:
             #using placeholder to show current quantity
-            temp = str(selected_item["quantity"])
+            temp = str(selected_item.quantity)
             self.input_qty.placeholder = f"Current: {temp}"
             
             self.input_qty.focus()
@@ -193,8 +158,8 @@ class SalesScreen(Screen):
         row_key = event.row_key.value if event.row_key else None
         
         if row_key and row_key != "total":  # Skip the total row
-            # Find the item in cart with matching SKU
-            self.selected_item = next((item for item in self.cart if item["sku"] == row_key), None)
+            # Find the cart line with matching SKU
+            self.selected_item = self.cart.get(row_key)
         else:
             self.selected_item = None
             
@@ -204,18 +169,12 @@ class SalesScreen(Screen):
         if not self.selected_item:
             return
         
-        sku = self.selected_item["sku"]
-        item_name = self.selected_item["name"]
-        
-        # Record deletion in history
-        self.add_to_history("delete_item", {
-            "sku": sku,
-            "item": self.selected_item.copy()
-        })
+        sku = self.selected_item.sku
+        item_name = self.selected_item.name
         
-        # Remove item from cart
-        self.cart = [item for item in self.cart if item["sku"] != sku]
-        self.cart = self.cart.copy()  # Force UI update
+        # Remove item from cart (recorded for undo)
+        self.checkout.remove(sku)
+        self.render_cart_line(sku, None)
         self.message.update(f"Removed {item_name} from cart")
         self.input_sku.focus()
         self.selected_item = None
@@ -228,54 +187,41 @@ class SalesScreen(Screen):
     
     @on(Button.Pressed, "#undo")
     def undo_last_entry(self) -> None:
-        """Undo the last action"""
-        if not self.action_history:
+        """Undo the last action by applying its inverse delta"""
+        try:
+            delta = self.checkout.undo()
+        except CheckoutError as e:  # the stock it would restore was sold on another lane
+            self.message.update(str(e))
+            return
+        if delta is None:
             self.message.update("Nothing to undo")
             return
-            
-        last_action = self.action_history.pop()
         
-        if last_action["type"] == "add_item":
-            # Undo add item - restore previous cart state
-            self.cart = [item.copy() for item in last_action["snapshot"]]
-            self.message.update(f"Undo: Removed {last_action['data']['quantity']} of {last_action['data']['sku']}")
-            
-        elif last_action["type"] == "edit_qty":
-            # Restore previous quantity
-            sku = last_action["data"]["sku"]
-            old_qty = last_action["data"]["old_qty"]
-            
-            #reconstruct cart with old quantity
-            new_cart = []
-            for item in self.cart:
-                if item["sku"] == sku:
-                    new_item = item.copy()
-                    new_item["quantity"] = old_qty
-                    new_item["total"] = old_qty * item["price"]
-                    new_cart.append(new_item)
-                else:
-                    new_cart.append(item.copy())
-            self.cart = new_cart
-            self.message.update(f"Undo: Restored quantity to {old_qty}")
+        if delta.old_qty == 0: # undo add item
+            self.message.update(f"Undo: Removed {delta.new_qty} of {delta.sku}")
+        elif delta.new_qty == 0: # undo delete item
+            self.message.update(f"Undo: Restored {delta.name} (qty: {delta.old_qty})")
+        else: # undo quantity change (edit or repeat scan)
+            self.message.update(f"Undo: Restored quantity to {delta.old_qty}")
             
-        elif last_action["type"] == "delete_item":
-            restored_item = last_action["data"]["item"]
-            
-            # Check if item already exists in cart
-            existing_index = next((i for i, x in enumerate(self.cart) if x["sku"] == restored_item["sku"]), None)
-            
-            if existing_index is not None:
-                # If item exists, add the restored quantity to it
-                self.cart[existing_index]["quantity"] += restored_item["quantity"]
-                self.cart[existing_index]["total"] += restored_item["total"]
-            else:
-                # Otherwise add the item back as it was
-                self.cart.append(restored_item.copy())
-            
-            self.message.update(f"Undo: Restored {restored_item['name']} (qty: {restored_item['quantity']})")
-            
-        # Force UI update
-        self.watch_cart()
+        self.selected_item = None
+        self.render_cart_line(delta.sku, self.cart.get(delta.sku))
+        self.input_sku.focus()
+
+    def action_redo_last(self) -> None:
+        """Action triggered by ctrl+y: re-apply the last undone change"""
+        try:
+            delta = self.checkout.redo()
+        except CheckoutError as e:
+            self.message.update(str(e))
+            return
+        if delta is None:
+            self.message.update("Nothing to redo")
+            return
+        
+        self.message.update(f"Redo: {delta.name} quantity {delta.old_qty} -> {delta.new_qty}")
+        self.selected_item = None
+        self.render_cart_line(delta.sku, self.cart.get(delta.sku))
         self.input_sku.focus()
 
     @on(Button.Pressed, "#update")
@@ -289,17 +235,12 @@ class SalesScreen(Screen):
         
         # Handle deletion if input is '-' or 'd'
         if input_text in ('-', 'd'):
-            sku = self.selected_item["sku"]
-            item_name = self.selected_item["name"]
-            
-            # Record deletion in history
-            self.add_to_history("delete_item", {
-                "sku": sku,
-                "item": self.selected_item.copy()
-            })
+            sku = self.selected_item.sku
+            item_name = self.selected_item.name
             
-            # Remove item from cart
-            self.cart = [item for item in self.cart if item["sku"] != sku]
+            # Remove item from cart (recorded for undo)
+            self.checkout.remove(sku)
+            self.render_cart_line(sku, None)
             self.message.update(f"Removed {item_name} from cart")
             self.input_qty.value = ""
             self.input_qty.placeholder = "Enter new quantity"
@@ -309,144 +250,95 @@ class SalesScreen(Screen):
         
         try:
             new_qty = int(self.input_qty.value)
-            if new_qty <= 0:
-                self.message.update("Quantity must be positive")
-                return
-
-            inventory = load_inventory()
-            sku = self.selected_item["sku"]
-            item_name = self.selected_item["name"]  # Store name before clearing
-            
-            # Check stock availability
-            if inventory[sku]["stock"] < new_qty:
-                self.message.update(f"Only {inventory[sku]['stock']} available in stock")
-                return
+            sku = self.selected_item.sku
+            item_name = self.selected_item.name  # Store name before clearing
             
-            # Record state before modification
-            self.add_to_history("edit_qty", {
-                "sku": sku,
-                "old_qty": self.selected_item["quantity"],
-                "new_qty": new_qty
-            })
-
-            # Update quantity in a new cart
-            new_cart = []
-            for item in self.cart:
-                if item["sku"] == sku:
-                    new_item = item.copy()
-                    new_item["quantity"] = new_qty
-                    new_item["total"] = new_item["price"] * new_qty
-                    new_cart.append(new_item)
-                else:
-                    new_cart.append(item.copy())
-            
-            # Force cart update
-            self.cart = new_cart
+            # Checks stock, records the change for undo and updates in place
+            line = self.checkout.set_quantity(sku, new_qty)
+            self.render_cart_line(sku, line)
             self.message.update(f"Updated {item_name} quantity")
             self.input_qty.value = ""
             self.input_qty.placeholder = "Enter new quantity"
             self.input_sku.focus()
             self.selected_item = None  # Clear selection after update
+        except CheckoutError as e:
+            self.message.update(str(e))
         except ValueError: #error message when NaN
             self.message.update("Please enter a valid number")
 
     @on(Input.Submitted, "#sku-input")
     @on(Input.Submitted, "#qty_input")
     def add_item(self) -> None:
-        input_text = self.input_sku.value.strip()
-        if not input_text:
-            self.message.update("Please enter a SKU")
-            return
-        
-        # Split input into SKU and quantity (default quantity is 1)
-        if '.' in input_text:
-            try:
-                sku, quantity_str = input_text.split('.')
-                quantity = int(quantity_str)
-                if quantity <= 0:
-                    self.message.update("Quantity must be positive")
-                    return
-            except ValueError:
-                self.message.update("Invalid quantity format (use SKU.QUANTITY)")
-                return
-        else:
-            sku = input_text
-            quantity = 1
-            
-        inventory = load_inventory()
-        if sku not in inventory: #SKU DNE
-            self.message.update(f"SKU {sku} not found")
+        # SKU or SKU.QUANTITY; adds a new line or merges into the existing one
+        try:
+            line = self.checkout.scan(self.input_sku.value)
+        except UnknownSku as e: #SKU DNE
+            self.message.update(str(e))
             self.input_sku.value = ""
             self.input_sku.focus()
             return
-            
-        item = inventory[sku]
-        
-        # Check if item already exists in cart
-        existing_index = next((i for i, x in enumerate(self.cart) if x["sku"] == sku), None)
-        
-        # Record action before modifying cart
-        self.add_to_history("add_item", {
-            "sku": sku,
-            "quantity": quantity,
-            "existing_index": existing_index,
-            "current_qty": self.cart[existing_index]["quantity"] if existing_index is not None else 0
-        })
-        
-        if existing_index is not None:
-            # Update existing item
-            self.cart[existing_index]["quantity"] += quantity
-            self.cart[existing_index]["total"] += item["price"] * quantity
-        else:
-            # Add new item
-            self.cart.append({
-                "sku": sku,
-                "name": item["name"],
-                "quantity": quantity,
-                "price": item["price"],
-                "total": item["price"] * quantity
-            })
+        except CheckoutError as e:
+            self.message.update(str(e))
+            return
         
-        self.watch_cart()
+        self.selected_item = None
+        self.render_cart_line(line.sku, line)
         self.input_sku.value = ""
-        self.message.update(f"Added {item['name']}")
+        self.message.update(f"Added {line.name}")
         self.input_sku.focus()# Re-focus SKU input after adding item
 
 
-    def watch_cart(self) -> None:
-        """Automatically called when cart changes"""
-        self.cart_table.clear()
+    def refresh_cart_table(self) -> None:
+        """Bring the table in line with the cart: only rows that differ are touched"""
         self.selected_item = None  # Clear selection when cart changes
-        
-        # Create a dictionary to combine duplicate SKUs
-        combined_items = {}
-        for item in self.cart:
-            if item["sku"] in combined_items:
-                combined_items[item["sku"]]["quantity"] += item["quantity"]
-                combined_items[item["sku"]]["total"] += item["total"]
-            else:
-                combined_items[item["sku"]] = item.copy()
-        
-        # Display the combined items with row keys
-        for sku, item in combined_items.items():
+        for sku in [s for s in self._rendered if s not in self.cart]:
+            self.render_cart_line(sku, None)
+        for line in self.cart:
+            self.render_cart_line(line.sku, line)
+
+    def render_cart_line(self, sku: str, line: CartLine | None) -> None:
+        """Add, update or remove the one table row for `sku` (row key = SKU)"""
+        shown = self._rendered.get(sku)
+        if line is None:
+            if shown is not None:
+                self.cart_table.remove_row(sku)
+                del self._rendered[sku]
+        elif shown is None:
+            self._remove_total_row()  # new rows go above the total row
             self.cart_table.add_row(
                 sku,
-                item["name"],
-                str(item["quantity"]),
-                f"${item['total']:.2f}",
+                line.name,
+                str(line.quantity),
+                f"${line.total:.2f}",
                 key=sku  # Important: Set the row key to SKU
             )
-        
-        # Add total row if cart has items
-        if combined_items:
-            total = sum(item["total"] for item in combined_items.values())
+            self._rendered[sku] = line.quantity
+        elif shown != line.quantity:
+            self.cart_table.update_cell(sku, self._qty_col, str(line.quantity))
+            self.cart_table.update_cell(sku, self._price_col, f"${line.total:.2f}")
+            self._rendered[sku] = line.quantity
+        self._render_total_row()
+
+    def _remove_total_row(self) -> None:
+        if self._has_total_row:
+            self.cart_table.remove_row("total")
+            self._has_total_row = False
+
+    def _render_total_row(self) -> None:
+        """Keep the total row (last row) in sync with the cart's cached subtotal"""
+        if not self._rendered:
+            self._remove_total_row()
+        elif self._has_total_row:
+            self.cart_table.update_cell("total", self._price_col, Text(f"${self.cart.subtotal:.2f}", style="bold green"))
+        else:
             self.cart_table.add_row(
                 "", 
                 "", 
                 Text("Total:", style="bold"), 
-                Text(f"${total:.2f}", style="bold green"),
+                Text(f"${self.cart.subtotal:.2f}", style="bold green"),
                 key="total"  # Different key for total row
             )
+            self._has_total_row = True
     
     def action_search_receipts(self) -> None:
         """Action triggered by F5"""
@@ -458,15 +350,15 @@ class SalesScreen(Screen):
         
     @on(Button.Pressed, "#finish")
     def complete_sale(self) -> None:
-        if not self.cart:
-            self.message.update("Cart is empty")
+        try:
+            sale = self.checkout.commit()  # also starts a new sale with empty history
+        except CheckoutError as e:
+            self.message.update(str(e))
             return
             
-        total = sum(item["total"] for item in self.cart)
-        sales_id = save_sale(self.cart, total)
-        self.message.update(f"Sale #{sales_id} completed! Total: ${total:.2f}")
-        self.cart = []  # Clear cart (triggers watch_cart)
-        self.action_history = []  # Clear history after sale
+        self.last_sale = sale
+        self.message.update(f"Sale #{sale['id']} completed! Total: ${sale['total']:.2f}")
+        self.refresh_cart_table()
         self.input_sku.focus()
         
         self.query_one("#print", Button).disabled = False # Enable print button after sale completion
@@ -482,20 +374,17 @@ class SalesScreen(Screen):
     @on(Button.Pressed, "#print")
     def print_receipt(self)-> None:
         try:
-            with open("data/sales.json", "r") as f:
-                sales = json.load(f)
-            if not sales:
+            # this screen's own sale: the newest one in the shared journal may be another lane's
+            last_sale = self.last_sale
+            if not last_sale:
                 self.message.update("No sales data found")
                 return
             
-            last_sale = sales[-1]
-            
-            # Generate receipt text and PDF
+            # Show the text receipt now, the PDF is rendered in the background
             text_receipt = ReceiptGenerator.generate_receipt(last_sale)
-            pdf_path = ReceiptGenerator.generate_pdf_receipt(last_sale)
             
             self.app.push_screen(
-                ReceiptScreen(text_receipt, pdf_path)
+                ReceiptScreen(text_receipt, sale=last_sale)
             )
             
         except Exception as e:
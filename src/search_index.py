@@ -0,0 +1,155 @@
+# search_index.py
+# Prebuilt product search for InventoryScreen.
+# - exact SKU hash lookup for numeric queries
+# - sorted name and word lists for prefix matches ("dri" -> "Drill Bit Set")
+# - trigram index over lowercase names for substring matches (1-2 character
+#   terms have no trigram and are matched by scanning the names); categories
+#   are few, so each distinct category maps straight to its SKUs
+# Names and categories are lowercased once at build time, never per query.
+# Results are ranked: exact SKU, name prefix, word prefix, name substring,
+# category match.
+# Building takes seconds for very large catalogs, so it runs on a worker
+# thread (InventoryScreen starts one whenever the catalog is reloaded) and
+# the finished index is swapped in whole. Until then searches use the
+# previous index, limited to SKUs still in the catalog (a reload usually
+# only changes stock), or scan the catalog if there is no index yet.
+
+from bisect import bisect_left
+import re
+import threading
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class _Index:
+    """One complete build of the index; never changed after __init__."""
+
+    def __init__(self, products: dict):
+        self.names = {}       # sku -> lowercase name
+        self.order = {}       # sku -> catalog position (stable tie-break)
+        self.full_names = []  # sorted (name, sku) pairs
+        self.name_words = []  # sorted (word, sku) pairs from names
+        self.by_category = {} # lowercase category -> set of skus
+        self.trigrams = {}    # trigram -> set of skus (names only)
+        for pos, (sku, item) in enumerate(products.items()):
+            name = item["name"].lower()
+            self.names[sku] = name
+            self.order[sku] = pos
+            self.by_category.setdefault(item["category"].lower(), set()).add(sku)
+            for gram in _trigrams(name):
+                self.trigrams.setdefault(gram, set()).add(sku)
+            self.full_names.append((name, sku))
+            self.name_words.extend((w, sku) for w in set(_WORD.findall(name)))
+        self.full_names.sort()
+        self.name_words.sort()
+
+    @staticmethod
+    def _prefix(pairs: list, term: str) -> set:
+        found = set()
+        i = bisect_left(pairs, (term,))
+        while i < len(pairs) and pairs[i][0].startswith(term):
+            found.add(pairs[i][1])
+            i += 1
+        return found
+
+    def _substring(self, term: str) -> set:
+        grams = _trigrams(term)
+        if not grams:  # "3m", "ab": too short for the trigram index
+            return {s for s, name in self.names.items() if term in name}
+        candidates = None
+        for gram in sorted(grams, key=lambda g: len(self.trigrams.get(g, ()))):
+            skus = self.trigrams.get(gram)
+            if not skus:
+                return set()
+            candidates = set(skus) if candidates is None else candidates & skus
+            if not candidates:
+                return set()
+        return {s for s in candidates if term in self.names[s]}
+
+    def search(self, term: str) -> list:
+        # rank tiers: whole-name prefix, word prefix, name substring, category substring
+        tiers = []
+        seen = set()
+        for found in (
+            self._prefix(self.full_names, term),
+            self._prefix(self.name_words, term),
+            self._substring(term),
+            set().union(*(skus for cat, skus in self.by_category.items() if term in cat)),
+        ):
+            found -= seen
+            seen |= found
+            tiers.extend(sorted(found, key=self.order.__getitem__))
+        return tiers
+
+
+def _scan(products: dict, term: str) -> list:
+    """The same ranking as _Index.search, by one pass over the catalog (no index yet)."""
+    tiers = ([], [], [], [])
+    for sku, item in products.items():
+        name = item["name"].lower()
+        if term not in name:  # so no prefix of the name or its words either
+            if term in item["category"].lower():
+                tiers[3].append(sku)
+        elif name.startswith(term):
+            tiers[0].append(sku)
+        elif any(word.startswith(term) for word in _WORD.findall(name)):
+            tiers[1].append(sku)
+        else:
+            tiers[2].append(sku)
+    return [sku for tier in tiers for sku in tier]
+
+
+class SearchIndex:
+    """Token/trigram index over a SKU -> product mapping, built off the UI thread."""
+
+    def __init__(self):
+        self._built = (None, None)  # (catalog dict, its _Index), replaced as one
+        self._wanted = None         # newest catalog a build was started for
+        self._lock = threading.Lock()
+
+    def needs_build(self, products: dict) -> bool:
+        """True if no build of `products` is done or running; the caller then runs build().
+
+        Counts as that build starting, so the next keystroke doesn't start
+        another. Stock edits happen in place on the same dict and don't
+        affect the index; a reload (new dict) does.
+        """
+        with self._lock:
+            if self._wanted is products:
+                return False
+            self._wanted = products
+            return True
+
+    def build(self, products: dict) -> None:
+        """Index `products`. Slow for big catalogs: call it from a worker thread."""
+        with self._lock:
+            self._wanted = products
+        index = _Index(products)
+        with self._lock:
+            if self._wanted is products:  # a build for a newer catalog may have started meanwhile
+                self._built = (products, index)
+
+    def search(self, products: dict, query: str) -> list:
+        """Ranked SKUs matching `query` (digits = exact SKU, text = name/category).
+
+        Never builds; see the module header for what is searched meanwhile.
+        """
+        term = query.strip().lower()
+        if not term:
+            return []
+        if term.isdigit():
+            sku = str(int(term))
+            return [sku] if sku in products else []
+        indexed, index = self._built
+        if index is None:
+            return _scan(products, term)
+        found = index.search(term)
+        return found if indexed is products else [sku for sku in found if sku in products]
+
+
+# Shared instance used by InventoryScreen
+search_index = SearchIndex()
@@ -0,0 +1,479 @@
+# sqlite_store.py
+# SQLite (WAL mode) storage backend, selected with POS_STORAGE=sqlite.
+# A checkout or a return is one transaction, so stock and the sales/returns
+# tables can never disagree after a crash. Lanes sharing the database
+# serialize their writes with BEGIN IMMEDIATE and hold stock for open carts
+# in the reservations table. The rollups table (see rollups.py) is updated
+# in the same transactions.
+#
+#   python src/sqlite_store.py import [--db data/pos.db]   # load data/*.json
+
+from pathlib import Path
+import argparse
+import json
+import sqlite3
+import threading
+import time
+
+from storage import DATA_PATH, JsonStorage, SaleLocked, new_return_record, read_json_files
+from reservations import RESERVATION_TTL
+from product_store import COMPACT_CATALOG, ProductTable
+from rollups import UNKNOWN_CATEGORY, check_dimension, return_rows, rollup_rows, sale_rows
+from datetime import datetime
+
+DB_FILE = DATA_PATH / "pos.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    sku TEXT PRIMARY KEY,
+    category TEXT NOT NULL,
+    name TEXT NOT NULL,
+    price REAL NOT NULL,
+    stock INTEGER NOT NULL,
+    next_ship TEXT,
+    next_ship_qty INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS products_category ON products(category);
+
+CREATE TABLE IF NOT EXISTS sales (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    total REAL NOT NULL,
+    locked INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS sales_date ON sales(date);
+
+CREATE TABLE IF NOT EXISTS sale_items (
+    sale_id INTEGER NOT NULL REFERENCES sales(id),
+    line INTEGER NOT NULL,
+    sku TEXT NOT NULL,
+    name TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    price REAL NOT NULL,
+    total REAL NOT NULL,
+    PRIMARY KEY (sale_id, line)
+);
+CREATE INDEX IF NOT EXISTS sale_items_sku ON sale_items(sku, sale_id);
+
+CREATE TABLE IF NOT EXISTS returns (
+    seq INTEGER PRIMARY KEY,
+    id INTEGER NOT NULL,
+    sale_id INTEGER,
+    date TEXT NOT NULL,
+    total_refund REAL NOT NULL,
+    items TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS returns_date ON returns(date);
+CREATE INDEX IF NOT EXISTS returns_sale ON returns(sale_id);
+
+CREATE TABLE IF NOT EXISTS reservations (
+    lane TEXT NOT NULL,
+    sku TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (lane, sku)
+);
+CREATE INDEX IF NOT EXISTS reservations_sku ON reservations(sku);
+
+CREATE TABLE IF NOT EXISTS rollups (
+    dimension TEXT NOT NULL,
+    key TEXT NOT NULL,
+    gross REAL NOT NULL,
+    refunds REAL NOT NULL,
+    units INTEGER NOT NULL,
+    PRIMARY KEY (dimension, key)
+);
+"""
+
+ROLLUP_SQL = """
+INSERT INTO rollups (dimension, key, gross, refunds, units) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (dimension, key) DO UPDATE SET
+    gross = gross + excluded.gross, refunds = refunds + excluded.refunds, units = units + excluded.units
+"""
+
+PRODUCT_COLUMNS = ("category", "name", "price", "stock", "next_ship", "next_ship_qty")
+
+
+class SqliteStorage:
+    """Products, sales, sale_items and returns tables in one SQLite database."""
+
+    name = "sqlite"
+
+    def __init__(self, path: Path = None):
+        self.path = Path(path or DB_FILE)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        # other lanes may hold the write lock briefly; wait rather than fail
+        self.db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=FULL")
+        self.db.execute("PRAGMA foreign_keys=ON")
+        upgrade = self.db.execute("SELECT 1 FROM sqlite_master WHERE name = 'rollups'").fetchone() is None
+        self.db.executescript(SCHEMA)
+        self._products = None
+        self._products_version = None
+        self._local_commits = 0
+        self.on_stock_change = None  # called with (products, changed SKUs or None for all)
+        if upgrade and self.db.execute("SELECT 1 FROM sales LIMIT 1").fetchone():
+            self.rebuild_rollups()  # database from before rollups existed
+
+    def close(self) -> None:
+        self.db.close()
+
+    # ----- products -----
+
+    def _version(self):
+        # data_version changes when another connection commits; our own
+        # commits are counted separately
+        return (self.db.execute("PRAGMA data_version").fetchone()[0], self._local_commits)
+
+    def products(self) -> dict:
+        """SKU -> product mapping, cached until the database changes (a ProductTable with POS_CATALOG=compact)."""
+        with self._lock:
+            version = self._version()
+            if self._products is None or version != self._products_version:
+                rows = self.db.execute("SELECT * FROM products ORDER BY CAST(sku AS INTEGER), sku")
+                if COMPACT_CATALOG:
+                    self._products = ProductTable.from_items(
+                        (row["sku"], {c: row[c] for c in PRODUCT_COLUMNS}) for row in rows)
+                else:
+                    self._products = {row["sku"]: {c: row[c] for c in PRODUCT_COLUMNS} for row in rows}
+                self._products_version = version
+                if self.on_stock_change is not None:
+                    self.on_stock_change(self._products, None)
+            return self._products
+
+    def product(self, sku):
+        return self.products().get(str(sku))
+
+    @property
+    def generation(self):
+        with self._lock:
+            return self._version()
+
+    # ----- reservations -----
+
+    def reserve(self, lane: str, sku, quantity: int) -> int:
+        """Hold `quantity` of a SKU for `lane`'s open cart.
+
+        Returns how many the lane may hold (stock minus other lanes' live
+        holds). The hold is only changed if `quantity` fits within that.
+        """
+        sku = str(sku)
+        now = time.time()
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.db.execute("SELECT stock FROM products WHERE sku = ?", (sku,)).fetchone()
+                held = self.db.execute(
+                    "SELECT COALESCE(SUM(quantity), 0) FROM reservations WHERE sku = ? AND lane != ? AND updated >= ?",
+                    (sku, lane, now - RESERVATION_TTL),
+                ).fetchone()[0]
+                available = max((row[0] if row else 0) - held, 0)
+                if quantity <= available:
+                    if quantity > 0:
+                        self.db.execute(
+                            "INSERT OR REPLACE INTO reservations (lane, sku, quantity, updated) VALUES (?, ?, ?, ?)",
+                            (lane, sku, quantity, now),
+                        )
+                    else:
+                        self.db.execute("DELETE FROM reservations WHERE lane = ? AND sku = ?", (lane, sku))
+                    self.db.execute("UPDATE reservations SET updated = ? WHERE lane = ?", (now, lane))
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+        return available
+
+    def release(self, lane: str, sku=None) -> None:
+        """Drop one of `lane`'s holds, or all of them (sale voided or committed)."""
+        with self._lock:
+            if sku is None:
+                self.db.execute("DELETE FROM reservations WHERE lane = ?", (lane,))
+            else:
+                self.db.execute("DELETE FROM reservations WHERE lane = ? AND sku = ?", (lane, str(sku)))
+
+    # ----- sales -----
+
+    def _sale_from_row(self, row) -> dict:
+        items = [
+            {"sku": r["sku"], "name": r["name"], "quantity": r["quantity"], "price": r["price"], "total": r["total"]}
+            for r in self.db.execute("SELECT * FROM sale_items WHERE sale_id = ? ORDER BY line", (row["id"],))
+        ]
+        sale = {"id": row["id"], "date": row["date"], "items": items, "total": row["total"]}
+        if row["locked"]:
+            sale["locked"] = True
+        return sale
+
+    def _insert_sale(self, sale_id, date: str, items: list, total: float, locked: bool = False) -> int:
+        cur = self.db.execute(
+            "INSERT INTO sales (id, date, total, locked) VALUES (?, ?, ?, ?)",
+            (sale_id, date, total, int(locked)),
+        )
+        sale_id = cur.lastrowid if sale_id is None else sale_id
+        self.db.executemany(
+            "INSERT INTO sale_items (sale_id, line, sku, name, quantity, price, total) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (sale_id, line, str(i["sku"]), i["name"], i["quantity"], i["price"], i["total"])
+                for line, i in enumerate(items)
+            ],
+        )
+        return sale_id
+
+    def _begin(self) -> bool:
+        """BEGIN IMMEDIATE; returns True if the cached products are still current."""
+        self.db.execute("BEGIN IMMEDIATE")
+        return self._products is not None and self._products_version == self._version()
+
+    def _commit(self, cache_current: bool, stock_changes: list) -> None:
+        """COMMIT, then patch our own stock changes into the cached products.
+
+        Keeping the same dict (instead of re-reading every product after each
+        checkout) keeps product lookups O(1) and lets the search index see
+        the catalog as unchanged.
+        """
+        self.db.execute("COMMIT")
+        self._local_commits += 1
+        if cache_current:
+            for sku, delta in stock_changes:
+                product = self._products.get(sku)
+                if product is not None:
+                    product["stock"] = max(product["stock"] + delta, 0)
+            self._products_version = self._version()
+            if self.on_stock_change is not None:
+                self.on_stock_change(self._products, [sku for sku, _ in stock_changes])
+
+    def commit_sale(self, items: list, total: float, lane: str = None) -> dict:
+        """Insert the sale, deduct stock and release `lane`'s holds in one transaction."""
+        return self.commit_sales([(items, total)], lane)[0]
+
+    def commit_sales(self, orders: list, lane: str = None) -> list:
+        """Commit several (items, total) sales in a single transaction."""
+        date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        sales = []
+        with self._lock:
+            products = self.products()
+            cache_current = self._begin()
+            try:
+                for items, total in orders:
+                    sale_id = self._insert_sale(None, date, items, total)
+                    sales.append({"id": sale_id, "date": date, "items": items, "total": total})
+                changes = [(str(i["sku"]), i["quantity"]) for items, _ in orders for i in items]
+                self.db.executemany(
+                    "UPDATE products SET stock = MAX(stock - ?, 0) WHERE sku = ?",
+                    [(qty, sku) for sku, qty in changes],
+                )
+                if lane is not None:
+                    self.db.execute("DELETE FROM reservations WHERE lane = ?", (lane,))
+                self.db.executemany(ROLLUP_SQL, [row for sale in sales for row in sale_rows(sale, products)])
+                self._commit(cache_current, [(sku, -qty) for sku, qty in changes])
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+        return sales
+
+    def find_sale(self, sale_id):
+        try:
+            sale_id = int(sale_id)
+        except (TypeError, ValueError):
+            return None
+        with self._lock:
+            row = self.db.execute("SELECT * FROM sales WHERE id = ?", (sale_id,)).fetchone()
+            return self._sale_from_row(row) if row else None
+
+    def last_sale(self):
+        with self._lock:
+            row = self.db.execute("SELECT * FROM sales ORDER BY id DESC LIMIT 1").fetchone()
+            return self._sale_from_row(row) if row else None
+
+    def search_sales(self, sku=None, start: str = None, end: str = None) -> list:
+        sql, args = "SELECT DISTINCT s.* FROM sales s", []
+        where = []
+        if sku is not None:
+            sql += " JOIN sale_items i ON i.sale_id = s.id"
+            where.append("i.sku = ?")
+            args.append(str(sku))
+        if start:
+            where.append("s.date >= ?")
+            args.append(start)
+        if end:
+            where.append("s.date < ?")
+            args.append(end + "~")  # "~" sorts after any time on that day
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY s.id"
+        with self._lock:
+            return [self._sale_from_row(row) for row in self.db.execute(sql, args).fetchall()]
+
+    def iter_sales(self):
+        return iter(self.search_sales())
+
+    def iter_sales_between(self, start: str = None, end: str = None):
+        """Stream sales dated within [start, end] ("YYYY-MM-DD"), oldest first."""
+        sql = "SELECT id FROM sales WHERE date >= ? AND date < ? ORDER BY id"
+        args = (start or "", (end + "~") if end else "~")  # "~" sorts after any date
+        with self._lock:
+            ids = [row[0] for row in self.db.execute(sql, args).fetchall()]
+        for sale_id in ids:
+            sale = self.find_sale(sale_id)
+            if sale is not None:
+                yield sale
+
+    # ----- returns -----
+
+    def iter_returns(self):
+        with self._lock:
+            rows = self.db.execute("SELECT * FROM returns ORDER BY seq").fetchall()
+        return iter([
+            {"id": r["id"], "sale_id": r["sale_id"], "date": r["date"],
+             "items": json.loads(r["items"]), "total_refund": r["total_refund"]}
+            for r in rows
+        ])
+
+    def commit_return(self, sale: dict, items: list, total_refund: float) -> dict:
+        """Restock, log the return and lock the sale in a single transaction.
+
+        Raises SaleLocked if another lane returned the sale first (checked
+        inside the transaction).
+        """
+        record = new_return_record(sale["id"], items, total_refund)
+        with self._lock:
+            products = self.products()
+            cache_current = self._begin()
+            try:
+                row = self.db.execute("SELECT locked FROM sales WHERE id = ?", (sale["id"],)).fetchone()
+                if row is not None and row[0]:
+                    raise SaleLocked(f"Sale {sale['id']} has already been returned")
+                self.db.executemany(
+                    "UPDATE products SET stock = stock + ? WHERE sku = ?",
+                    [(i["quantity"], str(i["sku"])) for i in items],
+                )
+                self.db.execute(
+                    "INSERT INTO returns (id, sale_id, date, total_refund, items) VALUES (?, ?, ?, ?, ?)",
+                    (record["id"], record["sale_id"], record["date"], record["total_refund"], json.dumps(items)),
+                )
+                self.db.execute("UPDATE sales SET locked = 1 WHERE id = ?", (sale["id"],))
+                self.db.executemany(ROLLUP_SQL, return_rows(record, products))
+                self._commit(cache_current, [(str(i["sku"]), i["quantity"]) for i in items])
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+        return record
+
+    # ----- rollups -----
+
+    def rollup(self, dimension: str = "day") -> list:
+        """Totals per day, SKU or category, as of every committed sale and return."""
+        check_dimension(dimension)
+        with self._lock:
+            rows = self.db.execute(
+                "SELECT key, gross, refunds, units FROM rollups WHERE dimension = ?", (dimension,)).fetchall()
+        return rollup_rows(dimension, (tuple(row) for row in rows))
+
+    def rebuild_rollups(self) -> dict:
+        """Recompute the rollups from the full sales and returns history."""
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                counts = self._rebuild_rollups()
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+        return counts
+
+    def _rebuild_rollups(self) -> dict:
+        """Inside a transaction: sales are summed in SQL, the (few) returns in Python."""
+        self.db.execute("DELETE FROM rollups")
+        for dimension, key, join in (
+            ("day", "substr(s.date, 1, 10)", "JOIN sales s ON s.id = i.sale_id"),
+            ("sku", "i.sku", ""),
+            ("category", f"COALESCE(p.category, '{UNKNOWN_CATEGORY}')", "LEFT JOIN products p ON p.sku = i.sku"),
+        ):
+            self.db.execute(
+                f"INSERT INTO rollups (dimension, key, gross, refunds, units) "
+                f"SELECT '{dimension}', {key}, SUM(i.total), 0, SUM(i.quantity) FROM sale_items i {join} GROUP BY 2"
+            )
+        categories = {row["sku"]: row for row in self.db.execute("SELECT sku, category FROM products")}
+        returns = self.db.execute("SELECT date, items FROM returns").fetchall()
+        self.db.executemany(ROLLUP_SQL, [
+            row for r in returns for row in return_rows({"date": r["date"], "items": json.loads(r["items"])}, categories)
+        ])
+        return {"sales": self.db.execute("SELECT COUNT(*) FROM sales").fetchone()[0], "returns": len(returns)}
+
+    # ----- import -----
+
+    def import_json(self, source: JsonStorage) -> dict:
+        """Replace the database contents with the JSON backend's data."""
+        return self.bulk_load(source.products().items(), source.iter_sales(), source.iter_returns())
+
+    def bulk_load(self, products, sales, returns, batch: int = 5000) -> dict:
+        """Replace the database contents from iterables in one transaction.
+
+        `products` yields (sku, product) pairs, `sales` and `returns` yield
+        records in the JSON shapes. Rows are inserted in batches as they
+        arrive, so the inputs can be generators over millions of records.
+        """
+        counts = {"products": 0, "sales": 0, "returns": 0}
+        product_sql = "INSERT INTO products (sku, category, name, price, stock, next_ship, next_ship_qty) VALUES (?, ?, ?, ?, ?, ?, ?)"
+        sale_sql = "INSERT INTO sales (id, date, total, locked) VALUES (?, ?, ?, ?)"
+        item_sql = "INSERT INTO sale_items (sale_id, line, sku, name, quantity, price, total) VALUES (?, ?, ?, ?, ?, ?, ?)"
+        return_sql = "INSERT INTO returns (id, sale_id, date, total_refund, items) VALUES (?, ?, ?, ?, ?)"
+
+        def batches(rows):
+            pending = []
+            for row in rows:
+                pending.append(row)
+                if len(pending) >= batch:
+                    yield pending
+                    pending = []
+            if pending:
+                yield pending
+
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                for table in ("returns", "sale_items", "sales", "products"):
+                    self.db.execute(f"DELETE FROM {table}")
+                for rows in batches(
+                    (sku, p["category"], p["name"], p["price"], p["stock"], p.get("next_ship"), p.get("next_ship_qty", 0))
+                    for sku, p in products
+                ):
+                    self.db.executemany(product_sql, rows)
+                    counts["products"] += len(rows)
+                for chunk in batches(sales):
+                    # parents first: sale_items references sales
+                    self.db.executemany(sale_sql, [
+                        (sale["id"], sale["date"], sale["total"], int(sale.get("locked", False))) for sale in chunk
+                    ])
+                    self.db.executemany(item_sql, [
+                        (sale["id"], line, str(i["sku"]), i["name"], i["quantity"], i["price"], i["total"])
+                        for sale in chunk for line, i in enumerate(sale["items"])
+                    ])
+                    counts["sales"] += len(chunk)
+                for rows in batches(
+                    (int(r["id"]), r.get("sale_id"), r["date"], r.get("total_refund", r.get("total", 0)), json.dumps(r["items"]))
+                    for r in returns
+                ):
+                    self.db.executemany(return_sql, rows)
+                    counts["returns"] += len(rows)
+                self._rebuild_rollups()
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            self._local_commits += 1
+        return counts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite storage backend tools")
+    parser.add_argument("command", choices=["import"])
+    parser.add_argument("--db", default=str(DB_FILE), help="database file (default: data/pos.db)")
+    parser.add_argument("--data", default=str(DATA_PATH), help="directory holding the JSON files")
+    args = parser.parse_args()
+
+    products, sales, returns = read_json_files(Path(args.data))  # leaves the JSON directory untouched
+    counts = SqliteStorage(Path(args.db)).bulk_load(products.items(), sales, returns)
+    print(f"Imported {counts['products']} products, {counts['sales']} sales and "
+          f"{counts['returns']} returns into {args.db}")
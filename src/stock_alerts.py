@@ -0,0 +1,154 @@
+# stock_alerts.py
+# Low-stock watch list.
+# A SKU is on the list while its stock is at or below its threshold: the
+# forecast reorder point (forecast.py) or POS_LOW_STOCK units (default 10),
+# whichever is higher. The list is indexed by a min-heap on stock minus
+# threshold, so the most urgent SKU is always at the top.
+# The storage backends report every stock change they apply (own commits,
+# other lanes' sales, returns) through their on_stock_change hook. Each
+# change re-checks only the SKUs involved, in O(log n), and pushes
+# "low" / "out" / "changed" / "cleared" events to subscribers. Showing the
+# current alerts never scans the catalog.
+
+import heapq
+import os
+import threading
+
+LOW_STOCK = int(os.environ.get("POS_LOW_STOCK", "10"))
+
+
+class StockWatch:
+    """SKUs at or below their low-stock threshold, most urgent first."""
+
+    def __init__(self, threshold: int = LOW_STOCK):
+        self.threshold = threshold
+        self.thresholds = {}  # per-SKU thresholds above the default
+        self.low = {}         # sku -> (stock, threshold), SKUs on the list
+        self._heap = []       # (stock - threshold, sku, stock); entries for changed SKUs are skipped
+        self._listeners = []
+        self._lock = threading.RLock()
+        self.store = None
+
+    def attach(self, store) -> None:
+        """Follow `store`'s stock changes, starting from its current catalog."""
+        with self._lock:
+            self.store = store
+            store.on_stock_change = self.update
+            self.rebuild(store.products())
+
+    def subscribe(self, listener) -> None:
+        """`listener(events)` is called with a list of event dicts after every change.
+
+        It may be called from any thread that commits to the store.
+        """
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _emit(self, events: list) -> None:
+        if events:
+            for listener in list(self._listeners):
+                listener(events)
+
+    # ----- index -----
+
+    def _threshold(self, sku: str) -> int:
+        return self.thresholds.get(sku, self.threshold)
+
+    def _check(self, sku: str, product):
+        """Re-index one SKU; returns its event (or None if its entry is unchanged)."""
+        stock = product["stock"] if product is not None else None
+        threshold = self._threshold(sku)
+        entry = self.low.get(sku)
+        if stock is not None and stock <= threshold:
+            if entry == (stock, threshold):
+                return None
+            self.low[sku] = (stock, threshold)
+            heapq.heappush(self._heap, (stock - threshold, sku, stock))
+            kind = "out" if stock == 0 else "changed" if entry is not None else "low"
+        elif entry is not None:
+            del self.low[sku]
+            kind = "cleared"
+        else:
+            return None
+        return {"kind": kind, "sku": sku, "stock": stock, "threshold": threshold}
+
+    def rebuild(self, products: dict) -> None:
+        """Index the whole catalog (on attach, or when it was reloaded from disk)."""
+        with self._lock:
+            self.low = {}
+            for sku, product in products.items():
+                threshold = self._threshold(sku)
+                if product["stock"] <= threshold:
+                    self.low[sku] = (product["stock"], threshold)
+            self._heap = [(stock - threshold, sku, stock) for sku, (stock, threshold) in self.low.items()]
+            heapq.heapify(self._heap)
+        self._emit([{"kind": "reset"}])
+
+    def update(self, products: dict, skus=None) -> None:
+        """storage on_stock_change hook: `skus` changed stock (None: anything may have)."""
+        if skus is None:
+            self.rebuild(products)
+            return
+        with self._lock:
+            events = [event for event in (self._check(str(sku), products.get(str(sku))) for sku in set(skus))
+                      if event is not None]
+            self._compact()
+        self._emit(events)
+
+    def set_thresholds(self, thresholds: dict, products: dict) -> None:
+        """Raise per-SKU thresholds (e.g. forecast reorder points); re-checks only SKUs that changed."""
+        with self._lock:
+            changed = []
+            for sku, threshold in thresholds.items():
+                threshold = max(threshold, self.threshold)
+                if threshold != self._threshold(sku):
+                    if threshold == self.threshold:
+                        self.thresholds.pop(sku, None)
+                    else:
+                        self.thresholds[sku] = threshold
+                    changed.append(sku)
+            events = [event for event in (self._check(sku, products.get(sku)) for sku in changed)
+                      if event is not None]
+            self._compact()
+        self._emit(events)
+
+    def _compact(self) -> None:
+        """Drop superseded heap entries once they outnumber the live ones."""
+        if len(self._heap) > 2 * len(self.low) + 64:
+            self._heap = [(stock - threshold, sku, stock) for sku, (stock, threshold) in self.low.items()]
+            heapq.heapify(self._heap)
+
+    def _live(self, entry) -> bool:
+        margin, sku, stock = entry
+        current = self.low.get(sku)
+        return current is not None and current[0] == stock and stock - current[1] == margin
+
+    # ----- reads -----
+
+    def most_urgent(self):
+        """(sku, stock, threshold) of the SKU furthest below its threshold, or None."""
+        with self._lock:
+            while self._heap and not self._live(self._heap[0]):
+                heapq.heappop(self._heap)
+            if not self._heap:
+                return None
+            _, sku, stock = self._heap[0]
+            return sku, stock, self.low[sku][1]
+
+    def alerts(self) -> list:
+        """[(sku, stock, threshold)] for every SKU on the list, most urgent first."""
+        with self._lock:
+            live = sorted(entry for entry in self._heap if self._live(entry))
+            seen = set()
+            return [(sku, stock, self.low[sku][1]) for _, sku, stock in live
+                    if not (sku in seen or seen.add(sku))]
+
+    def __len__(self) -> int:
+        return len(self.low)
+
+
+# Shared instance used by the app
+stock_watch = StockWatch()
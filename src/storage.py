@@ -0,0 +1,444 @@
+# storage.py
+# Pluggable persistence for products, sales and returns.
+# Screens talk to the shared store from get_default_storage() and never open
+# data files themselves. The backend is picked with the POS_STORAGE environment variable:
+#   POS_STORAGE=json    (default) products.json + sales.jsonl + returns.json
+#   POS_STORAGE=sqlite  data/pos.db, see sqlite_store.py
+#   POS_STORAGE=remote  the inventory daemon, see posd.py / posclient.py
+# Several lanes (terminals) may share one data directory. Every write runs
+# under a cross-process lock, and each lane reserves stock for its open
+# cart, so concurrent checkouts never oversell or lose a stock update.
+# JSON checkouts are write-behind: acknowledged after the journal append,
+# with products.json rewritten in the background (see writebehind.py).
+# Every commit also updates the running per-day/SKU/category totals in
+# rollups.py, and every stock change is reported to the on_stock_change
+# hook (see stock_alerts.py).
+
+from pathlib import Path
+from datetime import datetime
+import json
+import os
+import threading
+
+from catalog import ProductCatalog, catalog
+from journal import SalesJournal, journal
+from atomic import write_json_atomic
+from filelock import FileLock
+from reservations import ReservationBook
+from rollups import SalesRollups, check_dimension
+from writebehind import FLUSH_EVERY, FLUSH_INTERVAL, JOURNAL_SYNC, SnapshotMark, WriteBehind
+
+DATA_PATH = Path(__file__).parent.parent / "data"
+RETURNS_FILE = DATA_PATH / "returns.json"
+INDEX_SAVE_INTERVAL = 5  # seconds between receipt index checkpoints when products.json is written per sale
+
+
+class SaleLocked(ValueError):
+    """The sale has already been returned (possibly on another lane) and is locked."""
+
+
+def new_return_record(sale_id, items: list, total_refund: float) -> dict:
+    """Build the record appended to the returns log."""
+    now = datetime.now()
+    return {
+        "id": int(now.timestamp()),
+        "sale_id": sale_id,
+        "date": now.strftime("%Y-%m-%d %H:%M:%S"),
+        "items": items,
+        "total_refund": round(total_refund, 2)
+    }
+
+
+def read_json_files(data_path: Path) -> tuple:
+    """(products, sales, returns) of a JSON data directory, read without writing to it.
+
+    For tools such as the SQLite import: unlike opening a JsonStorage, this
+    does not migrate sales.json, take pos.lock, stage products.json.mark or
+    start a write-behind thread. Journal sales that products.json does not
+    include yet are deducted, as a load does. Raises ValueError if a return
+    was left half written (returns.pending.json); opening the directory with
+    the app finishes it.
+    """
+    data_path = Path(data_path)
+    if (data_path / "returns.pending.json").exists():
+        raise ValueError(f"{data_path}: a return is only partly written (returns.pending.json); "
+                         "start the app on this directory once to finish it")
+    snapshot = ProductCatalog(data_path / "products.json")
+    products = snapshot.products()
+    sales_log = SalesJournal(data_path / "sales.jsonl", data_path / "sales.json")
+    sales = sales_log.read_sales()
+    applied = SnapshotMark(snapshot.path.with_name(snapshot.path.name + ".mark")).applied_for(snapshot.stamp)
+    if applied is not None:
+        JsonStorage._deduct(products, sorted((s for s in sales if s["id"] > applied), key=lambda s: s["id"]))
+    try:
+        with open(data_path / "returns.json", "r") as f:
+            returns = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        returns = []
+    return products, sales, returns
+
+
+class JsonStorage:
+    """The original JSON files: products.json, the sales journal and returns.json."""
+
+    name = "json"
+
+    def __init__(self, data_path: Path = None, flush_interval: float = None,
+                 flush_every: int = None, journal_sync: str = None):
+        if data_path is None:
+            data_path = DATA_PATH
+            self.catalog = catalog
+            self.journal = journal
+            self.returns_path = RETURNS_FILE
+        else:
+            data_path = Path(data_path)
+            self.catalog = ProductCatalog(data_path / "products.json")
+            self.journal = SalesJournal(data_path / "sales.jsonl", data_path / "sales.json")
+            self.returns_path = data_path / "returns.json"
+        # held around every read-modify-write of the data files
+        self.lock = FileLock(data_path / "pos.lock")
+        self.reservations = ReservationBook(data_path / "reservations.json")
+        # redo record for a return whose files were not all written yet
+        self.pending_return_path = self.returns_path.with_name("returns.pending.json")
+        self.rollups = SalesRollups(data_path / "rollups.json").load()
+        self._returns_stamp = None  # returns.json as of the last rollup catch-up
+
+        # products.json may lag the journal: every load replays the sales after it
+        self.journal.fsync_each = (journal_sync or JOURNAL_SYNC) != "batch"
+        self.mark = SnapshotMark(self.catalog.path.with_name(self.catalog.path.name + ".mark"))
+        self.applied = 0  # highest sale ID whose stock change is in self.catalog
+        self.on_stock_change = None  # called with (products, changed SKUs or None for all)
+        self.on_flush_error = None  # called with the exception when background writes start failing
+        self.catalog.on_load = self._replay
+        interval = FLUSH_INTERVAL if flush_interval is None else flush_interval
+        with self.lock:
+            self.catalog.refresh(force=True)
+            if not self.mark.exists() and self.catalog.stamp is not None:
+                self.mark.stage(self.applied, self.catalog.stamp)
+            if self.pending_return_path.exists():
+                self._apply_pending_return()
+        self.write_behind = None
+        if interval > 0:
+            self.write_behind = self.index_saver = WriteBehind(self._flush_behind, interval,
+                                                               flush_every or FLUSH_EVERY, self._flush_failed)
+        else:
+            # products.json is written on every sale; the receipt index is still saved in the background
+            self.index_saver = WriteBehind(self.journal.checkpoint_index, INDEX_SAVE_INTERVAL,
+                                           self.journal.index.checkpoint_every, self._flush_failed)
+
+    # ----- products -----
+
+    def products(self) -> dict:
+        return self.catalog.products()
+
+    def product(self, sku):
+        return self.catalog.get(sku)
+
+    @property
+    def generation(self) -> int:
+        """Changes whenever product data changes (locally or on disk)."""
+        self.catalog.refresh()
+        return self.catalog.generation
+
+    # ----- snapshot / journal replay -----
+
+    def _stock_changed(self, products: dict, skus=None) -> None:
+        if self.on_stock_change is not None:
+            self.on_stock_change(products, skus)
+
+    @staticmethod
+    def _sale_skus(sales) -> set:
+        return {str(item["sku"]) for sale in sales for item in sale["items"]}
+
+    @staticmethod
+    def _deduct(products: dict, sales) -> None:
+        for sale in sales:
+            for item in sale["items"]:
+                product = products.get(str(item["sku"]))
+                if product is not None:
+                    product["stock"] = max(product["stock"] - item["quantity"], 0)
+
+    def _replay(self, products: dict) -> None:
+        """catalog.on_load: bring a freshly read snapshot up to the end of the journal."""
+        applied = self.mark.applied_for(self.catalog.stamp)
+        if applied is None:
+            # written by something else (an editor, generate_products.py): take it as current
+            self.applied = self.journal.next_id() - 1
+            self._stock_changed(products)
+            return
+        sales = self.journal.sales_after(applied)
+        self._deduct(products, sales)
+        self.applied = sales[-1]["id"] if sales else applied
+        self._stock_changed(products)
+
+    def _catch_up(self) -> dict:
+        """Under the lock: reload if needed and apply sales other lanes have not flushed yet."""
+        products = self.catalog.products()
+        sales = self.journal.sales_after(self.applied)
+        if sales:
+            self._deduct(products, sales)
+            self.applied = sales[-1]["id"]
+            self.catalog.touch()
+            self._stock_changed(products, self._sale_skus(sales))
+        return products
+
+    def flush(self) -> None:
+        """Write products.json (and the journal, if appends skip fsync) now.
+
+        The snapshot is what is on disk plus the journal replayed on top, not
+        just this lane's copy: another lane may have written a return, or
+        someone edited the file, since we last loaded it.
+        """
+        with self.lock:
+            self._catch_up()
+            self.journal.fsync()
+            applied = self.applied
+            self.catalog.write_snapshot(
+                on_staged=lambda tmp: self.mark.stage(applied, self.catalog._file_stamp(tmp)))
+            self.rollups.save()
+
+    def _flush_behind(self) -> None:
+        """Write-behind tick: the snapshot under the lock, then the receipt index outside it."""
+        self.flush()
+        self.journal.checkpoint_index()
+
+    def _flush_failed(self, error: Exception) -> None:
+        if self.on_flush_error is not None:
+            self.on_flush_error(error)
+
+    def close(self) -> None:
+        """Flush pending writes and stop the write-behind thread."""
+        if self.write_behind is not None:
+            self.write_behind.close()
+        self.index_saver.close()
+
+    # ----- reservations -----
+
+    def reserve(self, lane: str, sku, quantity: int) -> int:
+        """Hold `quantity` of a SKU for `lane`'s open cart.
+
+        Returns how many the lane may hold (stock minus other lanes' holds).
+        The hold is only changed if `quantity` fits within that.
+        """
+        sku = str(sku)
+        with self.lock:
+            product = self._catch_up().get(sku)
+            self.reservations.load()
+            available = max((product["stock"] if product else 0) - self.reservations.held_by_others(lane, sku), 0)
+            if quantity <= available:
+                self.reservations.set(lane, sku, quantity)
+                self.reservations.save()
+            return available
+
+    def release(self, lane: str, sku=None) -> None:
+        """Drop one of `lane`'s holds, or all of them (sale voided or committed)."""
+        with self.lock:
+            if self.reservations.load().release(lane, None if sku is None else str(sku)):
+                self.reservations.save()
+
+    # ----- sales -----
+
+    def commit_sale(self, items: list, total: float, lane: str = None) -> dict:
+        """Record the sale and deduct stock. Returns the stored sale.
+
+        Runs under the data-directory lock: sales other lanes made since our
+        last look are applied first, and `lane`'s reservations are released.
+        """
+        return self.commit_sales([(items, total)], lane)[0]
+
+    def commit_sales(self, orders: list, lane: str = None) -> list:
+        """Commit several (items, total) sales with one journal append.
+
+        The sales are durable once appended; the stock change is written to
+        products.json by the write-behind thread (or right away with
+        flush_interval=0).
+        """
+        with self.lock:
+            inventory = self._catch_up()
+            sales = self.journal.append_sales(orders)
+            self._deduct(inventory, sales)
+            self.applied = sales[-1]["id"]
+            self.catalog.touch()
+            self._roll_up(inventory, sales)
+            self._stock_changed(inventory, self._sale_skus(sales))
+            if lane is not None and self.reservations.load().release(lane):
+                self.reservations.save()
+            if self.write_behind is not None:
+                self.write_behind.note(len(sales))
+            else:
+                self.flush()
+                self.index_saver.note(len(sales))
+            return sales
+
+    def find_sale(self, sale_id):
+        return self.journal.find(sale_id)
+
+    def last_sale(self):
+        return self.journal.last()
+
+    def search_sales(self, sku=None, start: str = None, end: str = None) -> list:
+        return self.journal.search(sku, start, end)
+
+    def iter_sales(self):
+        return self.journal.iter_sales()
+
+    def iter_sales_between(self, start: str = None, end: str = None):
+        """Stream sales dated within [start, end] ("YYYY-MM-DD"), oldest first."""
+        return self.journal.iter_between(start, end)
+
+    # ----- returns -----
+
+    def iter_returns(self):
+        try:
+            with open(self.returns_path, "r") as f:
+                return iter(json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return iter([])
+
+    def commit_return(self, sale: dict, items: list, total_refund: float) -> dict:
+        """Restock returned items, log the return and lock the original sale.
+
+        All stock deltas are folded into one products.json write. The whole
+        transaction is first saved as a redo record (returns.pending.json) that
+        holds the resulting stock levels, so if power is lost part way the
+        next start finishes the same writes instead of leaving stock and the
+        returns log out of sync.
+
+        Raises SaleLocked if the sale was returned since `sale` was read: the
+        lock flag is checked again under the data-directory lock, so two lanes
+        with the same receipt open cannot both refund it.
+        """
+        with self.lock:
+            current = self.journal.find(sale["id"])
+            if current is not None and current.get("locked"):
+                raise SaleLocked(f"Sale {sale['id']} has already been returned")
+            products = self._catch_up()
+            deltas = {}
+            for item in items:
+                sku = str(item["sku"])
+                if sku in products:
+                    deltas[sku] = deltas.get(sku, 0) + item["quantity"]
+
+            pending = {
+                "record": new_return_record(sale["id"], items, total_refund),
+                "stock": {sku: products[sku]["stock"] + qty for sku, qty in deltas.items()},
+                "sale_id": sale["id"],
+                "applied": self.applied,  # the journal sales those stock levels include
+            }
+            write_json_atomic(self.pending_return_path, pending)
+            self._apply_pending_return(pending)
+            return pending["record"]
+
+    def _apply_pending_return(self, pending: dict = None) -> None:
+        """Apply (or re-apply after a crash) a redo record; every step is idempotent."""
+        if pending is None:
+            try:
+                with open(self.pending_return_path, "r") as f:
+                    pending = json.load(f)
+            except json.JSONDecodeError:
+                # torn redo record: the transaction never started
+                os.remove(self.pending_return_path)
+                return
+
+        # 1. stock: absolute post-return levels, plus any sales made after
+        #    them (other lanes, after a crash), in one atomic write
+        products = self._catch_up()
+        restocked = {sku: products[sku] for sku in pending["stock"] if sku in products}
+        for sku, product in restocked.items():
+            product["stock"] = pending["stock"][sku]
+        self._deduct(restocked, self.journal.sales_after(pending.get("applied", self.applied)))
+        self.catalog.touch()
+        self._stock_changed(products, restocked)
+        self.flush()
+
+        # 2. returns log: append unless a previous attempt already did
+        record = pending["record"]
+        returns = list(self.iter_returns())
+        if not returns or returns[-1] != record:
+            returns.append(record)
+            write_json_atomic(self.returns_path, returns)
+        self._roll_up_returns(products)
+        self.rollups.save()
+
+        # 3. lock the sale (appending another locked version is harmless)
+        sale = self.journal.find(pending["sale_id"])
+        if sale is not None and not sale.get("locked"):
+            sale["locked"] = True
+            self.journal.update(sale)
+
+        os.remove(self.pending_return_path)
+
+
+    # ----- rollups -----
+
+    def _roll_up(self, products: dict, sales: list = None) -> None:
+        """Fold `sales` (and any earlier ones the rollups are missing) into the rollups."""
+        if not sales or sales[0]["id"] - 1 > self.rollups.last_sale:
+            if self.rollups.last_sale:
+                sales = self.journal.sales_after(self.rollups.last_sale)
+            else:  # no rollups yet: one pass over the journal beats a lookup per sale
+                sales = sorted(self.journal.iter_sales(), key=lambda s: s["id"])
+        self.rollups.add_sales(sales, products)
+
+    def _roll_up_returns(self, products: dict) -> None:
+        """Fold in returns.json records the rollups are missing (checked by file stamp)."""
+        stamp = self.catalog._file_stamp(self.returns_path)
+        if stamp is None or stamp == self._returns_stamp:
+            return
+        returns = list(self.iter_returns())
+        self.rollups.add_returns(returns[self.rollups.returns:], products)
+        self._returns_stamp = stamp
+
+    def rollup(self, dimension: str = "day") -> list:
+        """Totals per day, SKU or category, as of every committed sale and return."""
+        check_dimension(dimension)
+        with self.lock:
+            products = self._catch_up()
+            self._roll_up(products)
+            self._roll_up_returns(products)
+            self.rollups.save()
+            return self.rollups.rows(dimension)
+
+    def rebuild_rollups(self) -> dict:
+        """Recompute the rollups from the full sales and returns history."""
+        with self.lock:
+            products = self._catch_up()
+            self.rollups.clear()
+            self._returns_stamp = None
+            sales = sorted(self.journal.iter_sales(), key=lambda s: s["id"])
+            self.rollups.add_sales(sales, products)
+            self._roll_up_returns(products)
+            self.rollups.save()
+            return {"sales": len(sales), "returns": self.rollups.returns}
+
+
+def get_storage(kind: str = None, data_path: Path = None):
+    """Create a storage backend by name ("json", "sqlite" or "remote")."""
+    kind = (kind or os.environ.get("POS_STORAGE", "json")).lower()
+    if kind == "json":
+        return JsonStorage(data_path)
+    if kind == "sqlite":
+        from sqlite_store import SqliteStorage
+        return SqliteStorage(Path(data_path) / "pos.db" if data_path else None)
+    if kind == "remote":
+        from posclient import RemoteStorage
+        from posd import default_address
+        return RemoteStorage(default_address(data_path))
+    raise ValueError(f"Unknown storage backend: {kind}")
+
+
+_default_storage = None
+_default_lock = threading.Lock()
+
+
+def get_default_storage():
+    """The store shared by every screen, created from POS_STORAGE on first use.
+
+    Importing this module touches nothing on disk; the data directory is
+    opened (migrated, locked, ...) only when the app first asks for it.
+    """
+    global _default_storage
+    with _default_lock:
+        if _default_storage is None:
+            _default_storage = get_storage()
+        return _default_storage
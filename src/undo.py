@@ -0,0 +1,56 @@
+# undo.py
+# Undo/redo for the sales screen cart.
+# Each action is stored as a small delta (SKU, quantity before, quantity
+# after) rather than a copy of the whole cart, so memory per action is
+# constant no matter how big the cart gets. The undo stack is bounded and
+# belongs to a single sale.
+
+from collections import deque, namedtuple
+
+from cart import Cart
+
+CartDelta = namedtuple("CartDelta", "sku name price old_qty new_qty")
+CartDelta.__doc__ = "One cart change: the line for `sku` went from old_qty to new_qty (0 = absent)."
+
+
+class UndoHistory:
+    """Bounded undo/redo stacks of CartDelta records."""
+
+    def __init__(self, depth: int = 500):
+        self._undo = deque(maxlen=depth)  # oldest actions fall off the end
+        self._redo = []
+
+    def __len__(self) -> int:
+        return len(self._undo)
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def record(self, sku: str, name: str, price: float, old_qty: int, new_qty: int) -> None:
+        """Remember a change that was just applied; a new action clears redo."""
+        if old_qty != new_qty:
+            self._undo.append(CartDelta(sku, name, price, old_qty, new_qty))
+            self._redo.clear()
+
+    def undo(self, cart: Cart):
+        """Revert the last change on `cart`. Returns the delta, or None."""
+        if not self._undo:
+            return None
+        delta = self._undo.pop()
+        cart.put(delta.sku, delta.name, delta.price, delta.old_qty)
+        self._redo.append(delta)
+        return delta
+
+    def redo(self, cart: Cart):
+        """Re-apply the last undone change on `cart`. Returns the delta, or None."""
+        if not self._redo:
+            return None
+        delta = self._redo.pop()
+        cart.put(delta.sku, delta.name, delta.price, delta.new_qty)
+        self._undo.append(delta)
+        return delta
+
+    def clear(self) -> None:
+        self._undo.clear()
+        self._redo.clear()
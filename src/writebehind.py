@@ -0,0 +1,133 @@
+# writebehind.py
+# Write-behind persistence for the JSON backend.
+# A checkout is acknowledged once its sale is appended to the journal; the
+# stock change only lives in memory until a background thread writes
+# products.json, so a burst of checkouts costs one catalog write.
+# Nothing is lost if the process dies in between: products.json.mark
+# records which journal sale each snapshot already includes, and whoever
+# loads the snapshot (a restart, another lane) replays the journal sales
+# after it. Settings (environment, read when the storage is created):
+#   POS_FLUSH_INTERVAL  seconds between snapshot writes (default 2; 0 writes
+#                       products.json on every checkout, as before)
+#   POS_FLUSH_EVERY     write early once this many sales are waiting (default 100)
+#   POS_JOURNAL_SYNC    "always" (default): fsync the journal before a sale
+#                       is acknowledged. "batch": fsync it with the next
+#                       snapshot, so a power cut can lose up to one flush
+#                       interval (or POS_FLUSH_EVERY sales) of acknowledged
+#                       sales; a crashed process loses nothing either way.
+
+from pathlib import Path
+import atexit
+import json
+import os
+import threading
+
+from atomic import write_json_atomic
+
+FLUSH_INTERVAL = float(os.environ.get("POS_FLUSH_INTERVAL", "2"))
+FLUSH_EVERY = int(os.environ.get("POS_FLUSH_EVERY", "100"))
+JOURNAL_SYNC = os.environ.get("POS_JOURNAL_SYNC", "always").lower()
+
+
+class SnapshotMark:
+    """products.json.mark: the last journal sale included in a products.json snapshot.
+
+    A snapshot is identified by its file stamp (mtime, size, inode). The mark
+    is written before the snapshot is renamed into place and keeps the
+    previous entry too, so a crash between the two still resolves.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def applied_for(self, stamp):
+        """Last sale ID included in the snapshot with `stamp`, or None if unknown."""
+        if stamp is None:
+            return None
+        data = self._read()
+        for entry in (data.get("current"), data.get("previous")):
+            if entry and tuple(entry["stamp"]) == tuple(stamp):
+                return entry["applied"]
+        return None
+
+    def stage(self, applied: int, stamp) -> None:
+        """Record the snapshot about to be renamed into place."""
+        data = self._read()
+        write_json_atomic(self.path, {
+            "current": {"applied": applied, "stamp": list(stamp)},
+            "previous": data.get("current"),
+        }, indent=None)
+
+
+class WriteBehind:
+    """Background thread that calls `flush` every `interval` s or after `max_pending` sales.
+
+    A failed flush is retried on every tick; `on_error` is called (from this
+    thread) with the exception when flushes start failing.
+    """
+
+    def __init__(self, flush, interval: float = FLUSH_INTERVAL, max_pending: int = FLUSH_EVERY,
+                 on_error=None):
+        self._flush = flush
+        self.interval = interval
+        self.max_pending = max_pending
+        self.on_error = on_error
+        self.pending = 0
+        self.last_error = None  # the flush is retried on the next tick
+        self._pending_lock = threading.Lock()  # note() runs on the UI thread, flush_now() on ours
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def note(self, count: int = 1) -> None:
+        """`count` more sales are waiting to be written."""
+        with self._pending_lock:
+            self.pending += count
+            due = self.pending >= self.max_pending
+        if due:
+            self._wake.set()
+
+    def flush_now(self) -> None:
+        with self._pending_lock:
+            pending, self.pending = self.pending, 0
+        if not pending:
+            return
+        try:
+            self._flush()
+            self.last_error = None
+        except Exception as e:
+            # any failure (disk full, a products.json that no longer parses, ...)
+            # must not end the thread: keep the sales pending and retry next tick
+            first = self.last_error is None
+            self.last_error = e
+            with self._pending_lock:
+                self.pending += pending
+            if first and self.on_error is not None:
+                self.on_error(e)
+
+    def _run(self) -> None:
+        while not self._stopped:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush_now()
+
+    def close(self) -> None:
+        """Stop the thread and write anything still pending."""
+        if self._stopped:
+            return
+        self._stopped = True
+        self._wake.set()
+        self._thread.join()
+        self.flush_now()